@@ -0,0 +1,287 @@
+# ======================================================================
+# ARQUIVO: access_stats.py
+# FUNÇÃO: Estatísticas de acesso agregadas em memória, atualizadas a cada
+#         registro: contagens por porta, por credencial e por resultado em
+#         baldes de um minuto e de uma hora, com retenção limitada. Salvas
+#         periodicamente em disco (checkpoint) para sobreviver a reinícios.
+# ======================================================================
+
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# --- Configuração ---
+ARQUIVO_ESTATISTICAS = 'access_stats.json'
+VERSAO_CHECKPOINT = 1
+INTERVALO_CHECKPOINT = 60.0 # Segundos entre gravações
+
+# granularidade -> (segundos por balde, baldes mantidos)
+GRANULARIDADES = {
+    'minuto': (60, 180),       # Últimas 3 horas
+    'hora': (3600, 24 * 8),    # Últimos 8 dias
+}
+DIMENSOES = ('porta', 'credencial', 'resultado')
+RESULTADOS = ('negado', 'autorizado') # Índice = campo Autorização
+
+# --- 1. AGREGADOS ---
+# Cada granularidade guarda {balde: {dimensão: {valor: contagem}}}, com os
+# baldes em ordem de criação. O balde é o instante (epoch, UTC) dividido
+# pela duração, então minutos e horas se alinham ao relógio UTC.
+
+class AgregadosAcesso:
+    """
+    Contagens de acessos por porta, credencial e resultado. registrar() é
+    um punhado de incrementos em dicionários; as consultas de um balde são
+    uma busca direta, e as de um período somam no máximo a retenção.
+    """
+
+    def __init__(self, granularidades=GRANULARIDADES):
+        self.granularidades = dict(granularidades)
+        self._baldes = {nome: OrderedDict() for nome in self.granularidades}
+        self._trava = threading.Lock()
+
+    def _balde(self, granularidade, numero):
+        """
+        Contagens do balde 'numero', criado se preciso (descarta os vencidos).
+        Chamado com a trava obtida.
+        """
+        baldes = self._baldes[granularidade]
+        contagens = baldes.get(numero)
+        if contagens is None:
+            contagens = baldes[numero] = {dimensao: {} for dimensao in DIMENSOES}
+            limite = numero - self.granularidades[granularidade][1]
+            while baldes:
+                mais_antigo = next(iter(baldes))
+                if mais_antigo > limite:
+                    break
+                del baldes[mais_antigo]
+        return contagens
+
+    def registrar(self, porta, credencial, resultado, instante=None):
+        """
+        Conta um acesso. 'resultado' é o campo Autorização (1 = autorizado).
+        """
+        instante = time.time() if instante is None else instante
+        valores = (('porta', porta), ('credencial', credencial), ('resultado', RESULTADOS[resultado]))
+        with self._trava:
+            for granularidade, (segundos, _) in self.granularidades.items():
+                contagens = self._balde(granularidade, int(instante // segundos))
+                for dimensao, valor in valores:
+                    por_valor = contagens[dimensao]
+                    por_valor[valor] = por_valor.get(valor, 0) + 1
+
+    # --- Consultas ---
+
+    def _numero(self, granularidade, instante):
+        if isinstance(instante, datetime):
+            instante = instante.timestamp()
+        return int((time.time() if instante is None else instante) // self.granularidades[granularidade][0])
+
+    def contagem(self, dimensao, valor, granularidade='minuto', instante=None):
+        """
+        Acessos com dimensao == valor no balde que contém 'instante' (padrão:
+        agora). Ex.: contagem('porta', 3) -> passagens pela P3 neste minuto.
+        """
+        numero = self._numero(granularidade, instante)
+        with self._trava:
+            contagens = self._baldes[granularidade].get(numero)
+            return contagens[dimensao].get(valor, 0) if contagens else 0
+
+    def balde(self, granularidade='minuto', instante=None):
+        """
+        Cópia de todas as contagens de um balde: {dimensão: {valor: contagem}}.
+        """
+        numero = self._numero(granularidade, instante)
+        with self._trava:
+            contagens = self._baldes[granularidade].get(numero)
+            if not contagens:
+                return {dimensao: {} for dimensao in DIMENSOES}
+            return {dimensao: dict(por_valor) for dimensao, por_valor in contagens.items()}
+
+    def serie(self, dimensao, valor, granularidade='minuto', ultimos=60, instante=None):
+        """
+        [(início do balde em epoch, contagem), ...] dos 'ultimos' baldes até
+        'instante', do mais antigo para o mais recente (baldes vazios = 0).
+        """
+        segundos, retencao = self.granularidades[granularidade]
+        fim = self._numero(granularidade, instante)
+        baldes = self._baldes[granularidade]
+        with self._trava:
+            return [
+                (numero * segundos, baldes[numero][dimensao].get(valor, 0) if numero in baldes else 0)
+                for numero in range(fim - min(ultimos, retencao) + 1, fim + 1)
+            ]
+
+    def total(self, dimensao, valor, inicio, fim=None, granularidade='hora'):
+        """
+        Soma das contagens dos baldes que começam em [inicio, fim].
+        """
+        return sum(n for instante, n in self.serie(
+            dimensao, valor, granularidade,
+            ultimos=self._numero(granularidade, fim) - self._numero(granularidade, inicio) + 1,
+            instante=fim
+        ))
+
+    def taxa_negacao(self, inicio=None, fim=None, granularidade='hora'):
+        """
+        Fração de acessos negados entre 'inicio' (padrão: 00:00 UTC de hoje,
+        início de um balde de hora) e 'fim' (padrão: agora). None se não
+        houve acessos.
+        """
+        if inicio is None:
+            inicio = time.time() // 86400 * 86400 # Os baldes se alinham ao relógio UTC
+        negados = self.total('resultado', 'negado', inicio, fim, granularidade)
+        autorizados = self.total('resultado', 'autorizado', inicio, fim, granularidade)
+        return negados / (negados + autorizados) if negados + autorizados else None
+
+    # --- Checkpoint ---
+
+    def exportar(self):
+        with self._trava:
+            return {
+                'versao': VERSAO_CHECKPOINT,
+                'granularidades': {
+                    nome: {
+                        str(numero): {dimensao: [[valor, n] for valor, n in por_valor.items()]
+                                      for dimensao, por_valor in contagens.items()}
+                        for numero, contagens in self._baldes[nome].items()
+                    }
+                    for nome in self.granularidades
+                }
+            }
+
+    def importar(self, dados):
+        """
+        Soma as contagens de um checkpoint às atuais, descartando os baldes
+        além da retenção.
+        """
+        if dados.get('versao') != VERSAO_CHECKPOINT:
+            return
+        with self._trava:
+            for nome, baldes in dados['granularidades'].items():
+                if nome not in self.granularidades:
+                    continue
+                atual = self._numero(nome, None)
+                for numero, contagens in sorted(baldes.items(), key=lambda item: int(item[0])):
+                    numero = int(numero)
+                    if numero <= atual - self.granularidades[nome][1]:
+                        continue
+                    destino = self._balde(nome, numero)
+                    for dimensao, pares in contagens.items():
+                        por_valor = destino[dimensao]
+                        for valor, n in pares:
+                            por_valor[valor] = por_valor.get(valor, 0) + n
+
+    def salvar(self, caminho=ARQUIVO_ESTATISTICAS):
+        """
+        Grava o checkpoint (arquivo temporário + rename: nunca fica pela metade).
+        """
+        dados = self.exportar()
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w') as f:
+            json.dump(dados, f, separators=(',', ':'))
+        os.replace(temporario, caminho)
+
+    def carregar(self, caminho=ARQUIVO_ESTATISTICAS):
+        try:
+            with open(caminho) as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return False
+        except ValueError as e:
+            print(f"[estatísticas] Checkpoint {caminho} ignorado: {e}")
+            return False
+        self.importar(dados)
+        return True
+
+# --- 2. INSTÂNCIA DO SERVIDOR ---
+
+_agregados = None
+_caminho_checkpoint = None
+
+def agregados():
+    return _agregados
+
+def iniciar_estatisticas(caminho=ARQUIVO_ESTATISTICAS, intervalo=INTERVALO_CHECKPOINT):
+    """
+    Cria os agregados do processo, retoma o último checkpoint e passa a
+    salvá-lo a cada 'intervalo' segundos e na saída.
+    """
+    global _agregados, _caminho_checkpoint
+
+    _agregados, _caminho_checkpoint = AgregadosAcesso(), caminho
+    if _agregados.carregar(caminho):
+        print(f"[estatísticas] Checkpoint {caminho} carregado.")
+
+    def salvar_periodicamente():
+        while True:
+            time.sleep(intervalo)
+            salvar_estatisticas()
+
+    threading.Thread(target=salvar_periodicamente, name="estatisticas-checkpoint", daemon=True).start()
+    atexit.register(salvar_estatisticas)
+    return _agregados
+
+def salvar_estatisticas():
+    """
+    Grava o checkpoint agora (também chamada na saída do processo).
+    """
+    if _agregados is None:
+        return
+    try:
+        _agregados.salvar(_caminho_checkpoint)
+    except OSError as e:
+        print(f"[estatísticas] Erro ao salvar {_caminho_checkpoint}: {e}")
+
+def consultar(parametros):
+    """
+    Consulta por dicionário de parâmetros (endpoint HTTP):
+      granularidade=minuto|hora (padrão minuto)
+      dimensao=porta|credencial|resultado e valor=... -> série dos 'ultimos' baldes
+      sem dimensao -> balde atual completo e taxa de negação de hoje (dia UTC)
+    """
+    if _agregados is None:
+        raise ValueError("estatísticas desligadas (inicie o servidor com --estatisticas)")
+    granularidade = parametros.get('granularidade', 'minuto')
+    if granularidade not in _agregados.granularidades:
+        raise ValueError(f"granularidade inválida: {granularidade}")
+
+    dimensao = parametros.get('dimensao')
+    if dimensao is None:
+        return {
+            'granularidade': granularidade,
+            'balde_atual': _agregados.balde(granularidade),
+            'taxa_negacao_hoje': _agregados.taxa_negacao()
+        }
+    if dimensao not in DIMENSOES or 'valor' not in parametros:
+        raise ValueError(f"dimensao deve ser uma de {', '.join(DIMENSOES)}, com valor")
+    valor = parametros['valor'] if dimensao == 'resultado' else int(parametros['valor'].lstrip('Pp'))
+    serie = _agregados.serie(dimensao, valor, granularidade, int(parametros.get('ultimos', 60)))
+    return {'granularidade': granularidade, 'dimensao': dimensao, 'valor': valor, 'serie': serie}
+
+# --- 3. LINHA DE COMANDO (lê um checkpoint) ---
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Consulta as estatísticas salvas pelo servidor")
+    parser.add_argument('arquivo', nargs='?', default=ARQUIVO_ESTATISTICAS)
+    parser.add_argument('--granularidade', choices=list(GRANULARIDADES), default='hora')
+    parser.add_argument('--dimensao', choices=DIMENSOES, default='porta')
+    args = parser.parse_args()
+
+    agregados_salvos = AgregadosAcesso()
+    if not agregados_salvos.carregar(args.arquivo):
+        print(f"Checkpoint {args.arquivo} não encontrado.")
+        raise SystemExit(1)
+
+    segundos = agregados_salvos.granularidades[args.granularidade][0]
+    for numero, contagens in agregados_salvos.exportar()['granularidades'][args.granularidade].items():
+        inicio = datetime.fromtimestamp(int(numero) * segundos).strftime('%d/%m/%Y %H:%M')
+        pares = sorted(contagens[args.dimensao], key=lambda par: -par[1])
+        print(f"{inicio}  " + ', '.join(f"{valor}: {n}" for valor, n in pares))
+    taxa = agregados_salvos.taxa_negacao()
+    print(f"Taxa de negação hoje (desde 00:00 UTC): {'-' if taxa is None else f'{taxa:.1%}'}")
@@ -0,0 +1,242 @@
+# ======================================================================
+# ARQUIVO: admission.py
+# FUNÇÃO: Controle de admissão do servidor: pool limitado de threads com
+#         fila de tamanho fixo, limites de taxa por porta e por cliente e
+#         espera de conexões sem ocupar threads (seletor). Requisições
+#         recusadas recebem uma resposta de "servidor ocupado".
+# ======================================================================
+
+import queue
+import selectors
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+import protocol
+
+# --- Configuração ---
+TIMEOUT_REJEICAO = 0.05 # Segundos para ler a requisição de uma conexão que será recusada
+
+# --- 1. MÉTRICAS DE ADMISSÃO ---
+
+PROFUNDIDADE_FILA = metrics.registrar_metrica(metrics.Medidor(
+    f'{metrics.PREFIXO}_fila_profundidade', "Conexões aceitas aguardando uma thread do pool."
+))
+REJEITADAS = metrics.registrar_metrica(metrics.Contador(
+    f'{metrics.PREFIXO}_rejeitadas_total',
+    "Requisições recusadas com resposta de servidor ocupado, por motivo.", ('motivo',)
+))
+
+# --- 2. POOL DE THREADS COM FILA LIMITADA ---
+
+class PoolTrabalhadores:
+    """
+    Número fixo de threads consumindo uma fila limitada. submeter() nunca
+    bloqueia: com a fila cheia retorna False e o chamador recusa o trabalho.
+    """
+
+    def __init__(self, funcao, num_threads, tamanho_fila, nome="pool"):
+        self.funcao = funcao
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.threads = [
+            threading.Thread(target=self._executar, name=f"{nome}-{i}", daemon=True)
+            for i in range(num_threads)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submeter(self, *args):
+        # Incrementa antes do put: uma thread pode retirar o item e decrementar antes
+        PROFUNDIDADE_FILA.incrementar()
+        try:
+            self.fila.put_nowait(args)
+        except queue.Full:
+            PROFUNDIDADE_FILA.decrementar()
+            return False
+        return True
+
+    def _executar(self):
+        while True:
+            args = self.fila.get()
+            PROFUNDIDADE_FILA.decrementar()
+            try:
+                self.funcao(*args)
+            except Exception as e:
+                print(f"Erro em thread do pool: {e}")
+
+# --- 3. LIMITES DE TAXA ---
+
+class LimitadorTaxa:
+    """
+    Balde de fichas por chave (ex.: porta ou endereço IP): 'taxa' requisições
+    por segundo em média, com rajadas de até 'rajada' requisições. Baldes
+    parados tempo bastante para encher de novo são descartados.
+    """
+
+    def __init__(self, taxa, rajada=None):
+        self.taxa = taxa
+        self.rajada = rajada or max(1.0, taxa)
+        self.recarga = self.rajada / taxa # Segundos para um balde vazio encher
+        # chave -> [fichas, instante da última atualização], do menos ao mais recente
+        self._baldes = OrderedDict()
+        self._trava = threading.Lock()
+
+    def permitir(self, chave):
+        agora = time.monotonic()
+        with self._trava:
+            # Um balde cheio equivale a um novo: os parados há 'recarga' segundos saem
+            while self._baldes:
+                if agora - next(iter(self._baldes.values()))[1] < self.recarga:
+                    break
+                self._baldes.popitem(last=False)
+
+            balde = self._baldes.get(chave)
+            if balde is None:
+                balde = self._baldes[chave] = [self.rajada, agora]
+            else:
+                self._baldes.move_to_end(chave)
+            fichas = min(self.rajada, balde[0] + (agora - balde[1]) * self.taxa)
+            balde[1] = agora
+            if fichas < 1.0:
+                balde[0] = fichas
+                return False
+            balde[0] = fichas - 1.0
+            return True
+
+_limite_porta = None
+_limite_cliente = None
+
+def configurar_limites(por_porta=None, por_cliente=None):
+    """
+    Define os limites de requisições/s por porta e por endereço de cliente
+    (None desliga o limite).
+    """
+    global _limite_porta, _limite_cliente
+
+    _limite_porta = LimitadorTaxa(por_porta) if por_porta else None
+    _limite_cliente = LimitadorTaxa(por_cliente) if por_cliente else None
+
+def verificar_limites(porta_id, endereco):
+    """
+    Retorna None se a requisição pode seguir, ou o motivo da recusa.
+    """
+    if _limite_porta is not None and not _limite_porta.permitir(porta_id):
+        return 'taxa_porta'
+    if _limite_cliente is not None:
+        ip = endereco[0] if isinstance(endereco, tuple) else endereco
+        if not _limite_cliente.permitir(ip):
+            return 'taxa_cliente'
+    return None
+
+def registrar_rejeicao(motivo):
+    REJEITADAS.incrementar(motivo)
+
+# --- 4. ESPERA DE CONEXÕES (seletor) ---
+
+class EsperaLeitura:
+    """
+    Uma thread com um seletor espera várias conexões ficarem legíveis, sem
+    ocupar uma thread por conexão. pronta(conexao, dados) é chamada quando
+    chegam bytes (ou o cliente encerra); expirou(conexao, dados), após
+    'timeout' segundos sem nada. As funções rodam na thread do seletor e
+    não devem bloquear.
+    """
+
+    def __init__(self, pronta, expirou, timeout, nome="espera"):
+        self.pronta = pronta
+        self.expirou = expirou
+        self.timeout = timeout
+        self._seletor = selectors.DefaultSelector()
+        self._novas = queue.SimpleQueue()
+        self._prazos = OrderedDict() # conexão -> (dados, prazo), em ordem de prazo
+        # Acorda o seletor quando outra thread entrega uma conexão
+        self._despertador, self._campainha = socket.socketpair()
+        self._campainha.setblocking(False)
+        self._seletor.register(self._despertador, selectors.EVENT_READ)
+        threading.Thread(target=self._executar, name=nome, daemon=True).start()
+
+    def esperar(self, conexao, dados=None):
+        self._novas.put((conexao, dados))
+        try:
+            self._campainha.send(b'\0')
+        except BlockingIOError:
+            pass # Já há um aviso pendente
+
+    @staticmethod
+    def _chamar(funcao, conexao, dados):
+        try:
+            funcao(conexao, dados)
+        except Exception as e:
+            print(f"Erro na espera de conexões: {e}")
+            conexao.close()
+
+    def _executar(self):
+        while True:
+            espera = None
+            if self._prazos:
+                espera = max(0.0, next(iter(self._prazos.values()))[1] - time.monotonic())
+            for chave, _ in self._seletor.select(espera):
+                if chave.fileobj is self._despertador:
+                    self._despertador.recv(4096)
+                    continue
+                conexao = chave.fileobj
+                self._seletor.unregister(conexao)
+                dados, _ = self._prazos.pop(conexao)
+                self._chamar(self.pronta, conexao, dados)
+
+            agora = time.monotonic()
+            while True:
+                try:
+                    conexao, dados = self._novas.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    self._seletor.register(conexao, selectors.EVENT_READ)
+                except (ValueError, OSError):
+                    conexao.close() # Já encerrada
+                    continue
+                self._prazos[conexao] = (dados, agora + self.timeout)
+
+            while self._prazos:
+                conexao, (dados, prazo) = next(iter(self._prazos.items()))
+                if prazo > agora:
+                    break
+                del self._prazos[conexao]
+                self._seletor.unregister(conexao)
+                self._chamar(self.expirou, conexao, dados)
+
+# --- 5. RECUSA DE CONEXÕES ---
+
+_recusas = None
+_trava_recusas = threading.Lock()
+
+def _responder_ocupado(conexao, _):
+    try:
+        conexao.setblocking(False)
+        dados_recebidos = protocol.receber_exatamente(conexao, protocol.TAM_MSG_TOTAL)
+        if len(dados_recebidos) == protocol.TAM_MSG_TOTAL:
+            conexao.send(protocol.empacotar_resposta_ocupado(dados_recebidos))
+    except OSError:
+        pass # Mensagem incompleta ou conexão já encerrada
+    finally:
+        conexao.close()
+
+def _fechar(conexao, _):
+    conexao.close()
+
+def recusar_conexao(conexao, endereco=None):
+    """
+    Servidor sobrecarregado: responde "ocupado" à requisição, sem processá-la,
+    em vez de deixar o cliente esperando. A espera pela requisição (até
+    TIMEOUT_REJEICAO) e a resposta ficam com a thread das recusas, sem
+    bloquear a thread que aceita conexões.
+    """
+    global _recusas
+
+    registrar_rejeicao('fila')
+    with _trava_recusas:
+        if _recusas is None:
+            _recusas = EsperaLeitura(_responder_ocupado, _fechar, TIMEOUT_REJEICAO, "recusas")
+    _recusas.esperar(conexao)
@@ -0,0 +1,227 @@
+# ======================================================================
+# ARQUIVO: benchmark.py
+# FUNÇÃO: Gerador de carga e medição de latência do servidor. Dispara
+#         requisições de acesso/cadastro a partir de vários processos e
+#         conexões e emite um relatório em JSON.
+# ======================================================================
+
+import argparse
+import json
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from array import array
+
+import protocol
+import server_data
+from client_lib import HOST, PORT, ConexaoPersistente
+
+# --- 1. CONFIGURAÇÃO DA CARGA ---
+
+def interpretar_pesos_portas(texto):
+    """
+    "1:5,2:3,3:1" -> ([1, 2, 3], [5, 3, 1]). Sem pesos, todas as portas P1-P5
+    têm a mesma probabilidade.
+    """
+    if not texto:
+        return [1, 2, 3, 4, 5], [1, 1, 1, 1, 1]
+    portas, pesos = [], []
+    for item in texto.split(','):
+        porta, _, peso = item.partition(':')
+        portas.append(int(porta.lstrip('Pp')))
+        pesos.append(float(peso) if peso else 1.0)
+    return portas, pesos
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    indice = min(len(valores_ordenados) - 1, max(0, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[indice]
+
+# --- 2. EXECUÇÃO (processos e conexões) ---
+
+def _executar_conexao(config, semente, resultado, trava):
+    """
+    Uma conexão de carga: envia requisições até o fim da duração, respeitando
+    o intervalo entre envios quando há taxa alvo. Com taxa alvo a latência é
+    medida a partir do instante agendado (evita omissão coordenada).
+    """
+    aleatorio = random.Random(semente)
+    portas, pesos = config['portas'], config['pesos']
+    credenciais = config['credenciais']
+    intervalo = config['intervalo']
+
+    latencias = array('d')
+    erros = {}
+    contagem = {'acesso': 0, 'cadastro': 0, 'autorizados': 0}
+
+    conexao = ConexaoPersistente(config['host'], config['port'], config['timeout']) if config['keep_alive'] else None
+    inicio = time.perf_counter()
+    fim = inicio + config['duracao']
+    agendado = inicio + aleatorio.random() * intervalo # Espalha o início das conexões
+
+    while True:
+        if intervalo:
+            espera = agendado - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            referencia = agendado
+            agendado += intervalo
+        else:
+            referencia = time.perf_counter()
+        if referencia >= fim:
+            break
+
+        porta_id = aleatorio.choices(portas, pesos)[0]
+        if aleatorio.random() < config['fracao_cadastro']:
+            tipo_msg, credencial, chave = 1, 0, 'cadastro'
+        else:
+            tipo_msg, credencial, chave = 0, aleatorio.choice(credenciais), 'acesso'
+
+        try:
+            if conexao is not None:
+                resposta = conexao.enviar(tipo_msg, porta_id, "BENCHMARK", credencial)
+            else:
+                with socket.create_connection((config['host'], config['port']), config['timeout']) as s:
+                    s.sendall(protocol.empacotar_requisicao_cliente(tipo_msg, porta_id, "BENCHMARK", credencial))
+                    resposta_bytes = protocol.receber_exatamente(s, protocol.TAM_MSG_TOTAL)
+                if len(resposta_bytes) != protocol.TAM_MSG_TOTAL:
+                    raise ConnectionError("resposta incompleta")
+                resposta = protocol.desempacotar_mensagem(resposta_bytes)
+        except Exception as e:
+            nome_erro = type(e).__name__
+            erros[nome_erro] = erros.get(nome_erro, 0) + 1
+            if conexao is not None:
+                conexao.fechar() # Reconecta na próxima requisição
+            continue
+
+        latencias.append(time.perf_counter() - referencia)
+        contagem[chave] += 1
+        contagem['autorizados'] += resposta['autorizacao']
+
+    if conexao is not None:
+        conexao.fechar()
+
+    with trava:
+        resultado['latencias'].extend(latencias)
+        for nome_erro, n in erros.items():
+            resultado['erros'][nome_erro] = resultado['erros'].get(nome_erro, 0) + n
+        for chave, n in contagem.items():
+            resultado[chave] += n
+
+def executar_processo(config, indice_processo):
+    """
+    Processo de carga: abre config['conexoes'] conexões em threads.
+    Retorna as latências (bytes de um array 'd') e os contadores.
+    """
+    resultado = {'latencias': array('d'), 'erros': {}, 'acesso': 0, 'cadastro': 0, 'autorizados': 0}
+    trava = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=_executar_conexao,
+            args=(config, config['semente'] + indice_processo * 1000 + i, resultado, trava)
+        )
+        for i in range(config['conexoes'])
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    resultado['latencias'] = resultado['latencias'].tobytes()
+    return resultado
+
+def executar_benchmark(host=HOST, port=PORT, processos=4, conexoes=8, duracao=10.0,
+                       taxa=None, fracao_cadastro=0.0, portas=None, credenciais=None,
+                       keep_alive=False, timeout=5.0, semente=0):
+    """
+    Executa a carga e retorna o relatório (dicionário serializável em JSON).
+    taxa: requisições por segundo no total (None = o mais rápido possível).
+    """
+    portas_lista, pesos = interpretar_pesos_portas(portas)
+    if not credenciais:
+        credenciais = list(server_data.ler_arquivo_credenciais()) or list(range(1000, 10000))
+
+    total_conexoes = processos * conexoes
+    config = {
+        'host': host, 'port': port, 'duracao': duracao, 'conexoes': conexoes,
+        'intervalo': total_conexoes / taxa if taxa else 0.0,
+        'fracao_cadastro': fracao_cadastro, 'portas': portas_lista, 'pesos': pesos,
+        'credenciais': credenciais, 'keep_alive': keep_alive, 'timeout': timeout,
+        'semente': semente
+    }
+
+    inicio = time.perf_counter()
+    with multiprocessing.Pool(processos) as pool:
+        parciais = pool.starmap(executar_processo, [(config, i) for i in range(processos)])
+    decorrido = time.perf_counter() - inicio
+
+    latencias = array('d')
+    erros = {}
+    contagem = {'acesso': 0, 'cadastro': 0, 'autorizados': 0}
+    for parcial in parciais:
+        latencias.frombytes(parcial['latencias'])
+        for nome_erro, n in parcial['erros'].items():
+            erros[nome_erro] = erros.get(nome_erro, 0) + n
+        for chave in contagem:
+            contagem[chave] += parcial[chave]
+
+    ordenadas = sorted(latencias)
+    ms = lambda segundos: round(segundos * 1000, 3)
+
+    return {
+        'configuracao': {
+            'host': host, 'port': port, 'processos': processos, 'conexoes_por_processo': conexoes,
+            'duracao_s': duracao, 'taxa_alvo_rps': taxa, 'fracao_cadastro': fracao_cadastro,
+            'portas': dict(zip(portas_lista, pesos)), 'keep_alive': keep_alive
+        },
+        'requisicoes': len(ordenadas),
+        'por_tipo': {'acesso': contagem['acesso'], 'cadastro': contagem['cadastro']},
+        'autorizados': contagem['autorizados'],
+        'erros': erros,
+        'total_erros': sum(erros.values()),
+        'duracao_real_s': round(decorrido, 3),
+        'vazao_rps': round(len(ordenadas) / duracao, 1) if duracao else 0.0,
+        'latencia_ms': {
+            'media': ms(sum(ordenadas) / len(ordenadas)) if ordenadas else 0.0,
+            'p50': ms(percentil(ordenadas, 50)),
+            'p95': ms(percentil(ordenadas, 95)),
+            'p99': ms(percentil(ordenadas, 99)),
+            'max': ms(ordenadas[-1]) if ordenadas else 0.0
+        }
+    }
+
+# --- 3. LINHA DE COMANDO ---
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gerador de carga do servidor de controle de acesso")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--processos', type=int, default=4, help="processos geradores de carga")
+    parser.add_argument('--conexoes', type=int, default=8, help="conexões simultâneas por processo")
+    parser.add_argument('--duracao', type=float, default=10.0, help="segundos de carga")
+    parser.add_argument('--taxa', type=float, help="requisições/s no total (padrão: máximo)")
+    parser.add_argument('--cadastro', type=float, default=0.0,
+                        help="fração de requisições de cadastro (0 a 1)")
+    parser.add_argument('--portas', help="distribuição das portas, ex.: 1:5,2:3,3:1")
+    parser.add_argument('--credenciais', type=lambda t: [int(c) for c in t.split(',')],
+                        help="credenciais usadas nos acessos (padrão: as do credentials.txt)")
+    parser.add_argument('--keep-alive', action='store_true',
+                        help="reutiliza a conexão (servidor com --keep-alive)")
+    parser.add_argument('--timeout', type=float, default=5.0, help="timeout por requisição (s)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args()
+
+    relatorio = executar_benchmark(
+        args.host, args.port, args.processos, args.conexoes, args.duracao, args.taxa,
+        args.cadastro, args.portas, args.credenciais, args.keep_alive, args.timeout, args.semente
+    )
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            f.write(texto + '\n')
+    print(texto)
@@ -0,0 +1,277 @@
+# ======================================================================
+# ARQUIVO: binary_log.py
+# FUNÇÃO: Registro de acessos em formato binário compacto: registros fixos
+#         de 8 bytes com o mesmo layout de bits do cabeçalho + data/hora do
+#         protocolo. Acesso aleatório via mmap, leitura colunar com NumPy
+#         (opcional) e conversão de/para o formato texto.
+# ======================================================================
+
+import mmap
+import os
+import sys
+from datetime import datetime
+
+import protocol
+
+try:
+    import numpy as np # Leitura vetorizada (opcional)
+except ImportError:
+    np = None
+
+# --- Configuração ---
+ARQUIVO_REGISTRO_BINARIO = 'register_acess.bin'
+TAM_REGISTRO = protocol.TAM_CABECALHO_E_DATA_BYTES # 8 bytes
+FORMATO_DATA_HORA = '%d/%m/%Y %H:%M:%S'
+
+# --- 1. FORMATO DO REGISTRO ---
+# Um registro são os 8 primeiros bytes de uma resposta do servidor:
+# 3 bytes de controle (Tipo, Porta, Autorização, Credencial) e 5 bytes de
+# data/hora (37 bits), em Big Endian. Autorização guarda o resultado
+# (1 = autorizado) e, no cadastro, Credencial é a credencial gerada, como
+# no registro em texto. Lido como um inteiro de 64 bits, a data/hora ocupa
+# os 40 bits menos significativos e o controle os 24 seguintes.
+
+_BITS_DATA_HORA = 8 * (TAM_REGISTRO - 3) # 40
+
+def _layout(*campos):
+    """
+    [(nome, bits), ...] do menos para o mais significativo ->
+    [(nome, deslocamento, máscara), ...]
+    """
+    resultado, deslocamento = [], 0
+    for nome, bits in campos:
+        resultado.append((nome, deslocamento, (1 << bits) - 1))
+        deslocamento += bits
+    return tuple(resultado)
+
+_CAMPOS_DATA_HORA = _layout(
+    ('segundo', protocol.TAM_SEGUNDO), ('minuto', protocol.TAM_MINUTO), ('hora', protocol.TAM_HORA),
+    ('dia', protocol.TAM_DIA), ('mes', protocol.TAM_MES), ('ano', protocol.TAM_ANO)
+)
+_CAMPOS_CABECALHO = tuple(
+    (nome, _BITS_DATA_HORA + deslocamento, mascara)
+    for nome, deslocamento, mascara in _layout(
+        ('credencial', protocol.TAM_CREDENCIAL), ('autorizacao', protocol.TAM_AUTORIZACAO),
+        ('porta', protocol.TAM_PORTA), ('tipo_msg', protocol.TAM_TIPO_MSG)
+    )
+)
+_CAMPOS = _CAMPOS_CABECALHO + _CAMPOS_DATA_HORA
+
+def _verificar_faixa(nome, valor, bits):
+    """
+    ValueError se 'valor' não cabe no campo de 'bits' bits (transbordaria
+    para o campo vizinho ao ser deslocado).
+    """
+    if not 0 <= valor < 1 << bits:
+        raise ValueError(f"{nome} fora da faixa (0 a {(1 << bits) - 1}): {valor}")
+
+def empacotar_data_hora(instante):
+    """
+    datetime -> 5 bytes de data/hora no layout do protocolo.
+    """
+    valores = {
+        'segundo': instante.second, 'minuto': instante.minute, 'hora': instante.hour,
+        'dia': instante.day, 'mes': instante.month, 'ano': instante.year - 2000
+    }
+    data_hora = 0
+    for nome, deslocamento, _ in _CAMPOS_DATA_HORA:
+        data_hora |= valores[nome] << deslocamento
+    return data_hora.to_bytes(TAM_REGISTRO - 3, 'big')
+
+def empacotar_registro(tipo_msg, porta, autorizacao, credencial, data_hora_bytes):
+    """
+    Monta um registro de 8 bytes. 'data_hora_bytes' são os 5 bytes de
+    data/hora como vieram na mensagem (sem decodificar).
+    """
+    cabecalho = (tipo_msg << protocol._SHIFT_TIPO_MSG) \
+        | (porta << protocol._SHIFT_PORTA) \
+        | (autorizacao << protocol._SHIFT_AUTORIZACAO) \
+        | (credencial << protocol._SHIFT_CREDENCIAL)
+    return cabecalho.to_bytes(3, 'big') + bytes(data_hora_bytes)
+
+def desempacotar_registro(registro):
+    """
+    8 bytes -> dicionário no mesmo formato de log_query.interpretar_linha
+    (mais o tipo da mensagem). Retorna None se a data/hora for inválida.
+    """
+    valor = int.from_bytes(registro, 'big')
+    c = {nome: (valor >> deslocamento) & mascara for nome, deslocamento, mascara in _CAMPOS}
+    try:
+        data_hora = datetime(c['ano'] + 2000, c['mes'], c['dia'], c['hora'], c['minuto'], c['segundo'])
+    except ValueError:
+        return None
+    return {
+        'data_hora': data_hora,
+        'porta': c['porta'],
+        'credencial': c['credencial'],
+        'resultado': 'autorizado' if c['autorizacao'] == 1 else 'negado',
+        'tipo_msg': c['tipo_msg']
+    }
+
+# --- 2. LEITURA (mmap, acesso por número do registro) ---
+
+class RegistroBinario:
+    """
+    Visão somente-leitura de um registro binário mapeado em memória.
+    registro[i] decodifica apenas o i-ésimo registro (deslocamento i * 8).
+    Um registro final incompleto (gravação interrompida) é ignorado.
+    Como o arquivo só cresce, atualizar() remapeia para ver os novos registros.
+    """
+
+    def __init__(self, caminho=ARQUIVO_REGISTRO_BINARIO):
+        self.caminho = caminho
+        self._arquivo = open(caminho, 'rb')
+        self._mapa = None
+        self.atualizar()
+
+    def atualizar(self):
+        tamanho = os.fstat(self._arquivo.fileno()).st_size
+        if self._mapa is not None:
+            self._mapa.close()
+        # mmap não aceita arquivo vazio
+        self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else None
+        self._total = tamanho // TAM_REGISTRO
+        return self._total
+
+    def fechar(self):
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def __len__(self):
+        return self._total
+
+    def bruto(self, indice):
+        """
+        Os 8 bytes do registro 'indice' (aceita índices negativos).
+        """
+        if indice < 0:
+            indice += self._total
+        if not 0 <= indice < self._total:
+            raise IndexError(indice)
+        inicio = indice * TAM_REGISTRO
+        return self._mapa[inicio:inicio + TAM_REGISTRO]
+
+    def __getitem__(self, indice):
+        return desempacotar_registro(self.bruto(indice))
+
+    def __iter__(self):
+        for indice in range(self._total):
+            registro = self[indice]
+            if registro is not None:
+                yield registro
+
+# --- 3. LEITURA COLUNAR (NumPy) ---
+
+def carregar_colunas(caminho=ARQUIVO_REGISTRO_BINARIO, inicio=0, quantidade=None):
+    """
+    Lê os registros [inicio, inicio + quantidade) em arrays NumPy, um por
+    campo (tipo_msg, porta, autorizacao, credencial, ano, mes, dia, hora,
+    minuto, segundo) mais 'instante' (datetime64[s]). A decodificação é
+    vetorizada: milhões de registros em uma fração de segundo.
+    """
+    if np is None:
+        raise RuntimeError("carregar_colunas requer NumPy (pip install numpy).")
+
+    total = os.path.getsize(caminho) // TAM_REGISTRO
+    inicio = min(inicio, total)
+    quantidade = total - inicio if quantidade is None else min(quantidade, total - inicio)
+    if quantidade:
+        valores = np.memmap(caminho, dtype='>u8', mode='r', offset=inicio * TAM_REGISTRO, shape=(quantidade,))
+    else:
+        valores = np.zeros(0, dtype='>u8')
+    valores = valores.astype(np.uint64) # Ordem de bytes nativa para os deslocamentos
+
+    colunas = {}
+    for nome, deslocamento, mascara in _CAMPOS:
+        tipo = np.uint16 if mascara > 0xFF else np.uint8
+        colunas[nome] = ((valores >> np.uint64(deslocamento)) & np.uint64(mascara)).astype(tipo)
+    colunas['ano'] = colunas['ano'] + np.uint16(2000)
+
+    # Data/hora -> datetime64 (datas inválidas viram NaT)
+    ano = colunas['ano'].astype('int64')
+    mes = colunas['mes'].astype('int64')
+    validas = (mes >= 1) & (mes <= 12) & (colunas['dia'] >= 1)
+    meses = np.where(validas, (ano - 1970) * 12 + mes - 1, 0).astype('datetime64[M]')
+    dias = meses.astype('datetime64[D]') + (colunas['dia'].astype('int64') - 1).astype('timedelta64[D]')
+    segundos = (colunas['hora'].astype('int64') * 3600 + colunas['minuto'].astype('int64') * 60
+                + colunas['segundo'].astype('int64'))
+    instante = dias.astype('datetime64[s]') + segundos.astype('timedelta64[s]')
+    colunas['instante'] = np.where(validas, instante, np.datetime64('NaT'))
+    return colunas
+
+# --- 4. CONVERSÃO DE/PARA O FORMATO TEXTO ---
+
+def texto_para_binario(origem, destino):
+    """
+    Converte o registro em texto para binário (acrescentando a 'destino').
+    O texto não guarda o tipo da mensagem: os registros ficam com Tipo = 0.
+    Linhas malformadas são ignoradas; porta, credencial ou ano que não cabem
+    nos campos do registro levantam ValueError (com o número da linha).
+    Retorna o número de registros gravados.
+    """
+    total = 0
+    with open(origem, encoding='utf-8', errors='replace') as entrada, open(destino, 'ab') as saida:
+        lote = []
+        for numero, linha in enumerate(entrada, 1):
+            partes = [p.strip() for p in linha.split(',')]
+            if len(partes) != 4:
+                continue
+            try:
+                instante = datetime.strptime(partes[0], FORMATO_DATA_HORA)
+                porta = int(partes[1].lstrip('Pp'))
+                credencial = int(partes[2])
+            except ValueError:
+                continue
+            try:
+                _verificar_faixa('porta', porta, protocol.TAM_PORTA)
+                _verificar_faixa('credencial', credencial, protocol.TAM_CREDENCIAL)
+                _verificar_faixa('ano', instante.year - 2000, protocol.TAM_ANO)
+            except ValueError as e:
+                raise ValueError(f"{origem}, linha {numero}: {e}") from None
+            autorizacao = 1 if partes[3] == 'autorizado' else 0
+            lote.append(empacotar_registro(0, porta, autorizacao, credencial, empacotar_data_hora(instante)))
+            if len(lote) >= 4096:
+                saida.write(b''.join(lote))
+                total += len(lote)
+                lote.clear()
+        saida.write(b''.join(lote))
+        total += len(lote)
+    return total
+
+def binario_para_texto(origem, destino):
+    """
+    Converte o registro binário para o formato texto (acrescentando a 'destino').
+    Retorna o número de registros gravados.
+    """
+    total = 0
+    with RegistroBinario(origem) as registros, open(destino, 'a') as saida:
+        for registro in registros:
+            saida.write(f"{registro['data_hora'].strftime(FORMATO_DATA_HORA)}, P{registro['porta']}, "
+                        f"{registro['credencial']}, {registro['resultado']}\n")
+            total += 1
+    return total
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] not in ('para-binario', 'para-texto'):
+        print("Uso: python binary_log.py para-binario <register_acess.txt> <register_acess.bin>")
+        print("     python binary_log.py para-texto <register_acess.bin> <register_acess.txt>")
+        sys.exit(1)
+
+    _, comando, origem, destino = sys.argv
+    if comando == 'para-binario':
+        try:
+            total = texto_para_binario(origem, destino)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            sys.exit(1)
+    else:
+        total = binario_para_texto(origem, destino)
+    print(f"{total} registros convertidos de {origem} para {destino}.")
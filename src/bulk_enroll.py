@@ -0,0 +1,111 @@
+# ======================================================================
+# ARQUIVO: bulk_enroll.py
+# FUNÇÃO: Cadastro em massa a partir de um CSV (nome,nivel). Offline, aloca
+#         todos os códigos de uma vez e grava o arquivo de credenciais em
+#         uma única escrita; com --remoto, envia cadastros em lote ao
+#         servidor.
+# ======================================================================
+
+import argparse
+import csv
+import sys
+import time
+
+import protocol
+import server_data
+
+NIVEL_MAX = (1 << protocol.TAM_PORTA) - 1 # O nível viaja no campo Porta (4 bits)
+
+# --- 1. LEITURA DO CSV ---
+
+def ler_cadastros(caminho):
+    """
+    Lê um CSV com as colunas nome,nivel (um cabeçalho opcional é ignorado).
+    Retorna (cadastros [(nome, nivel)], erros [texto]). Vírgulas no nome são
+    trocadas por espaço, pois separam os campos no credentials.txt.
+    """
+    cadastros, erros = [], []
+    with open(caminho, newline='', encoding='utf-8') as f:
+        for numero, linha in enumerate(csv.reader(f), start=1):
+            if not linha or not ''.join(linha).strip():
+                continue
+            if len(linha) != 2:
+                erros.append(f"linha {numero}: esperado nome,nivel")
+                continue
+            nome, nivel = linha[0].replace(',', ' ').strip(), linha[1].strip()
+            if not nivel.isdigit():
+                if numero != 1: # Linha 1 não numérica: cabeçalho
+                    erros.append(f"linha {numero}: nível inválido {nivel!r}")
+                continue
+            if not 1 <= int(nivel) <= NIVEL_MAX:
+                erros.append(f"linha {numero}: nível {nivel} fora de 1-{NIVEL_MAX}")
+            elif not nome or not nome.isascii() or len(nome) > protocol.TAM_NOME_BYTES:
+                erros.append(f"linha {numero}: nome vazio, não ASCII ou com mais de "
+                             f"{protocol.TAM_NOME_BYTES} caracteres")
+            else:
+                cadastros.append((nome, int(nivel)))
+    return cadastros, erros
+
+# --- 2. CADASTRO ---
+
+def cadastrar_offline(cadastros):
+    """
+    Aloca e grava todos os cadastros de uma vez (tudo ou nada). Pode rodar
+    com o servidor no ar: as travas de arquivo são as mesmas do servidor.
+    """
+    return server_data.gerar_credenciais_em_lote(cadastros)
+
+def cadastrar_remoto(cadastros, host, port):
+    """
+    Envia os cadastros ao servidor em lotes de até protocol.LOTE_MAX.
+    """
+    from client_lib import ClienteAcesso
+
+    with ClienteAcesso(host, port, tamanho_pool=1, timeout=30.0, keep_alive=False) as cliente:
+        codigos = cliente.cadastrar_lote([(nivel, nome) for nome, nivel in cadastros])
+    falhas = codigos.count(None)
+    return codigos, f"{len(codigos) - falhas} cadastradas, {falhas} negadas"
+
+# --- 3. LINHA DE COMANDO ---
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cadastro em massa a partir de um CSV (nome,nivel)")
+    parser.add_argument('csv', help="arquivo CSV com as colunas nome,nivel")
+    parser.add_argument('--saida', help="grava codigo,nome,nivel dos cadastros neste arquivo (padrão: tela)")
+    parser.add_argument('--credenciais-mmap', metavar='ARQUIVO',
+                        help="cadastra no armazém binário em vez de credentials.txt")
+    parser.add_argument('--remoto', action='store_true',
+                        help="envia ao servidor (cadastro em lote) em vez de gravar localmente")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=65432)
+    args = parser.parse_args()
+
+    cadastros, erros = ler_cadastros(args.csv)
+    if erros:
+        # Nada é cadastrado se o arquivo tiver erros
+        for erro in erros:
+            print(f"ERRO: {erro}")
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    if args.remoto:
+        codigos, msg = cadastrar_remoto(cadastros, args.host, args.port)
+    else:
+        if args.credenciais_mmap:
+            server_data.configurar_armazem_mmap(args.credenciais_mmap)
+        codigos, msg = cadastrar_offline(cadastros)
+    decorrido = time.perf_counter() - inicio
+
+    if codigos is None:
+        print(f"ERRO: {msg}. Nenhum cadastro foi feito.")
+        sys.exit(1)
+
+    saida = open(args.saida, 'w', newline='') if args.saida else sys.stdout
+    try:
+        escritor = csv.writer(saida)
+        for codigo, (nome, nivel) in zip(codigos, cadastros):
+            escritor.writerow([codigo if codigo is not None else '', nome, nivel])
+    finally:
+        if args.saida:
+            saida.close()
+    print(f"{msg} em {decorrido:.2f}s.", file=sys.stderr)
@@ -4,15 +4,11 @@
 #         Recebe entrada do usuário, envia requisição e imprime resposta.
 # ======================================================================
 
-import socket
+import argparse
 import sys
 
 import protocol
-from server_data import ARQUIVO_CREDENCIAS
-
-# rede
-HOST = '127.0.0.1'  # mesmo endereço do servidor
-PORT = 65432        # mesma porta do servidor
+from client_lib import HOST, PORT, ClienteAcesso, FalhaConexao
 
 def obter_identificacao_porta():
     while True:
@@ -53,7 +49,7 @@ def obter_dados_usuario(porta_id):
         else:
             print("Opção inválida. Escolha 'A' para Acessar ou 'C' para Cadastrar-se.")
 
-def iniciar_cliente():    
+def iniciar_cliente(host=HOST, port=PORT):    
     # 1. OBTER DADOS INICIAIS
     porta_id = obter_identificacao_porta()
     tipo_msg, nome, credencial_envio = obter_dados_usuario(porta_id)
@@ -61,60 +57,47 @@ def iniciar_cliente():
     print("-" * 40)
     print(f"Conectando ao servidor...")
 
-    # 2. CONFIGURAR E CONECTAR O SOCKET
-    try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM) # SOCK_STREAM (TCP)
-        client_socket.connect((HOST, PORT))
-    except Exception as e:
-        print(f"ERRO: Não foi possível conectar ao servidor em {HOST}:{PORT}. Certifique-se de que o servidor está rodando.")
-        print(f"Detalhe do erro: {e}")
-        return
-
-    # 3. EMPACOTAR E ENVIAR DADOS
+    # 2 a 6. CONECTAR, ENVIAR, RECEBER E ENCERRAR (via biblioteca cliente)
+    # Uma tentativa de conexão, sem reutilizar a conexão depois da resposta
+    cliente = ClienteAcesso(host, port, tamanho_pool=1, tentativas=1, keep_alive=False)
     try:
-        # criando pacote de 58 bytes
-        requisicao_bytes = protocol.empacotar_requisicao_cliente(
-            tipo_msg, porta_id, nome, credencial_envio
-        )
-        
-        client_socket.sendall(requisicao_bytes)
-        
-        # 4. RECEBER A RESPOSTA
-        # cliente espera a mesma quantidade de bytes (58)
-        resposta_bytes = client_socket.recv(protocol.TAM_MSG_TOTAL)
-        
-        if len(resposta_bytes) != protocol.TAM_MSG_TOTAL:
-            print("ERRO: Resposta incompleta ou inválida recebida do servidor.")
-            return
+        resposta_dados = cliente.requisitar(tipo_msg, porta_id, nome, credencial_envio)
 
-        # 5. DESEMPACOTAR E IMPRIMIR RESPOSTA
-        resposta_dados = protocol.desempacotar_mensagem(resposta_bytes)
-        
-        print("-" * 40)
-        
-        if tipo_msg == 0: # ACESSO
-            if resposta_dados['autorizacao'] == 1:
-                print(f"✅ ACESSO AUTORIZADO! Porta P{porta_id} aberta.")
-            else:
-                print("❌ ACESSO NEGADO! Credencial ou nível insuficiente.")
-                
-        elif tipo_msg == 1: # CADASTRO
-            if resposta_dados['autorizacao'] == 1:
-                nova_credencial = resposta_dados['credencial']
-                print(f"✅ CADASTRO REALIZADO COM SUCESSO na Porta P{porta_id}!")
-                print(f"Sua nova Credencial é: {nova_credencial}")
-                print(f"(Seu Nível de Acesso é {porta_id}). Use esta credencial para acessar.")
-            else:
-                print("❌ CADASTRO NEGADO. Motivo desconhecido ou falha do servidor.")
+    except FalhaConexao as e:
+        print(f"ERRO: Não foi possível conectar ao servidor em {host}:{port}. Certifique-se de que o servidor está rodando.")
+        print(f"Detalhe do erro: {e.__cause__}")
+        return
 
     except Exception as e:
         print(f"Erro durante a comunicação: {e}")
-        
-    finally:
-        # 6. ENCERRAR CONEXÃO
-        client_socket.close()
         print("-" * 40)
         print("Conexão encerrada.")
+        return
+
+    # IMPRIMIR RESPOSTA
+    print("-" * 40)
+    
+    if tipo_msg == 0: # ACESSO
+        if resposta_dados['autorizacao'] == 1:
+            print(f"✅ ACESSO AUTORIZADO! Porta P{porta_id} aberta.")
+        else:
+            print("❌ ACESSO NEGADO! Credencial ou nível insuficiente.")
+            
+    elif tipo_msg == 1: # CADASTRO
+        if resposta_dados['autorizacao'] == 1:
+            nova_credencial = resposta_dados['credencial']
+            print(f"✅ CADASTRO REALIZADO COM SUCESSO na Porta P{porta_id}!")
+            print(f"Sua nova Credencial é: {nova_credencial}")
+            print(f"(Seu Nível de Acesso é {porta_id}). Use esta credencial para acessar.")
+        else:
+            print("❌ CADASTRO NEGADO. Motivo desconhecido ou falha do servidor.")
+
+    print("-" * 40)
+    print("Conexão encerrada.")
 
 if __name__ == '__main__':
-    iniciar_cliente()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Terminal de acesso (cliente)")
+    parser.add_argument('--host', default=HOST, help="endereço do servidor ou do gateway")
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args()
+    iniciar_cliente(args.host, args.port)
\ No newline at end of file
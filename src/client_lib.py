@@ -0,0 +1,525 @@
+# ======================================================================
+# ARQUIVO: client_lib.py
+# FUNÇÃO: Biblioteca cliente do protocolo de controle de acesso, para uso
+#         programático (gateways, testes de carga): pool de conexões,
+#         timeouts por requisição, novas tentativas com espera exponencial
+#         e interfaces bloqueante e asyncio.
+# ======================================================================
+
+import asyncio
+import itertools
+import queue
+import random
+import socket
+import threading
+import time
+
+import protocol
+
+# rede
+HOST = '127.0.0.1'  # mesmo endereço do servidor
+PORT = 65432        # mesma porta do servidor
+
+# Tipos de mensagem
+TIPO_ACESSO = 0
+TIPO_CADASTRO = 1
+
+class FalhaConexao(ConnectionError):
+    """
+    Não foi possível conectar ao servidor depois de todas as tentativas.
+    """
+
+class RespostaPerdida(FalhaConexao):
+    """
+    A conexão falhou depois de a requisição ser enviada: o servidor pode tê-la
+    processado. Não é repetida automaticamente (um cadastro seria feito duas
+    vezes, com duas credenciais).
+    """
+
+class PoolEsgotado(Exception):
+    """
+    Nenhuma conexão do pool ficou livre dentro do timeout. Nada foi enviado
+    e o servidor não falhou: só há requisições demais em andamento.
+    """
+
+class ServidorOcupado(Exception):
+    """
+    O servidor recusou a requisição por sobrecarga ou limite de taxa
+    (resposta "ocupado"); ela não foi processada e pode ser repetida.
+    """
+
+def _verificar_ocupado(resposta):
+    if protocol.resposta_ocupado(resposta['autorizacao'], resposta['credencial']):
+        raise ServidorOcupado("Servidor ocupado; tente novamente mais tarde.")
+    return resposta
+
+# --- 1. CONEXÃO PERSISTENTE (keep-alive) ---
+
+class ConexaoPersistente:
+    """
+    Mantém um socket aberto com o servidor para enviar várias requisições,
+    evitando o handshake TCP a cada mensagem. Requer o servidor iniciado
+    com --keep-alive.
+
+    Uso:
+        with ConexaoPersistente() as conexao:
+            resposta = conexao.enviar(0, 3, "Vin", 4298)
+    """
+
+    def __init__(self, host=HOST, port=PORT, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.socket = None
+        self.enviou = False # Alguma requisição foi escrita no socket (ver _enviar)
+
+    def conectar(self):
+        if self.socket is None:
+            self.socket = socket.create_connection((self.host, self.port), self.timeout)
+        return self
+
+    def fechar(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def __enter__(self):
+        return self.conectar()
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def ociosa_viva(self):
+        """
+        Verifica, sem bloquear e sem consumir nada, se uma conexão ociosa
+        ainda pode ser usada: o servidor não a encerrou nem enviou dados
+        fora de hora.
+        """
+        if self.socket is None:
+            return False
+        timeout_anterior = self.socket.gettimeout()
+        self.socket.settimeout(0)
+        try:
+            self.socket.recv(1, socket.MSG_PEEK)
+        except BlockingIOError:
+            return True # Nada a ler: conexão aberta e em dia
+        except OSError:
+            return False
+        finally:
+            self.socket.settimeout(timeout_anterior)
+        return False # b'' (encerrada) ou bytes inesperados
+
+    def _enviar(self, dados):
+        self.enviou = True # A partir daqui o servidor pode ter recebido a requisição
+        self.socket.sendall(dados)
+
+    def _receber_resposta(self):
+        resposta_bytes = protocol.receber_exatamente(self.socket, protocol.TAM_MSG_TOTAL)
+        if len(resposta_bytes) != protocol.TAM_MSG_TOTAL:
+            self.fechar()
+            raise ConnectionError("Resposta incompleta ou inválida recebida do servidor.")
+        return protocol.desempacotar_mensagem(resposta_bytes)
+
+    def enviar(self, tipo_msg, porta_id, nome, credencial):
+        """
+        Envia uma requisição e retorna a resposta desempacotada (dicionário).
+        """
+        self.conectar()
+        self._enviar(protocol.empacotar_requisicao_cliente(
+            tipo_msg, porta_id, nome, credencial
+        ))
+        return self._receber_resposta()
+
+    def enviar_lote(self, requisicoes):
+        """
+        Envia várias requisições (tuplas tipo_msg, porta_id, nome, credencial)
+        em pipeline, sem esperar cada resposta, e retorna as respostas na ordem.
+        """
+        self.conectar()
+        pacote = b''.join(
+            protocol.empacotar_requisicao_cliente(*requisicao) for requisicao in requisicoes
+        )
+        self._enviar(pacote)
+        return [self._receber_resposta() for _ in requisicoes]
+
+    def enviar_cadastro_lote(self, cadastros):
+        """
+        Cadastro em lote: envia o cabeçalho e as mensagens de cadastro
+        (tuplas porta_id, nome) de uma vez e retorna a resposta do cabeçalho
+        e a lista de respostas, na ordem. Até protocol.LOTE_MAX cadastros.
+        """
+        self.conectar()
+        pacote = protocol.empacotar_cabecalho_lote(len(cadastros)) + b''.join(
+            protocol.empacotar_requisicao_cliente(TIPO_CADASTRO, porta_id, nome, 0)
+            for porta_id, nome in cadastros
+        )
+        self._enviar(pacote)
+        cabecalho = self._receber_resposta()
+        if protocol.resposta_ocupado(cabecalho['autorizacao'], cabecalho['credencial']):
+            self.fechar() # As respostas dos itens podem não vir
+            raise ServidorOcupado("Servidor ocupado; tente novamente mais tarde.")
+        return cabecalho, [self._receber_resposta() for _ in cadastros]
+
+    def repassar(self, mensagens_bytes, respostas=1):
+        """
+        Envia mensagens já empacotadas e retorna as 'respostas' respostas de
+        58 bytes concatenadas, sem desempacotar (usada pelo gateway). Se a
+        primeira resposta de várias for "ocupado", retorna só ela e encerra
+        a conexão, pois as demais podem não vir.
+        """
+        self.conectar()
+        self._enviar(mensagens_bytes)
+        primeira = protocol.receber_exatamente(self.socket, protocol.TAM_MSG_TOTAL)
+        if len(primeira) != protocol.TAM_MSG_TOTAL:
+            self.fechar()
+            raise ConnectionError("Resposta incompleta ou inválida recebida do servidor.")
+        if respostas == 1:
+            return primeira
+        visao = protocol.MensagemView(primeira)
+        if protocol.resposta_ocupado(visao.autorizacao, visao.credencial):
+            self.fechar()
+            return primeira
+        restante = protocol.receber_exatamente(self.socket, (respostas - 1) * protocol.TAM_MSG_TOTAL)
+        if len(restante) != (respostas - 1) * protocol.TAM_MSG_TOTAL:
+            self.fechar()
+            raise ConnectionError("Resposta incompleta ou inválida recebida do servidor.")
+        return primeira + restante
+
+# --- 2. CLIENTE BLOQUEANTE COM POOL ---
+
+class ClienteAcesso:
+    """
+    Cliente thread-safe com pool limitado de conexões.
+
+    tamanho_pool: máximo de conexões simultâneas (requisições além disso esperam).
+    timeout:      segundos por requisição (conexão, envio e resposta).
+    tentativas:   tentativas de conexão, com espera exponencial a partir de
+                  'espera_inicial' segundos entre elas.
+    keep_alive:   reutiliza conexões; só com o servidor iniciado com --keep-alive
+                  (sem ele, o servidor encerra a conexão após uma mensagem e a
+                  conexão reaproveitada falharia depois do envio). Desligado,
+                  como o servidor por padrão, cada requisição usa uma conexão
+                  nova e o pool só limita a concorrência.
+    """
+
+    def __init__(self, host=HOST, port=PORT, tamanho_pool=8, timeout=5.0,
+                 tentativas=3, espera_inicial=0.1, keep_alive=False):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.espera_inicial = espera_inicial
+        self.keep_alive = keep_alive
+        self._vagas = threading.BoundedSemaphore(tamanho_pool)
+        self._ociosas = queue.LifoQueue() # Conexões livres (a mais recente primeiro)
+
+    def _conectar(self):
+        espera = self.espera_inicial
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                return ConexaoPersistente(self.host, self.port, self.timeout).conectar()
+            except OSError as e:
+                if tentativa == self.tentativas:
+                    raise FalhaConexao(
+                        f"Não foi possível conectar ao servidor em {self.host}:{self.port} "
+                        f"após {self.tentativas} tentativa(s): {e}"
+                    ) from e
+                time.sleep(espera)
+                espera *= 2
+
+    def _obter_conexao(self):
+        """
+        Uma conexão ociosa do pool ainda aberta (as encerradas pelo servidor
+        são descartadas) ou uma nova.
+        """
+        while True:
+            try:
+                conexao = self._ociosas.get_nowait()
+            except queue.Empty:
+                return self._conectar(), False
+            if conexao.ociosa_viva():
+                return conexao, True
+            conexao.fechar()
+
+    def _usar_conexao(self, operacao, timeout=None):
+        """
+        Executa operacao(conexao) com uma conexão do pool e devolve o resultado.
+        Só tenta outra conexão se uma reutilizada falhar antes de a requisição
+        ser escrita; depois disso levanta RespostaPerdida.
+        """
+        if not self._vagas.acquire(timeout=timeout or self.timeout):
+            raise PoolEsgotado("Nenhuma conexão livre no pool dentro do timeout.")
+        conexao = None
+        try:
+            while True:
+                conexao, reutilizada = self._obter_conexao()
+                conexao.socket.settimeout(timeout or self.timeout)
+                conexao.enviou = False
+                try:
+                    resultado = operacao(conexao)
+                    break
+                except OSError as e: # Inclui ConnectionError e socket.timeout
+                    conexao.fechar()
+                    if conexao.enviou:
+                        raise RespostaPerdida(
+                            f"Conexão com {self.host}:{self.port} falhou após o envio; "
+                            f"a requisição pode ter sido processada: {e}"
+                        ) from e
+                    if not reutilizada:
+                        raise
+
+            if self.keep_alive and conexao.socket is not None:
+                self._ociosas.put(conexao)
+                conexao = None
+            return resultado
+        finally:
+            if conexao is not None:
+                conexao.fechar() # Erro ou sem keep-alive: não volta ao pool
+            self._vagas.release()
+
+    def requisitar(self, tipo_msg, porta_id, nome, credencial, timeout=None):
+        """
+        Envia uma requisição e retorna a resposta desempacotada (dicionário).
+        """
+        resposta = self._usar_conexao(lambda c: c.enviar(tipo_msg, porta_id, nome, credencial), timeout)
+        return _verificar_ocupado(resposta)
+
+    def acessar(self, porta_id, nome, credencial, timeout=None):
+        """
+        Retorna True se o acesso foi autorizado.
+        """
+        resposta = self.requisitar(TIPO_ACESSO, porta_id, nome, credencial, timeout)
+        return resposta['autorizacao'] == 1
+
+    def cadastrar(self, porta_id, nome, timeout=None):
+        """
+        Retorna a nova credencial, ou None se o cadastro foi negado.
+        """
+        resposta = self.requisitar(TIPO_CADASTRO, porta_id, nome, 0, timeout)
+        return resposta['credencial'] if resposta['autorizacao'] == 1 else None
+
+    def cadastrar_lote(self, cadastros, timeout=None):
+        """
+        Cadastra vários usuários (tuplas porta_id, nome) com uma conexão por
+        lote de até protocol.LOTE_MAX. Retorna as novas credenciais na ordem;
+        os cadastros de um lote negado ficam com None.
+        """
+        codigos = []
+        for inicio in range(0, len(cadastros), protocol.LOTE_MAX):
+            parte = cadastros[inicio:inicio + protocol.LOTE_MAX]
+            cabecalho, respostas = self._usar_conexao(lambda c: c.enviar_cadastro_lote(parte), timeout)
+            if cabecalho['autorizacao'] == 1:
+                codigos.extend(resposta['credencial'] for resposta in respostas)
+            else:
+                codigos.extend([None] * len(parte))
+        return codigos
+
+    def repassar(self, mensagens_bytes, respostas=1, timeout=None):
+        """
+        Envia mensagens já empacotadas e retorna as respostas brutas (veja
+        ConexaoPersistente.repassar). Não interpreta "ocupado".
+        """
+        return self._usar_conexao(lambda c: c.repassar(mensagens_bytes, respostas), timeout)
+
+    def fechar(self):
+        while True:
+            try:
+                self._ociosas.get_nowait().fechar()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+# --- 3. CLIENTE ASYNCIO COM POOL ---
+
+class ClienteAcessoAsync:
+    """
+    Versão asyncio de ClienteAcesso, para disparar muitas verificações
+    concorrentes a partir de um loop de eventos. Mesmos parâmetros.
+    """
+
+    def __init__(self, host=HOST, port=PORT, tamanho_pool=8, timeout=5.0,
+                 tentativas=3, espera_inicial=0.1, keep_alive=False):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.espera_inicial = espera_inicial
+        self.keep_alive = keep_alive
+        self._vagas = asyncio.Semaphore(tamanho_pool)
+        self._ociosas = [] # Pares (reader, writer) livres
+
+    async def _conectar(self):
+        espera = self.espera_inicial
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                return await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                if tentativa == self.tentativas:
+                    raise FalhaConexao(
+                        f"Não foi possível conectar ao servidor em {self.host}:{self.port} "
+                        f"após {self.tentativas} tentativa(s): {e}"
+                    ) from e
+                await asyncio.sleep(espera)
+                espera *= 2
+
+    @staticmethod
+    async def _trocar(reader, writer, requisicao_bytes):
+        writer.write(requisicao_bytes)
+        await writer.drain()
+        try:
+            return await reader.readexactly(protocol.TAM_MSG_TOTAL)
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionError("Resposta incompleta ou inválida recebida do servidor.") from e
+
+    @staticmethod
+    async def _fechar_writer(writer):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass # Já encerrada pelo servidor
+
+    async def _obter_conexao(self):
+        while self._ociosas:
+            reader, writer = self._ociosas.pop()
+            if not (reader.at_eof() or writer.is_closing()):
+                return reader, writer
+            await self._fechar_writer(writer) # Encerrada pelo servidor enquanto ociosa
+        return await self._conectar()
+
+    async def requisitar(self, tipo_msg, porta_id, nome, credencial, timeout=None):
+        """
+        Envia uma requisição e retorna a resposta desempacotada (dicionário).
+        Falhas depois do envio levantam RespostaPerdida, sem repetir.
+        """
+        requisicao_bytes = protocol.empacotar_requisicao_cliente(tipo_msg, porta_id, nome, credencial)
+        async with self._vagas:
+            writer = None
+            try:
+                reader, writer = await self._obter_conexao()
+                try:
+                    resposta_bytes = await asyncio.wait_for(
+                        self._trocar(reader, writer, requisicao_bytes), timeout or self.timeout
+                    )
+                except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                    raise RespostaPerdida(
+                        f"Conexão com {self.host}:{self.port} falhou após o envio; "
+                        f"a requisição pode ter sido processada: {e}"
+                    ) from e
+
+                if self.keep_alive:
+                    self._ociosas.append((reader, writer))
+                    writer = None
+            finally:
+                if writer is not None:
+                    await self._fechar_writer(writer)
+            return _verificar_ocupado(protocol.desempacotar_mensagem(resposta_bytes))
+
+    async def acessar(self, porta_id, nome, credencial, timeout=None):
+        resposta = await self.requisitar(TIPO_ACESSO, porta_id, nome, credencial, timeout)
+        return resposta['autorizacao'] == 1
+
+    async def cadastrar(self, porta_id, nome, timeout=None):
+        resposta = await self.requisitar(TIPO_CADASTRO, porta_id, nome, 0, timeout)
+        return resposta['credencial'] if resposta['autorizacao'] == 1 else None
+
+    async def acessar_muitos(self, requisicoes, timeout=None):
+        """
+        Verifica vários acessos (tuplas porta_id, nome, credencial) em paralelo
+        e retorna a lista de resultados na mesma ordem. Erros de uma
+        requisição aparecem como a exceção na posição correspondente.
+        """
+        return await asyncio.gather(
+            *(self.acessar(*requisicao, timeout=timeout) for requisicao in requisicoes),
+            return_exceptions=True
+        )
+
+    async def fechar(self):
+        while self._ociosas:
+            _, writer = self._ociosas.pop()
+            await self._fechar_writer(writer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
+
+# --- 4. CLIENTE UDP ---
+
+class ClienteUDP:
+    """
+    Cliente do transporte UDP (servidor com --udp): cada requisição é um
+    datagrama com um identificador próprio. Sem resposta dentro do timeout,
+    o mesmo datagrama (mesmo id) é retransmitido com espera crescente; o
+    servidor responde retransmissões a partir do seu cache, sem reprocessar.
+    Thread-safe (as requisições do mesmo cliente são serializadas).
+    """
+
+    def __init__(self, host=HOST, port=PORT, timeout=0.5, tentativas=5):
+        self.endereco = (host, port)
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.connect(self.endereco) # Só aceita datagramas vindos do servidor
+        self._trava = threading.Lock()
+        # Início aleatório: ids não se repetem se o cliente reiniciar na mesma porta
+        self._ids = itertools.count(random.getrandbits(32))
+
+    def requisitar(self, tipo_msg, porta_id, nome, credencial):
+        """
+        Envia uma requisição e retorna a resposta desempacotada (dicionário).
+        """
+        mensagem = protocol.empacotar_requisicao_cliente(tipo_msg, porta_id, nome, credencial)
+        with self._trava:
+            id_requisicao = next(self._ids) & 0xFFFFFFFF
+            datagrama = protocol.empacotar_datagrama(mensagem, id_requisicao)
+
+            espera = self.timeout
+            for _ in range(self.tentativas):
+                self.socket.send(datagrama)
+                prazo = time.monotonic() + espera
+                while True:
+                    restante = prazo - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self.socket.settimeout(restante)
+                    try:
+                        resposta = self.socket.recv(protocol.TAM_DATAGRAMA + 1)
+                    except socket.timeout:
+                        break
+                    except ConnectionRefusedError:
+                        break # ICMP: nada escutando ainda; tenta de novo
+                    partes = protocol.desempacotar_datagrama(resposta)
+                    # Respostas atrasadas de requisições anteriores são ignoradas
+                    if partes is not None and partes[0] == id_requisicao:
+                        return _verificar_ocupado(protocol.desempacotar_mensagem(partes[1]))
+                espera *= 2
+
+        raise TimeoutError(
+            f"Sem resposta UDP de {self.endereco[0]}:{self.endereco[1]} "
+            f"após {self.tentativas} tentativa(s)."
+        )
+
+    def acessar(self, porta_id, nome, credencial):
+        return self.requisitar(TIPO_ACESSO, porta_id, nome, credencial)['autorizacao'] == 1
+
+    def cadastrar(self, porta_id, nome):
+        resposta = self.requisitar(TIPO_CADASTRO, porta_id, nome, 0)
+        return resposta['credencial'] if resposta['autorizacao'] == 1 else None
+
+    def fechar(self):
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
@@ -0,0 +1,298 @@
+# ======================================================================
+# ARQUIVO: credential_store.py
+# FUNÇÃO: Armazenamento binário de credenciais em arquivo mapeado em
+#         memória (mmap), com um slot de tamanho fixo por código.
+#         Também é a ferramenta de importação/exportação do formato texto.
+# ======================================================================
+
+import itertools
+import mmap
+import os
+import struct
+import sys
+import threading
+
+import protocol
+
+try:
+    import fcntl # Trava entre processos (apenas em sistemas Unix)
+except ImportError:
+    fcntl = None
+
+# --- 1. FORMATO DO ARQUIVO ---
+# O espaço de credenciais tem 14 bits (protocolo), então o arquivo tem um
+# slot para cada código possível: o endereço do slot é codigo * TAM_SLOT.
+# O código 0 nunca é uma credencial válida e o seu slot guarda o cabeçalho.
+
+NUM_SLOTS = 1 << protocol.TAM_CREDENCIAL    # 16384 códigos
+TAM_SLOT = 64                               # bytes por slot
+TAM_ARQUIVO = NUM_SLOTS * TAM_SLOT          # 1 MiB
+
+# Slot de credencial: Nível(1) | Flags(1) | Nome(50) | Reservado(12)
+FORMATO_SLOT = struct.Struct(f'>BB{protocol.TAM_NOME_BYTES}s')
+FLAG_OCUPADO = 0x01
+
+# Cabeçalho (slot 0): Assinatura(4) | Versão(2) | Próximo código livre (dica)(2)
+FORMATO_CABECALHO = struct.Struct('>4sHH')
+ASSINATURA = b'CRED'
+VERSAO = 1
+
+# --- 2. ARMAZÉM MAPEADO EM MEMÓRIA ---
+
+class ArmazemCredenciais:
+    """
+    Credenciais em um arquivo mapeado em memória, compartilhável entre
+    processos (MAP_SHARED). Consultas e atualizações são leituras e escritas
+    diretas no deslocamento do código, sem interpretação de texto.
+
+    Implementa a interface de dicionário usada por verificar_acesso
+    ('codigo in armazem' e armazem[codigo]['nivel_acesso']).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+        self._fd_trava = None
+        self._pid_trava = None
+
+        novo = not os.path.exists(caminho)
+        self._arquivo = open(caminho, 'w+b' if novo else 'r+b')
+        if novo:
+            self._arquivo.truncate(TAM_ARQUIVO)
+
+        self._mapa = mmap.mmap(self._arquivo.fileno(), TAM_ARQUIVO)
+        assinatura, versao, _ = FORMATO_CABECALHO.unpack_from(self._mapa, 0)
+        if novo:
+            FORMATO_CABECALHO.pack_into(self._mapa, 0, ASSINATURA, VERSAO, 0)
+        elif assinatura != ASSINATURA or versao != VERSAO:
+            self.fechar()
+            raise ValueError(f"{caminho} não é um armazém de credenciais válido.")
+
+    def fechar(self):
+        if self._fd_trava is not None and self._pid_trava == os.getpid():
+            os.close(self._fd_trava)
+            self._fd_trava = None
+        self._mapa.close()
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    # --- Trava exclusiva (threads do processo + outros processos) ---
+
+    def _descritor_trava(self):
+        # Um descritor herdado pelo fork compartilharia a trava com o processo
+        # pai, então cada processo abre o seu próprio.
+        if self._pid_trava != os.getpid():
+            self._fd_trava = os.open(self.caminho, os.O_RDWR)
+            self._pid_trava = os.getpid()
+        return self._fd_trava
+
+    def _travar(self):
+        self._trava.acquire()
+        if fcntl is not None:
+            fcntl.flock(self._descritor_trava(), fcntl.LOCK_EX)
+
+    def _destravar(self):
+        if fcntl is not None:
+            fcntl.flock(self._descritor_trava(), fcntl.LOCK_UN)
+        self._trava.release()
+
+    # --- Leitura ---
+
+    @staticmethod
+    def _codigo_valido(codigo):
+        return isinstance(codigo, int) and 0 < codigo < NUM_SLOTS
+
+    def __contains__(self, codigo):
+        if not self._codigo_valido(codigo):
+            return False
+        # Flags ficam no segundo byte do slot
+        return bool(self._mapa[codigo * TAM_SLOT + 1] & FLAG_OCUPADO)
+
+    def get(self, codigo, padrao=None):
+        if not self._codigo_valido(codigo):
+            return padrao
+        nivel, flags, nome = FORMATO_SLOT.unpack_from(self._mapa, codigo * TAM_SLOT)
+        if not flags & FLAG_OCUPADO:
+            return padrao
+        return {
+            'nome': nome.rstrip(b'\x00').decode('utf-8'),
+            'nivel_acesso': nivel
+        }
+
+    def __getitem__(self, codigo):
+        dados = self.get(codigo)
+        if dados is None:
+            raise KeyError(codigo)
+        return dados
+
+    def keys(self):
+        mapa = self._mapa
+        return [c for c in range(1, NUM_SLOTS) if mapa[c * TAM_SLOT + 1] & FLAG_OCUPADO]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(codigo, self[codigo]) for codigo in self.keys()]
+
+    # --- Escrita ---
+
+    def _gravar_slot(self, codigo, nome, nivel_acesso):
+        nome_bytes = nome.encode('utf-8')
+        if len(nome_bytes) > protocol.TAM_NOME_BYTES:
+            raise ValueError(f"Nome maior que {protocol.TAM_NOME_BYTES} bytes: {nome!r}")
+        deslocamento = codigo * TAM_SLOT
+        # Nome, depois nível e, por último, as flags (um único byte). Leitores
+        # sem trava (outros workers) nunca veem um slot ocupado sem nome, e um
+        # slot regravado não deixa de estar ocupado em momento algum.
+        inicio_nome = deslocamento + 2
+        self._mapa[inicio_nome:inicio_nome + protocol.TAM_NOME_BYTES] = \
+            nome_bytes.ljust(protocol.TAM_NOME_BYTES, b'\x00')
+        self._mapa[deslocamento] = nivel_acesso
+        self._mapa[deslocamento + 1] |= FLAG_OCUPADO
+
+    def gravar(self, codigo, nome, nivel_acesso):
+        if not self._codigo_valido(codigo):
+            raise ValueError(f"Código de credencial inválido: {codigo}")
+        self._travar()
+        try:
+            self._gravar_slot(codigo, nome, nivel_acesso)
+        finally:
+            self._destravar()
+
+    def remover(self, codigo):
+        """
+        Libera o slot; o código volta a estar disponível para alocação.
+        Retorna False se o código não estava cadastrado.
+        """
+        self._travar()
+        try:
+            if codigo not in self:
+                return False
+            self._mapa[codigo * TAM_SLOT + 1] = 0
+            _, _, dica = FORMATO_CABECALHO.unpack_from(self._mapa, 0)
+            if codigo < dica:
+                FORMATO_CABECALHO.pack_into(self._mapa, 0, ASSINATURA, VERSAO, codigo)
+            return True
+        finally:
+            self._destravar()
+
+    def alocar(self, nome, nivel_acesso, minimo, maximo):
+        """
+        Reserva o primeiro código livre em [minimo, maximo] e grava o cadastro.
+        A busca começa na dica guardada no cabeçalho, então normalmente é
+        imediata; a trava de arquivo mantém a alocação única entre processos.
+        """
+        self._travar()
+        try:
+            _, _, dica = FORMATO_CABECALHO.unpack_from(self._mapa, 0)
+            inicio = dica if minimo <= dica <= maximo else minimo
+            mapa = self._mapa
+
+            # Da dica até o fim da faixa e, se preciso, do início até a dica
+            for codigo in itertools.chain(range(inicio, maximo + 1), range(minimo, inicio)):
+                if not mapa[codigo * TAM_SLOT + 1] & FLAG_OCUPADO:
+                    self._gravar_slot(codigo, nome, nivel_acesso)
+                    FORMATO_CABECALHO.pack_into(mapa, 0, ASSINATURA, VERSAO, codigo + 1)
+                    return codigo
+            return None
+        finally:
+            self._destravar()
+
+    def alocar_lote(self, cadastros, minimo, maximo):
+        """
+        Reserva um código para cada (nome, nível) de 'cadastros' sob uma única
+        trava. Tudo ou nada: se não houver códigos livres para todos, nada é
+        gravado e retorna None.
+        """
+        for nome, _ in cadastros:
+            if len(nome.encode('utf-8')) > protocol.TAM_NOME_BYTES:
+                raise ValueError(f"Nome maior que {protocol.TAM_NOME_BYTES} bytes: {nome!r}")
+        self._travar()
+        try:
+            _, _, dica = FORMATO_CABECALHO.unpack_from(self._mapa, 0)
+            inicio = dica if minimo <= dica <= maximo else minimo
+            mapa = self._mapa
+
+            livres = (
+                codigo for codigo in itertools.chain(range(inicio, maximo + 1), range(minimo, inicio))
+                if not mapa[codigo * TAM_SLOT + 1] & FLAG_OCUPADO
+            )
+            codigos = list(itertools.islice(livres, len(cadastros)))
+            if len(codigos) < len(cadastros):
+                return None
+
+            for codigo, (nome, nivel_acesso) in zip(codigos, cadastros):
+                self._gravar_slot(codigo, nome, nivel_acesso)
+            if codigos:
+                FORMATO_CABECALHO.pack_into(mapa, 0, ASSINATURA, VERSAO, codigos[-1] + 1)
+            return codigos
+        finally:
+            self._destravar()
+
+    def definir_dica(self, codigo):
+        """
+        Faz a próxima alocação começar a busca em 'codigo'.
+        """
+        self._travar()
+        try:
+            FORMATO_CABECALHO.pack_into(self._mapa, 0, ASSINATURA, VERSAO, codigo)
+        finally:
+            self._destravar()
+
+    def sincronizar(self):
+        """
+        Força as páginas alteradas para o disco.
+        """
+        self._mapa.flush()
+
+# --- 3. IMPORTAÇÃO / EXPORTAÇÃO DO FORMATO TEXTO ---
+
+def importar_texto(caminho_texto, caminho_binario):
+    """
+    Converte um credentials.txt (código,nome,nível) para o formato binário.
+    Duplicatas e revogações são resolvidas como no servidor: vale o estado final.
+    """
+    import server_data
+
+    credenciais = server_data.ler_arquivo_credenciais(caminho_texto)
+    with ArmazemCredenciais(caminho_binario) as armazem:
+        for codigo, dados in credenciais.items():
+            armazem.gravar(codigo, dados['nome'], dados['nivel_acesso'])
+        if credenciais:
+            # Novos cadastros continuam após o maior código, como no formato texto
+            armazem.definir_dica(max(credenciais) + 1)
+        armazem.sincronizar()
+    return len(credenciais)
+
+def exportar_texto(caminho_binario, caminho_texto):
+    """
+    Gera um arquivo texto com uma linha por credencial cadastrada.
+    """
+    with ArmazemCredenciais(caminho_binario) as armazem:
+        itens = armazem.items()
+    with open(caminho_texto, 'w') as f:
+        for codigo, dados in itens:
+            f.write(f"{codigo},{dados['nome']},{dados['nivel_acesso']}\n")
+    return len(itens)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] not in ('importar', 'exportar'):
+        print("Uso: python credential_store.py importar <credentials.txt> <credentials.bin>")
+        print("     python credential_store.py exportar <credentials.bin> <credentials.txt>")
+        sys.exit(1)
+
+    _, comando, origem, destino = sys.argv
+    if comando == 'importar':
+        total = importar_texto(origem, destino)
+    else:
+        total = exportar_texto(origem, destino)
+    print(f"{total} credenciais convertidas de {origem} para {destino}.")
@@ -0,0 +1,338 @@
+# ======================================================================
+# ARQUIVO: gateway.py
+# FUNÇÃO: Gateway que fala o mesmo protocolo de 58 bytes e distribui as
+#         requisições entre vários servidores: cada grupo de portas (shard)
+#         é atendido por um grupo de servidores, e os cadastros vão ao grupo
+#         de cadastro. Mantém conexões em pool com cada servidor, verifica a
+#         saúde deles e passa ao próximo do grupo quando um cai.
+# ======================================================================
+
+import argparse
+import socket
+import threading
+import time
+
+import admission
+import metrics
+import protocol
+from client_lib import ClienteAcesso, PoolEsgotado, RespostaPerdida
+from replication import interpretar_enderecos
+
+# --- Configuração ---
+HOST = '127.0.0.1'
+PORT = 65432             # Os clientes usam o gateway como se fosse o servidor
+POOL_SERVIDOR = 16       # Conexões mantidas com cada servidor
+TIMEOUT_SERVIDOR = 5.0   # Segundos por requisição repassada
+INTERVALO_SAUDE = 2.0    # Segundos entre verificações de saúde
+TIMEOUT_SAUDE = 1.0
+TIMEOUT_OCIOSO = 30.0    # Conexões de clientes sem mensagens são encerradas
+POOL_THREADS = 64
+TAMANHO_FILA = 256
+
+# --- 1. MÉTRICAS ---
+
+REPASSES = metrics.registrar_metrica(metrics.Contador(
+    f'{metrics.PREFIXO}_gateway_repasses_total', "Requisições repassadas por grupo e servidor.",
+    ('grupo', 'servidor')
+))
+FALHAS_SERVIDOR = metrics.registrar_metrica(metrics.Contador(
+    f'{metrics.PREFIXO}_gateway_falhas_total',
+    "Falhas de servidores (requisição ou verificação de saúde).", ('servidor',)
+))
+SERVIDORES_FORA = metrics.registrar_metrica(metrics.Medidor(
+    f'{metrics.PREFIXO}_gateway_servidores_fora', "Servidores marcados como fora do ar, por grupo.",
+    ('grupo',)
+))
+POOL_ESGOTADO = metrics.registrar_metrica(metrics.Contador(
+    f'{metrics.PREFIXO}_gateway_pool_esgotado_total',
+    "Requisições que não acharam conexão livre com um servidor (passam ao próximo).", ('servidor',)
+))
+NAO_ROTEADAS = metrics.registrar_metrica(metrics.Contador(
+    f'{metrics.PREFIXO}_gateway_nao_roteadas_total',
+    "Requisições respondidas pelo próprio gateway, por motivo.", ('motivo',)
+))
+
+# --- 2. SERVIDORES E GRUPOS ---
+
+class Servidor:
+    """
+    Um servidor de controle de acesso atrás do gateway, com o seu pool de
+    conexões. 'saudavel' é atualizado pelas verificações periódicas e por
+    falhas nas requisições repassadas.
+    """
+
+    def __init__(self, host, porta, tamanho_pool=POOL_SERVIDOR, timeout=TIMEOUT_SERVIDOR, keep_alive=False):
+        self.host = host
+        self.porta = porta
+        self.nome = f"{host}:{porta}"
+        self.cliente = ClienteAcesso(host, porta, tamanho_pool, timeout, tentativas=1, keep_alive=keep_alive)
+        self.saudavel = True
+
+    def _mudar_estado(self, saudavel, motivo=""):
+        if saudavel != self.saudavel:
+            self.saudavel = saudavel
+            print(f"[gateway] Servidor {self.nome} " + ("de volta." if saudavel else f"fora do ar: {motivo}"))
+        if not saudavel:
+            self.cliente.fechar() # Descarta as conexões ociosas, provavelmente mortas
+
+    def marcar_falha(self, erro):
+        FALHAS_SERVIDOR.incrementar(self.nome)
+        self._mudar_estado(False, erro)
+
+    def verificar(self):
+        """
+        Verificação de saúde: o servidor aceita conexões?
+        """
+        try:
+            socket.create_connection((self.host, self.porta), TIMEOUT_SAUDE).close()
+        except OSError as e:
+            if self.saudavel:
+                FALHAS_SERVIDOR.incrementar(self.nome)
+            self._mudar_estado(False, e)
+        else:
+            self._mudar_estado(True)
+
+class GrupoServidores:
+    """
+    Servidores que atendem as mesmas requisições (ex.: um primário e as suas
+    réplicas), em ordem de preferência. Cada requisição vai ao primeiro
+    saudável; se ele falhar, é marcado como fora do ar e a requisição segue
+    para o próximo. Os fora do ar ainda são tentados, por último. Cadastros
+    (repetivel=False) só seguem para o próximo se nada foi enviado: depois
+    do envio, o servidor pode ter cadastrado, e um segundo cadastro geraria
+    outra credencial.
+    """
+
+    def __init__(self, nome, servidores):
+        self.nome = nome
+        self.servidores = servidores
+
+    def repassar(self, mensagens_bytes, respostas=1, repetivel=True):
+        """
+        Respostas brutas do primeiro servidor que responder, ou None. Com
+        repetivel=False, uma falha depois do envio levanta RespostaPerdida.
+        """
+        for servidor in sorted(self.servidores, key=lambda s: not s.saudavel):
+            try:
+                resposta = servidor.cliente.repassar(mensagens_bytes, respostas)
+            except PoolEsgotado:
+                # Conexões com o servidor todas em uso: carga, não falha
+                POOL_ESGOTADO.incrementar(servidor.nome)
+                continue
+            except RespostaPerdida as e:
+                servidor.marcar_falha(e)
+                if not repetivel:
+                    raise
+                continue
+            except OSError as e: # FalhaConexao e erros antes do envio
+                servidor.marcar_falha(e)
+                continue
+            REPASSES.incrementar(self.nome, servidor.nome)
+            return resposta
+        return None
+
+    def atualizar_metricas(self):
+        SERVIDORES_FORA.definir(self.nome, valor=sum(not s.saudavel for s in self.servidores))
+
+# --- 3. ROTEAMENTO ---
+
+class Roteador:
+    """
+    Acessos vão ao grupo da porta (campo Porta da mensagem); cadastros,
+    inclusive em lote, vão ao grupo de cadastro, que deve ser o que grava
+    as credenciais (os demais servidores recebem as credenciais por
+    replicação ou compartilham os arquivos).
+    """
+
+    def __init__(self, grupos_por_porta, grupo_cadastro):
+        self.grupos_por_porta = grupos_por_porta
+        self.grupo_cadastro = grupo_cadastro
+        self.grupos = list({id(g): g for g in [*grupos_por_porta.values(), grupo_cadastro]}.values())
+        self.servidores = list({s.nome: s for g in self.grupos for s in g.servidores}.values())
+
+    def repassar(self, mensagens_bytes, respostas=1):
+        visao = protocol.MensagemView(mensagens_bytes[:protocol.TAM_MSG_TOTAL])
+        if visao.tipo_msg == 1:
+            grupo = self.grupo_cadastro
+        else:
+            grupo = self.grupos_por_porta.get(visao.porta)
+            if grupo is None:
+                NAO_ROTEADAS.incrementar('porta_sem_grupo')
+                return protocol.empacotar_resposta_servidor(mensagens_bytes, 0, visao.credencial)
+
+        resposta = grupo.repassar(mensagens_bytes, respostas, repetivel=visao.tipo_msg != 1)
+        if resposta is None:
+            # Nenhum servidor do grupo respondeu: o cliente pode tentar mais tarde
+            NAO_ROTEADAS.incrementar('grupo_fora')
+            return protocol.empacotar_resposta_ocupado(mensagens_bytes[:protocol.TAM_MSG_TOTAL])
+        return resposta
+
+    def verificar_saude(self, intervalo=INTERVALO_SAUDE):
+        """
+        Laço das verificações de saúde (roda em uma thread daemon).
+        """
+        while True:
+            time.sleep(intervalo)
+            for servidor in self.servidores:
+                servidor.verificar()
+            for grupo in self.grupos:
+                grupo.atualizar_metricas()
+
+# --- 4. CONEXÕES DE CLIENTES ---
+
+def atender_cliente(roteador, conexao, endereco):
+    """
+    Lê mensagens de 58 bytes (várias por conexão, se o cliente quiser) e
+    devolve as respostas do servidor escolhido, na ordem.
+    """
+    try:
+        conexao.settimeout(TIMEOUT_OCIOSO)
+        while True:
+            mensagem = protocol.receber_exatamente(conexao, protocol.TAM_MSG_TOTAL)
+            if len(mensagem) != protocol.TAM_MSG_TOTAL:
+                if mensagem:
+                    print(f"[{endereco}] Erro: Tamanho de mensagem inválido ({len(mensagem)} bytes). Encerrando.")
+                break
+
+            respostas = 1
+            if protocol.eh_cabecalho_lote(mensagem):
+                # Cadastro em lote: repassa o cabeçalho e os N itens juntos
+                quantidade = protocol.MensagemView(mensagem).credencial
+                if quantidade > protocol.LOTE_MAX:
+                    conexao.sendall(protocol.empacotar_resposta_servidor(mensagem, 0, 0))
+                    break
+                itens = protocol.receber_exatamente(conexao, quantidade * protocol.TAM_MSG_TOTAL)
+                if len(itens) != quantidade * protocol.TAM_MSG_TOTAL:
+                    print(f"[{endereco}] Erro: Lote incompleto ({len(itens)} bytes). Encerrando.")
+                    break
+                mensagem, respostas = mensagem + itens, 1 + quantidade
+
+            conexao.sendall(roteador.repassar(mensagem, respostas))
+    except RespostaPerdida as e:
+        # Cadastro enviado sem resposta: encerra sem responder, como o próprio
+        # servidor faria, em vez de arriscar um cadastro duplicado
+        print(f"[{endereco}] Cadastro sem resposta do servidor: {e}")
+    except socket.timeout:
+        pass # Cliente ocioso
+    except OSError as e:
+        print(f"[{endereco}] Erro de comunicação: {e}")
+    finally:
+        conexao.close()
+
+def iniciar_gateway(roteador, host=HOST, porta=PORT, num_threads=POOL_THREADS, tamanho_fila=TAMANHO_FILA,
+                    intervalo_saude=INTERVALO_SAUDE):
+    servidor_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    servidor_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    servidor_socket.bind((host, porta))
+    servidor_socket.listen(128)
+
+    threading.Thread(target=roteador.verificar_saude, args=(intervalo_saude,), name="gateway-saude",
+                     daemon=True).start()
+    pool = admission.PoolTrabalhadores(
+        lambda conexao, endereco: atender_cliente(roteador, conexao, endereco),
+        num_threads, tamanho_fila, "gateway"
+    )
+
+    print(f"Gateway rodando em TCP {host}:{porta}")
+    for porta_id, grupo in sorted(roteador.grupos_por_porta.items()):
+        print(f"  P{porta_id} -> {', '.join(s.nome for s in grupo.servidores)}")
+    print(f"  cadastros -> {', '.join(s.nome for s in roteador.grupo_cadastro.servidores)}")
+
+    while True:
+        try:
+            conexao, endereco = servidor_socket.accept()
+            if not pool.submeter(conexao, endereco):
+                admission.recusar_conexao(conexao, endereco)
+        except KeyboardInterrupt:
+            print("\nGateway encerrado por comando do usuário (Ctrl+C).")
+            servidor_socket.close()
+            break
+        except OSError as e:
+            print(f"Erro ao aceitar conexão: {e}")
+
+# --- 5. CONFIGURAÇÃO (linha de comando) ---
+
+def interpretar_shard(texto):
+    """
+    "1-2,4=host:porta,porta" -> ({1, 2, 4}, [(host, porta), ...])
+    """
+    portas_texto, separador, enderecos_texto = texto.partition('=')
+    if not separador:
+        raise argparse.ArgumentTypeError(f"esperado PORTAS=SERVIDORES, recebido {texto!r}")
+    portas = set()
+    try:
+        for item in portas_texto.split(','):
+            inicio, _, fim = item.strip().partition('-')
+            inicio = int(inicio.lstrip('Pp'))
+            portas.update(range(inicio, int(fim.lstrip('Pp') or inicio) + 1))
+        enderecos = interpretar_enderecos(enderecos_texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard inválido: {texto!r}")
+    if not all(1 <= porta <= (1 << protocol.TAM_PORTA) - 1 for porta in portas):
+        raise argparse.ArgumentTypeError(f"portas fora de 1-{(1 << protocol.TAM_PORTA) - 1}: {texto!r}")
+    return portas, enderecos
+
+def montar_roteador(shards, enderecos_cadastro=None, tamanho_pool=POOL_SERVIDOR,
+                    timeout=TIMEOUT_SERVIDOR, keep_alive=False):
+    """
+    shards: [(portas, [(host, porta), ...]), ...]. Um mesmo servidor em
+    vários grupos compartilha o pool e o estado de saúde. 'keep_alive'
+    reutiliza as conexões do pool e exige servidores com --keep-alive.
+    """
+    servidores = {}
+    def grupo(nome, enderecos):
+        membros = []
+        for host, porta in enderecos:
+            if (host, porta) not in servidores:
+                servidores[(host, porta)] = Servidor(host, porta, tamanho_pool, timeout, keep_alive)
+            membros.append(servidores[(host, porta)])
+        return GrupoServidores(nome, membros)
+
+    grupos_por_porta = {}
+    for portas, enderecos in shards:
+        nome = '+'.join(f"P{porta}" for porta in sorted(portas))
+        grupo_shard = grupo(nome, enderecos)
+        for porta in portas:
+            if porta in grupos_por_porta:
+                raise ValueError(f"Porta P{porta} em mais de um shard.")
+            grupos_por_porta[porta] = grupo_shard
+
+    grupo_cadastro = grupo('cadastro', enderecos_cadastro or shards[0][1])
+    return Roteador(grupos_por_porta, grupo_cadastro)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gateway de roteamento por porta entre servidores")
+    parser.add_argument('--port', type=int, default=PORT, help="porta TCP onde os clientes se conectam")
+    parser.add_argument('--shard', type=interpretar_shard, action='append', required=True,
+                        metavar='PORTAS=HOST:PORTA[,...]',
+                        help="portas atendidas por um grupo de servidores, em ordem de preferência "
+                             "(ex.: 1-2=65441,65451); pode ser repetido")
+    parser.add_argument('--cadastro', type=interpretar_enderecos, metavar='HOST:PORTA[,...]',
+                        help="servidores que recebem os cadastros (padrão: os do primeiro --shard)")
+    parser.add_argument('--pool-servidor', type=int, default=POOL_SERVIDOR,
+                        help="conexões mantidas com cada servidor")
+    parser.add_argument('--timeout-servidor', type=float, default=TIMEOUT_SERVIDOR,
+                        help="segundos por requisição repassada antes de tentar o próximo servidor")
+    parser.add_argument('--keep-alive', action='store_true',
+                        help="reutiliza as conexões com os servidores (exige servidores com --keep-alive)")
+    parser.add_argument('--intervalo-saude', type=float, default=INTERVALO_SAUDE,
+                        help="segundos entre verificações de saúde dos servidores")
+    parser.add_argument('--pool', type=int, default=POOL_THREADS, help="threads que atendem clientes")
+    parser.add_argument('--fila', type=int, default=TAMANHO_FILA,
+                        help="conexões aguardando uma thread; além disso, resposta \"ocupado\"")
+    parser.add_argument('--metricas', type=int, metavar='PORTA',
+                        help="expõe métricas Prometheus em http://127.0.0.1:PORTA/metrics")
+    args = parser.parse_args()
+
+    try:
+        roteador = montar_roteador(args.shard, args.cadastro, args.pool_servidor,
+                                   args.timeout_servidor, args.keep_alive)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.metricas:
+        metrics.iniciar_endpoint(args.metricas)
+        print(f"Métricas disponíveis em http://{metrics.HOST_METRICAS}:{args.metricas}/metrics")
+
+    iniciar_gateway(roteador, porta=args.port, num_threads=args.pool, tamanho_fila=args.fila,
+                    intervalo_saude=args.intervalo_saude)
@@ -0,0 +1,651 @@
+# ======================================================================
+# ARQUIVO: log_query.py
+# FUNÇÃO: Consultas indexadas ao registro de acessos (register_acess.txt).
+#         Mantém um índice auxiliar (sidecar) por porta, credencial e hora,
+#         atualizado incrementalmente, e lê apenas os registros que casam.
+#         Também percorre, em fluxo, os segmentos rotacionados (.gz).
+# ======================================================================
+
+import argparse
+import gzip
+import heapq
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import partial
+from datetime import datetime, timedelta
+
+import binary_log
+from server_data import ARQUIVO_REGISTRO, SUFIXO_COMPRIMIDO, _trava_entre_processos, listar_segmentos
+
+# --- Configuração do Índice ---
+EXTENSAO_INDICE = '.idx'
+VERSAO_INDICE = 2
+MAGICO_INDICE = b'LQIX'
+TAM_ASSINATURA = 64          # Bytes iniciais do log usados para detectar troca do arquivo
+LOTES_MAX = 32               # Lotes acrescentados antes de o índice ser compactado em um só
+SONDAGEM_DISCO = 64          # Busca cada candidato no disco quando a fatia é N vezes maior
+FORMATO_DATA_HORA = '%d/%m/%Y %H:%M:%S'
+
+# Dimensões do índice; a chave de hora é o inteiro AAAAMMDDHH
+DIM_PORTA, DIM_CREDENCIAL, DIM_HORA = 0, 1, 2
+CHAVE_HORA_MAX = 9999123123
+
+# Estruturas do arquivo (little-endian)
+_DESLOCAMENTO = struct.Struct('<Q')
+# Entrada do diretório: dimensão, chave, posição da sequência, quantidade,
+# primeiro e último deslocamento
+_ENTRADA = struct.Struct('<BqQIQQ')
+# Rodapé de cada lote: mágico, versão, tamanho e bytes da assinatura,
+# bytes do log indexados, posição e entradas do diretório, rodapé do lote
+# anterior e número de lotes
+_RODAPE = struct.Struct(f'<4sHB{TAM_ASSINATURA}sQQIQI')
+_DESLOCAMENTO_MAX = (1 << 64) - 1
+_SEM_ANTERIOR = _DESLOCAMENTO_MAX
+_LIMITE_CHAVE = 1 << 63
+
+# --- 1. INTERPRETAÇÃO DAS LINHAS DO REGISTRO ---
+
+def interpretar_linha(linha):
+    """
+    Converte uma linha "dd/mm/yyyy hh:mm:ss, Pn, codigo, resultado" em um
+    dicionário. Retorna None para linhas vazias ou malformadas.
+    """
+    partes = [p.strip() for p in linha.split(',')]
+    if len(partes) != 4:
+        return None
+    data_hora, porta, codigo, resultado = partes
+    try:
+        return {
+            'data_hora': datetime.strptime(data_hora, FORMATO_DATA_HORA),
+            # Registros antigos gravavam só o número da porta, sem o "P"
+            'porta': int(porta.lstrip('Pp')),
+            'credencial': int(codigo),
+            'resultado': resultado
+        }
+    except ValueError:
+        return None
+
+def chaves_linha(linha):
+    """
+    (porta, credencial, chave da hora) de uma linha do registro em bytes,
+    sem converter a data (usada na indexação, bem mais rápida que
+    interpretar_linha). Retorna None para linhas malformadas.
+    """
+    partes = linha.split(b',')
+    if len(partes) != 4:
+        return None
+    data_hora = partes[0].strip()
+    if len(data_hora) != 19:
+        return None
+    try:
+        chaves = (int(partes[1].strip().lstrip(b'Pp')), int(partes[2]),
+                  int(data_hora[6:10] + data_hora[3:5] + data_hora[0:2] + data_hora[11:13]))
+    except ValueError:
+        return None
+    if not all(-_LIMITE_CHAVE <= chave < _LIMITE_CHAVE for chave in chaves):
+        return None
+    return chaves
+
+def formatar_registro(registro):
+    return (f"{registro['data_hora'].strftime(FORMATO_DATA_HORA)}, P{registro['porta']}, "
+            f"{registro['credencial']}, {registro['resultado']}")
+
+def atende_filtros(registro, porta=None, credencial=None, inicio=None, fim=None):
+    if porta is not None and registro['porta'] != porta:
+        return False
+    if credencial is not None and registro['credencial'] != credencial:
+        return False
+    if inicio is not None and registro['data_hora'] < inicio:
+        return False
+    if fim is not None and registro['data_hora'] > fim:
+        return False
+    return True
+
+# --- 2. ÍNDICE ---
+# O arquivo de índice é uma sequência de lotes, um por atualização. Cada
+# lote traz, para cada porta e credencial das linhas novas, a sequência
+# ordenada dos seus deslocamentos no log (uint64), seguida do diretório
+# (entradas de tamanho fixo, ordenadas por dimensão e chave) e de um rodapé
+# que aponta para o rodapé do lote anterior. As horas não têm sequência:
+# como o log é gravado em ordem de tempo, a entrada guarda apenas o primeiro
+# e o último deslocamento da hora. Abrir o índice lê só rodapés e
+# diretórios; das sequências é lida apenas a fatia que a consulta usa.
+
+def _chave_hora(data_hora):
+    return ((data_hora.year * 100 + data_hora.month) * 100 + data_hora.day) * 100 + data_hora.hour
+
+def _para_disco(deslocamentos):
+    if sys.byteorder == 'big':
+        deslocamentos = array('Q', deslocamentos)
+        deslocamentos.byteswap()
+    return deslocamentos.tobytes()
+
+def _do_disco(dados):
+    deslocamentos = array('Q')
+    deslocamentos.frombytes(dados)
+    if sys.byteorder == 'big':
+        deslocamentos.byteswap()
+    return deslocamentos
+
+class _Sequencia:
+    """
+    Deslocamentos ordenados de uma chave, gravados no índice e lidos sob
+    demanda. sequencia[i] lê 8 bytes, o que permite a busca binária (bisect)
+    direto no arquivo.
+    """
+
+    def __init__(self, arquivo, posicao, quantidade, primeiro, ultimo):
+        self.arquivo = arquivo
+        self.posicao = posicao
+        self.quantidade = quantidade
+        self.primeiro = primeiro
+        self.ultimo = ultimo
+
+    def __len__(self):
+        return self.quantidade
+
+    def __getitem__(self, i):
+        self.arquivo.seek(self.posicao + i * _DESLOCAMENTO.size)
+        return _DESLOCAMENTO.unpack(self.arquivo.read(_DESLOCAMENTO.size))[0]
+
+    def faixa(self, minimo, maximo):
+        """
+        Índices [i, j) dos deslocamentos entre minimo e maximo.
+        """
+        i = 0 if minimo <= self.primeiro else bisect_left(self, minimo)
+        j = self.quantidade if maximo >= self.ultimo else bisect_right(self, maximo, i)
+        return i, j
+
+    def ler(self, i, j):
+        self.arquivo.seek(self.posicao + i * _DESLOCAMENTO.size)
+        return _do_disco(self.arquivo.read((j - i) * _DESLOCAMENTO.size))
+
+class _SequenciaMemoria(_Sequencia):
+    """
+    Deslocamentos indexados e ainda não gravados (atualizar() sem salvar()).
+    """
+
+    def __init__(self, deslocamentos):
+        super().__init__(None, 0, len(deslocamentos), deslocamentos[0], deslocamentos[-1])
+        self.deslocamentos = deslocamentos
+
+    def __getitem__(self, i):
+        return self.deslocamentos[i]
+
+    def ler(self, i, j):
+        return self.deslocamentos[i:j]
+
+class _Lote:
+    """
+    Diretório de um lote. As chaves são procuradas por busca binária sobre
+    as entradas gravadas, sem convertê-las todas.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+
+    def __len__(self):
+        return len(self.diretorio) // _ENTRADA.size
+
+    def __getitem__(self, i):
+        return _ENTRADA.unpack_from(self.diretorio, i * _ENTRADA.size)[:2]
+
+    def entradas(self, dimensao=None, chave_minima=None, chave_maxima=None):
+        """
+        Gera (dimensão, chave, posição, quantidade, primeiro, último) das
+        entradas com chave em [chave_minima, chave_maxima] (todas, sem 'dimensao').
+        """
+        i = 0 if dimensao is None else bisect_left(self, (dimensao, chave_minima))
+        for i in range(i, len(self)):
+            entrada = _ENTRADA.unpack_from(self.diretorio, i * _ENTRADA.size)
+            if dimensao is not None and entrada[:2] > (dimensao, chave_maxima):
+                break
+            yield entrada
+
+def _ler_rodape(arquivo, posicao):
+    """
+    (assinatura, bytes do log indexados, posição do diretório, entradas,
+    rodapé anterior, lotes). ValueError se não houver um rodapé válido.
+    """
+    if posicao < 0:
+        raise ValueError("índice truncado")
+    arquivo.seek(posicao)
+    dados = arquivo.read(_RODAPE.size)
+    if len(dados) != _RODAPE.size:
+        raise ValueError("índice truncado")
+    magico, versao, tam_assinatura, assinatura, *resto = _RODAPE.unpack(dados)
+    if magico != MAGICO_INDICE or versao != VERSAO_INDICE:
+        raise ValueError("formato de índice desconhecido")
+    return (assinatura[:tam_assinatura], *resto)
+
+def _ler_lotes(arquivo):
+    """
+    Lê os rodapés e diretórios de todos os lotes, do último ao primeiro.
+    Retorna (lotes do mais antigo ao mais recente, posição do último
+    rodapé, assinatura, bytes do log indexados).
+    """
+    ultimo = posicao = arquivo.seek(0, os.SEEK_END) - _RODAPE.size
+    lotes = []
+    while posicao != _SEM_ANTERIOR:
+        assinatura_lote, deslocamento_lote, posicao_diretorio, entradas, anterior, _ = _ler_rodape(arquivo, posicao)
+        if not lotes:
+            assinatura, deslocamento = assinatura_lote, deslocamento_lote
+        if anterior != _SEM_ANTERIOR and anterior >= posicao:
+            raise ValueError("índice danificado")
+        arquivo.seek(posicao_diretorio)
+        lotes.append(_Lote(arquivo.read(entradas * _ENTRADA.size)))
+        posicao = anterior
+    return lotes[::-1], ultimo, assinatura, deslocamento
+
+def _gravar_lote(f, entradas, assinatura, deslocamento_log, anterior, lotes):
+    """
+    Acrescenta um lote ao fim de 'f'. 'entradas' gera, em ordem de dimensão
+    e chave, (dimensão, chave, deslocamentos) e, para as horas,
+    (DIM_HORA, chave, (quantidade, primeiro, último)).
+    """
+    posicao = f.seek(0, os.SEEK_END)
+    diretorio = bytearray()
+    for dimensao, chave, valor in entradas:
+        if dimensao == DIM_HORA:
+            diretorio += _ENTRADA.pack(dimensao, chave, 0, *valor)
+        else:
+            diretorio += _ENTRADA.pack(dimensao, chave, posicao, len(valor), valor[0], valor[-1])
+            posicao += f.write(_para_disco(valor))
+    f.write(diretorio)
+    f.write(_RODAPE.pack(MAGICO_INDICE, VERSAO_INDICE, len(assinatura), assinatura, deslocamento_log,
+                         posicao, len(diretorio) // _ENTRADA.size, anterior, lotes))
+
+def _entradas_compactadas(arquivo, lotes):
+    """
+    Entradas de todos os lotes em ordem, com as da mesma chave juntadas (as
+    sequências na ordem dos lotes continuam ordenadas).
+    """
+    def juntar(grupo):
+        dimensao, chave = grupo[0][:2]
+        if dimensao == DIM_HORA:
+            return dimensao, chave, (sum(e[3] for e in grupo), min(e[4] for e in grupo), max(e[5] for e in grupo))
+        deslocamentos = array('Q')
+        for _, _, posicao, quantidade, primeiro, ultimo in grupo:
+            deslocamentos.extend(_Sequencia(arquivo, posicao, quantidade, primeiro, ultimo).ler(0, quantidade))
+        return dimensao, chave, deslocamentos
+
+    # A posição desempata a ordem: lotes mais novos ficam mais adiante no arquivo
+    grupo = []
+    for entrada in heapq.merge(*(lote.entradas() for lote in lotes)):
+        if grupo and entrada[:2] != grupo[0][:2]:
+            yield juntar(grupo)
+            grupo = []
+        grupo.append(entrada)
+    if grupo:
+        yield juntar(grupo)
+
+def _unir(listas):
+    if len(listas) == 1:
+        return listas[0]
+    return array('Q', heapq.merge(*listas))
+
+def _cruzar(menor, maior, inicio, fim):
+    """
+    Elementos de 'menor' presentes em maior[inicio:fim] (ambos ordenados),
+    por busca binária a partir da última posição encontrada.
+    """
+    for valor in menor:
+        inicio = bisect_left(maior, valor, inicio, fim)
+        if inicio == fim:
+            break
+        if maior[inicio] == valor:
+            yield valor
+
+def _intersecao(ordenados, fatias):
+    """
+    Deslocamentos de 'ordenados' presentes nas fatias (sequencia, i, j) de
+    um filtro. Poucos candidatos contra uma fatia longa são procurados um a
+    um no arquivo; senão a fatia é lida e cruzada em memória.
+    """
+    encontrados = []
+    for sequencia, i, j in fatias:
+        if len(ordenados) * SONDAGEM_DISCO < j - i:
+            encontrados.extend(_cruzar(ordenados, sequencia, i, j))
+        else:
+            lida = sequencia.ler(i, j)
+            menor, maior = (ordenados, lida) if len(ordenados) <= len(lida) else (lida, ordenados)
+            encontrados.extend(_cruzar(menor, maior, 0, len(maior)))
+    return array('Q', sorted(encontrados))
+
+def _linhas_trecho(f, inicio, fim):
+    """
+    Linhas do log que começam entre os deslocamentos inicio e fim.
+    """
+    f.seek(inicio)
+    posicao = inicio
+    for linha in f:
+        if posicao > fim:
+            break
+        yield linha
+        posicao += len(linha)
+
+class IndiceRegistro:
+    """
+    Índice do registro de acessos por porta, credencial e hora, salvo ao
+    lado do log (<log>.idx). Cada atualização lê apenas as linhas
+    acrescentadas desde a anterior e acrescenta um lote ao arquivo, sem
+    reescrevê-lo; a cada LOTES_MAX lotes, eles são compactados em um.
+    """
+
+    def __init__(self, caminho_log=ARQUIVO_REGISTRO, caminho_indice=None):
+        self.caminho_log = caminho_log
+        self.caminho_indice = caminho_indice or caminho_log + EXTENSAO_INDICE
+        self._arquivo = None
+        self._carregar()
+
+    def _limpar(self):
+        self.deslocamento = 0 # Bytes do log já indexados (sempre em fim de linha)
+        self.assinatura = b''
+        self._lotes = []
+        self._gravado = None # (posição do último rodapé, deslocamento) no arquivo; None: gravar do zero
+        self._pendentes = {DIM_PORTA: {}, DIM_CREDENCIAL: {}, DIM_HORA: {}}
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def _carregar(self):
+        """
+        Lê os lotes gravados. Um arquivo ausente, danificado ou de outra
+        versão é tratado como vazio e será regravado por salvar().
+        """
+        self.fechar()
+        self._limpar()
+        with _trava_entre_processos(self.caminho_indice):
+            try:
+                arquivo = open(self.caminho_indice, 'rb')
+            except FileNotFoundError:
+                return
+            try:
+                lotes, posicao, assinatura, deslocamento = _ler_lotes(arquivo)
+            except ValueError:
+                arquivo.close()
+                return
+        self._arquivo = arquivo
+        self._lotes, self.assinatura, self.deslocamento = lotes, assinatura, deslocamento
+        self._gravado = (posicao, deslocamento)
+
+    def _entradas_pendentes(self):
+        for dimensao, pendentes in self._pendentes.items():
+            for chave in sorted(pendentes):
+                yield dimensao, chave, pendentes[chave]
+
+    def _regravar(self, entradas, assinatura, deslocamento):
+        temporario = self.caminho_indice + '.tmp'
+        with open(temporario, 'wb') as f:
+            _gravar_lote(f, entradas, assinatura, deslocamento, _SEM_ANTERIOR, 1)
+        os.replace(temporario, self.caminho_indice) # Troca atômica do índice
+
+    def salvar(self):
+        """
+        Grava o que foi indexado desde o último salvar(): um lote novo no fim
+        do arquivo ou, se ele precisa ser refeito, um arquivo novo.
+        """
+        with _trava_entre_processos(self.caminho_indice):
+            if self._gravado is None:
+                self._regravar(self._entradas_pendentes(), self.assinatura, self.deslocamento)
+            else:
+                try:
+                    with open(self.caminho_indice, 'r+b') as f:
+                        posicao = f.seek(0, os.SEEK_END) - _RODAPE.size
+                        _, deslocamento, _, _, _, lotes = _ler_rodape(f, posicao)
+                        if (posicao, deslocamento) != self._gravado:
+                            return # Outro processo atualizou antes; o estado em memória segue válido
+                        _gravar_lote(f, self._entradas_pendentes(), self.assinatura, self.deslocamento,
+                                     posicao, lotes + 1)
+                except (FileNotFoundError, ValueError):
+                    return # Removido ou danificado: será refeito na próxima abertura
+                if lotes + 1 > LOTES_MAX:
+                    with open(self.caminho_indice, 'rb') as f:
+                        lotes, _, assinatura, deslocamento = _ler_lotes(f)
+                        self._regravar(_entradas_compactadas(f, lotes), assinatura, deslocamento)
+        self._carregar()
+
+    def atualizar(self):
+        """
+        Indexa as linhas novas do log. Se o arquivo foi truncado ou trocado
+        (ex.: rotação), o índice é reconstruído do zero.
+        Retorna o número de registros indexados.
+        """
+        try:
+            tamanho = os.path.getsize(self.caminho_log)
+        except FileNotFoundError:
+            self.fechar()
+            self._limpar()
+            return 0
+
+        with open(self.caminho_log, 'rb') as f:
+            assinatura = f.read(TAM_ASSINATURA)
+            if tamanho < self.deslocamento or not assinatura.startswith(self.assinatura):
+                self.fechar()
+                self._limpar()
+            self.assinatura = assinatura
+
+            portas, credenciais, horas = (self._pendentes[d] for d in (DIM_PORTA, DIM_CREDENCIAL, DIM_HORA))
+            f.seek(self.deslocamento)
+            deslocamento = self.deslocamento
+            novos = 0
+            for linha in f:
+                if not linha.endswith(b'\n'):
+                    break # Linha ainda sendo escrita: fica para a próxima vez
+                chaves = chaves_linha(linha)
+                if chaves is not None:
+                    porta, credencial, hora = chaves
+                    for postagens, chave in ((portas, porta), (credenciais, credencial)):
+                        lista = postagens.get(chave)
+                        if lista is None:
+                            lista = postagens[chave] = array('Q')
+                        lista.append(deslocamento)
+                    faixa = horas.get(hora)
+                    if faixa is None:
+                        horas[hora] = [1, deslocamento, deslocamento]
+                    else:
+                        faixa[0] += 1
+                        faixa[2] = deslocamento
+                    novos += 1
+                deslocamento += len(linha)
+            self.deslocamento = deslocamento
+
+        return novos
+
+    def _sequencias(self, dimensao, chave):
+        sequencias = [_Sequencia(self._arquivo, *entrada[2:])
+                      for lote in self._lotes for entrada in lote.entradas(dimensao, chave, chave)]
+        if chave in self._pendentes[dimensao]:
+            sequencias.append(_SequenciaMemoria(self._pendentes[dimensao][chave]))
+        return sequencias
+
+    def _faixa_horas(self, inicio, fim):
+        """
+        (primeiro, último) deslocamento das horas entre inicio e fim, ou
+        None se não há registros nelas.
+        """
+        chave_minima = _chave_hora(inicio) if inicio is not None else 0
+        chave_maxima = _chave_hora(fim) if fim is not None else CHAVE_HORA_MAX
+        faixas = [entrada[4:] for lote in self._lotes
+                  for entrada in lote.entradas(DIM_HORA, chave_minima, chave_maxima)]
+        faixas.extend(faixa[1:] for chave, faixa in self._pendentes[DIM_HORA].items()
+                      if chave_minima <= chave <= chave_maxima)
+        if not faixas:
+            return None
+        return min(primeiro for primeiro, _ in faixas), max(ultimo for _, ultimo in faixas)
+
+    def _candidatos(self, porta, credencial, minimo, maximo):
+        """
+        Deslocamentos candidatos entre minimo e maximo (array ordenado), ou
+        None sem filtro de porta ou credencial.
+        """
+        filtros = []
+        if porta is not None:
+            filtros.append(self._sequencias(DIM_PORTA, porta))
+        if credencial is not None:
+            filtros.append(self._sequencias(DIM_CREDENCIAL, credencial))
+        if not filtros:
+            return None
+        if not all(filtros):
+            return array('Q')
+
+        # Só interessa o trecho do log comum a todos os filtros
+        for sequencias in filtros:
+            minimo = max(minimo, min(s.primeiro for s in sequencias))
+            maximo = min(maximo, max(s.ultimo for s in sequencias))
+        if minimo > maximo:
+            return array('Q')
+        fatias = [[(s, *s.faixa(minimo, maximo)) for s in sequencias] for sequencias in filtros]
+        fatias.sort(key=lambda fatia: sum(j - i for _, i, j in fatia))
+
+        # O filtro mais seletivo é lido; os demais só confirmam os seus candidatos
+        resultado = _unir([s.ler(i, j) for s, i, j in fatias[0]])
+        for fatia in fatias[1:]:
+            if not resultado:
+                break
+            resultado = _intersecao(resultado, fatia)
+        return resultado
+
+    def consultar(self, porta=None, credencial=None, inicio=None, fim=None):
+        """
+        Gera, em ordem de gravação, os registros que atendem a todos os
+        filtros dados (porta, credencial e intervalo [inicio, fim]).
+        """
+        minimo, maximo = 0, _DESLOCAMENTO_MAX
+        if inicio is not None or fim is not None:
+            faixa = self._faixa_horas(inicio, fim)
+            if faixa is None:
+                return
+            minimo, maximo = faixa
+        candidatos = self._candidatos(porta, credencial, minimo, maximo)
+
+        with open(self.caminho_log, 'rb') as f:
+            if candidatos is None:
+                # Só período (ou nada): lê em sequência o trecho do log que o contém
+                linhas = _linhas_trecho(f, minimo, maximo)
+            else:
+                def ler(deslocamento):
+                    f.seek(deslocamento)
+                    return f.readline()
+                linhas = (ler(d) for d in candidatos)
+
+            for linha in linhas:
+                registro = interpretar_linha(linha.decode('utf-8', 'replace'))
+                # Filtro exato (o índice de horas tem granularidade de uma hora)
+                if registro is not None and atende_filtros(registro, porta, credencial, inicio, fim):
+                    yield registro
+
+def consultar(porta=None, credencial=None, inicio=None, fim=None, caminho_log=ARQUIVO_REGISTRO):
+    """
+    Atalho: atualiza (e salva) o índice do log e executa a consulta.
+    """
+    indice = IndiceRegistro(caminho_log)
+    if indice.atualizar():
+        indice.salvar()
+    return indice.consultar(porta, credencial, inicio, fim)
+
+# --- 3. LEITURA DOS SEGMENTOS (rotação) ---
+
+def _abrir_segmento(caminho, binario):
+    """
+    Abre um segmento para leitura (descomprimindo em fluxo). Um segmento
+    não comprimido pode ter sido comprimido desde a listagem.
+    """
+    modo = {'mode': 'rb'} if binario else {'mode': 'rt', 'encoding': 'utf-8', 'errors': 'replace'}
+    try:
+        if caminho.endswith(SUFIXO_COMPRIMIDO):
+            return gzip.open(caminho, **modo)
+        return open(caminho, **modo)
+    except FileNotFoundError:
+        if caminho.endswith(SUFIXO_COMPRIMIDO):
+            raise
+        return gzip.open(caminho + SUFIXO_COMPRIMIDO, **modo)
+
+def _registros_segmento(caminho, binario):
+    try:
+        f = _abrir_segmento(caminho, binario)
+    except FileNotFoundError:
+        return # Apagado pela retenção (ou arquivo ativo ainda não criado)
+    with f:
+        if binario:
+            # Blocos de registros inteiros de 8 bytes
+            for bloco in iter(partial(f.read, binary_log.TAM_REGISTRO * 4096), b''):
+                for i in range(0, len(bloco) - binary_log.TAM_REGISTRO + 1, binary_log.TAM_REGISTRO):
+                    registro = binary_log.desempacotar_registro(bloco[i:i + binary_log.TAM_REGISTRO])
+                    if registro is not None:
+                        yield registro
+        else:
+            for linha in f:
+                registro = interpretar_linha(linha)
+                if registro is not None:
+                    yield registro
+
+def _primeira_data_hora(caminho, binario):
+    for registro in _registros_segmento(caminho, binario):
+        return registro['data_hora']
+    return None
+
+def ler_registros(caminho_log=ARQUIVO_REGISTRO, desde=None):
+    """
+    Gera os registros de todos os segmentos (fechados e ativo), em ordem de
+    gravação, lendo uma linha por vez. Com 'desde', pula os segmentos que
+    terminam antes dessa data/hora (o início do segmento seguinte é anterior)
+    e descarta os registros mais antigos. Um caminho .bin é lido no formato
+    binário (binary_log.py).
+    """
+    binario = caminho_log.endswith('.bin')
+    segmentos = listar_segmentos(caminho_log) + [caminho_log]
+    for i, caminho in enumerate(segmentos):
+        if desde is not None and i + 1 < len(segmentos):
+            inicio_seguinte = _primeira_data_hora(segmentos[i + 1], binario)
+            if inicio_seguinte is not None and inicio_seguinte <= desde:
+                continue
+        for registro in _registros_segmento(caminho, binario):
+            if desde is None or registro['data_hora'] >= desde:
+                yield registro
+
+# --- 4. LINHA DE COMANDO ---
+
+def _ler_data_hora(texto, fim_do_periodo=False):
+    for formato, passo in (('%d/%m/%Y %H:%M:%S', timedelta(0)),
+                           ('%d/%m/%Y %H:%M', timedelta(seconds=59)),
+                           ('%d/%m/%Y', timedelta(days=1, seconds=-1))):
+        try:
+            valor = datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+        # Em --fim, uma data/hora incompleta cobre o período inteiro
+        return valor + passo if fim_do_periodo else valor
+    raise argparse.ArgumentTypeError(f"Data/hora inválida: {texto!r} (use dd/mm/aaaa [hh:mm[:ss]])")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Consulta indexada ao registro de acessos")
+    parser.add_argument('--log', default=ARQUIVO_REGISTRO, help="arquivo de registro")
+    parser.add_argument('--porta', type=lambda p: int(p.lstrip('Pp')), help="ex.: 3 ou P3")
+    parser.add_argument('--credencial', type=int)
+    parser.add_argument('--inicio', type=_ler_data_hora, help="dd/mm/aaaa [hh:mm[:ss]]")
+    parser.add_argument('--fim', type=lambda t: _ler_data_hora(t, fim_do_periodo=True),
+                        help="dd/mm/aaaa [hh:mm[:ss]]")
+    parser.add_argument('--segmentos', action='store_true',
+                        help="inclui os segmentos rotacionados (leitura em fluxo, sem índice)")
+    args = parser.parse_args()
+
+    if args.segmentos or args.log.endswith('.bin'): # O índice cobre apenas o formato texto
+        registros = (r for r in ler_registros(args.log, args.inicio)
+                     if atende_filtros(r, args.porta, args.credencial, fim=args.fim))
+    elif not os.path.exists(args.log):
+        print(f"ERRO: Arquivo de registro {args.log} não encontrado.")
+        sys.exit(1)
+    else:
+        registros = consultar(args.porta, args.credencial, args.inicio, args.fim, args.log)
+
+    total = 0
+    for registro in registros:
+        print(formatar_registro(registro))
+        total += 1
+    print(f"-- {total} registro(s)")
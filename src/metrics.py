@@ -0,0 +1,198 @@
+# ======================================================================
+# ARQUIVO: metrics.py
+# FUNÇÃO: Métricas do servidor (contadores, medidores e histogramas de
+#         latência por etapa) e endpoint HTTP local no formato texto do
+#         Prometheus.
+# ======================================================================
+
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# --- Configuração ---
+HOST_METRICAS = '127.0.0.1' # Endpoint apenas local
+PREFIXO = 'controle_acesso'
+
+# Limites (em segundos) dos baldes dos histogramas de latência
+BALDES_LATENCIA = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+# --- 1. TIPOS DE MÉTRICA ---
+# Cada métrica guarda uma série por combinação de rótulos. As atualizações
+# são um incremento sob uma trava da própria métrica (custo de ~1 µs).
+
+def _formatar_rotulos(nomes, valores, extra=''):
+    pares = [f'{n}="{v}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+class Contador:
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores = {}
+        self._trava = threading.Lock()
+
+    def incrementar(self, *valores_rotulos, n=1):
+        with self._trava:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + n
+
+    def valor(self, *valores_rotulos):
+        return self._valores.get(valores_rotulos, 0)
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        with self._trava:
+            itens = sorted(self._valores.items())
+        for valores_rotulos, valor in itens:
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, valores_rotulos)} {valor}")
+        return linhas
+
+class Medidor(Contador):
+    """
+    Valor que sobe e desce (ex.: conexões ativas).
+    """
+
+    def decrementar(self, *valores_rotulos, n=1):
+        self.incrementar(*valores_rotulos, n=-n)
+
+    def definir(self, *valores_rotulos, valor):
+        with self._trava:
+            self._valores[valores_rotulos] = valor
+
+    def exportar(self):
+        linhas = super().exportar()
+        linhas[1] = f"# TYPE {self.nome} gauge"
+        return linhas
+
+class Histograma:
+    def __init__(self, nome, ajuda, rotulos=(), baldes=BALDES_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.baldes = baldes
+        self._series = {} # rótulos -> [contagens por balde (+Inf no fim), soma, total]
+        self._trava = threading.Lock()
+
+    def observar(self, valor, *valores_rotulos):
+        indice = bisect.bisect_left(self.baldes, valor)
+        with self._trava:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [[0] * (len(self.baldes) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._trava:
+            itens = sorted((k, ([*s[0]], s[1], s[2])) for k, s in self._series.items())
+        for valores_rotulos, (contagens, soma, total) in itens:
+            acumulado = 0
+            for limite, contagem in zip((*self.baldes, '+Inf'), contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, valores_rotulos, f'le="{limite}"')
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, valores_rotulos)
+            linhas.append(f"{self.nome}_sum{rotulos} {soma}")
+            linhas.append(f"{self.nome}_count{rotulos} {total}")
+        return linhas
+
+# --- 2. MÉTRICAS DO SERVIDOR ---
+
+LATENCIA_ESTAGIO = Histograma(
+    f'{PREFIXO}_estagio_segundos',
+    "Tempo gasto em cada etapa do processamento de uma requisição.",
+    ('estagio',)
+)
+REQUISICOES = Contador(
+    f'{PREFIXO}_requisicoes_total', "Requisições recebidas por tipo e porta.", ('tipo', 'porta')
+)
+DECISOES = Contador(
+    f'{PREFIXO}_decisoes_total', "Respostas enviadas por tipo e resultado.", ('tipo', 'resultado')
+)
+ERROS = Contador(
+    f'{PREFIXO}_erros_total', "Erros de processamento por motivo.", ('motivo',)
+)
+CONEXOES_ATIVAS = Medidor(
+    f'{PREFIXO}_conexoes_ativas', "Conexões de clientes abertas no momento."
+)
+DATAGRAMAS_DUPLICADOS = Contador(
+    f'{PREFIXO}_datagramas_duplicados_total',
+    "Retransmissões UDP respondidas a partir do cache, sem reprocessar."
+)
+
+_METRICAS = [LATENCIA_ESTAGIO, REQUISICOES, DECISOES, ERROS, CONEXOES_ATIVAS, DATAGRAMAS_DUPLICADOS]
+
+def registrar_metrica(metrica):
+    """
+    Inclui uma métrica de outro módulo na exportação.
+    """
+    if metrica not in _METRICAS:
+        _METRICAS.append(metrica)
+    return metrica
+
+def observar_estagio(estagio, segundos):
+    LATENCIA_ESTAGIO.observar(segundos, estagio)
+
+def exportar_texto():
+    """
+    Todas as métricas no formato de exposição em texto do Prometheus.
+    """
+    linhas = []
+    for metrica in _METRICAS:
+        linhas.extend(metrica.exportar())
+    return '\n'.join(linhas) + '\n'
+
+# --- 3. ENDPOINT HTTP ---
+
+_rotas_json = {} # caminho -> funcao(parametros) que retorna um objeto JSON
+
+def registrar_rota(caminho, funcao):
+    """
+    Serve 'caminho' no endpoint: funcao(dicionário da query string) retorna
+    um objeto convertido em JSON; ValueError vira resposta 400.
+    """
+    _rotas_json[caminho] = funcao
+
+class _ManipuladorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/metrics':
+            self._responder(exportar_texto(), 'text/plain; version=0.0.4; charset=utf-8')
+        elif url.path in _rotas_json:
+            try:
+                resultado = _rotas_json[url.path](dict(parse_qsl(url.query)))
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            self._responder(json.dumps(resultado, ensure_ascii=False), 'application/json; charset=utf-8')
+        else:
+            self.send_error(404)
+
+    def _responder(self, texto, tipo_conteudo):
+        corpo = texto.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', tipo_conteudo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass # Não polui a saída do servidor a cada coleta
+
+def iniciar_endpoint(porta, host=HOST_METRICAS):
+    """
+    Serve /metrics em http://host:porta/ em uma thread daemon.
+    """
+    servidor = ThreadingHTTPServer((host, porta), _ManipuladorMetricas)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+    return servidor
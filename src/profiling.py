@@ -0,0 +1,292 @@
+# ======================================================================
+# ARQUIVO: profiling.py
+# FUNÇÃO: Perfil de desempenho do servidor em execução, ligado e desligado
+#         sem reiniciar (SIGUSR1): amostragem das pilhas de todas as threads
+#         ou cProfile das requisições, mais diferenças de alocação de memória
+#         (tracemalloc). Os relatórios são gravados em disco ao desligar.
+# ======================================================================
+
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# --- Configuração ---
+DIRETORIO_PADRAO = 'perfis'
+INTERVALO_AMOSTRAGEM = 0.005 # Segundos entre amostras das pilhas
+QUADROS_TRACEMALLOC = 25     # Profundidade das pilhas guardadas por alocação
+LINHAS_RELATORIO = 40
+
+# Modo cProfile ativo. Verificado a cada requisição em perfilar(); com o
+# perfil desligado o custo é apenas a leitura desta variável.
+CPROFILE_ATIVO = False
+
+# --- 1. AMOSTRAGEM DAS PILHAS ---
+
+class AmostradorPilhas:
+    """
+    Uma thread lê as pilhas de todas as outras threads (sys._current_frames)
+    a cada 'intervalo' segundos e conta quantas vezes cada pilha apareceu.
+    Não instrumenta nada: as threads do servidor não pagam pelo perfil.
+    """
+
+    def __init__(self, intervalo=INTERVALO_AMOSTRAGEM):
+        self.intervalo = intervalo
+        self.pilhas = Counter() # (raiz, ..., folha) -> amostras
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="perfil-amostragem", daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    @staticmethod
+    def _nome_quadro(quadro):
+        codigo = quadro.f_code
+        return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+    def _executar(self):
+        proprio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            nomes_threads = {t.ident: t.name for t in threading.enumerate()}
+            for ident, quadro in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = []
+                while quadro is not None:
+                    pilha.append(self._nome_quadro(quadro))
+                    quadro = quadro.f_back
+                pilha.append(f"[{nomes_threads.get(ident, ident)}]")
+                self.pilhas[tuple(reversed(pilha))] += 1
+            self.amostras += 1
+
+    def relatorio(self):
+        """
+        Funções por amostras próprias (no topo da pilha) e inclusivas.
+        """
+        proprias, inclusivas = Counter(), Counter()
+        for pilha, n in self.pilhas.items():
+            proprias[pilha[-1]] += n
+            for funcao in set(pilha[1:]):
+                inclusivas[funcao] += n
+        total = sum(self.pilhas.values()) or 1
+
+        linhas = [f"Amostras: {self.amostras} (intervalo {self.intervalo * 1000:.1f} ms), "
+                  f"pilhas de thread: {total}",
+                  "Threads ociosas aparecem em funções de espera (wait, get, accept, recv).", ""]
+        for titulo, contagem in (("PRÓPRIAS (topo da pilha)", proprias), ("INCLUSIVAS", inclusivas)):
+            linhas.append(f"--- {titulo} ---")
+            for funcao, n in contagem.most_common(LINHAS_RELATORIO):
+                linhas.append(f"{n:8d} {100 * n / total:6.2f}%  {funcao}")
+            linhas.append("")
+        return '\n'.join(linhas)
+
+    def pilhas_agrupadas(self):
+        """
+        Formato "raiz;...;folha contagem" (compatível com flamegraph.pl e speedscope).
+        """
+        return '\n'.join(f"{';'.join(pilha)} {n}" for pilha, n in self.pilhas.most_common()) + '\n'
+
+# --- 2. CPROFILE DAS REQUISIÇÕES ---
+# Um único Profile por sessão, ligado durante uma requisição de cada vez: a
+# partir do Python 3.12 o cProfile usa sys.monitoring, que aceita apenas um
+# perfilador ativo no processo. Requisições que chegam enquanto outra está
+# sendo medida rodam sem perfil; o relatório é uma amostra das requisições.
+
+_perfil = None        # Profile da sessão ativa
+_trava_perfil = threading.Lock()
+_medidas = 0          # Requisições medidas na sessão
+_sem_perfil = 0       # Requisições que rodaram sem perfil (aproximado, sem trava)
+
+def perfilar(funcao, *args):
+    """
+    Executa funcao(*args); com o modo cProfile ativo e o perfil livre, sob o perfil.
+    """
+    global _medidas, _sem_perfil
+
+    if not CPROFILE_ATIVO:
+        return funcao(*args)
+    if not _trava_perfil.acquire(blocking=False):
+        _sem_perfil += 1 # Outra requisição está sendo medida
+        return funcao(*args)
+    try:
+        perfil = _perfil
+        if perfil is None: # Sessão encerrada neste meio-tempo
+            return funcao(*args)
+        try:
+            perfil.enable()
+        except ValueError: # Outra ferramenta de perfil ativa (ex.: depurador)
+            _sem_perfil += 1
+            return funcao(*args)
+        try:
+            return funcao(*args)
+        finally:
+            perfil.disable()
+            _medidas += 1
+    finally:
+        _trava_perfil.release()
+
+def _iniciar_cprofile():
+    global _perfil, _medidas, _sem_perfil
+
+    with _trava_perfil:
+        _perfil, _medidas, _sem_perfil = cProfile.Profile(), 0, 0
+
+def _coletar_cprofile():
+    """
+    Encerra o perfil da sessão: (pstats.Stats ou None, medidas, sem perfil).
+    """
+    global _perfil
+
+    with _trava_perfil: # Espera a requisição em medição terminar
+        perfil, _perfil = _perfil, None
+    if perfil is None or not _medidas:
+        return None, _medidas, _sem_perfil
+    perfil.create_stats()
+    return pstats.Stats(perfil), _medidas, _sem_perfil
+
+# --- 3. SESSÃO DE PERFIL (liga/desliga) ---
+
+class SessaoPerfil:
+    """
+    Uma sessão entre iniciar() e parar(). parar() grava em 'diretorio':
+      *-amostras.txt / *-pilhas.txt  (modo 'amostragem')
+      *-cprofile.txt / *.pstats      (modo 'cprofile')
+      *-memoria.txt                  (maiores diferenças de alocação, tracemalloc)
+    """
+
+    def __init__(self, modo='amostragem', diretorio=DIRETORIO_PADRAO, memoria=True):
+        if modo not in ('amostragem', 'cprofile'):
+            raise ValueError(f"Modo de perfil inválido: {modo}")
+        self.modo = modo
+        self.diretorio = diretorio
+        self.memoria = memoria
+        self.amostrador = None
+        self.snapshot_inicial = None
+        self.inicio = None
+
+    def iniciar(self):
+        global CPROFILE_ATIVO
+
+        self.inicio = time.time()
+        if self.memoria:
+            self._tracemalloc_nosso = not tracemalloc.is_tracing()
+            if self._tracemalloc_nosso:
+                tracemalloc.start(QUADROS_TRACEMALLOC)
+            self.snapshot_inicial = tracemalloc.take_snapshot()
+        if self.modo == 'amostragem':
+            self.amostrador = AmostradorPilhas().iniciar()
+        else:
+            _iniciar_cprofile()
+            CPROFILE_ATIVO = True
+        return self
+
+    def parar(self):
+        """
+        Encerra a sessão, grava os relatórios e retorna os caminhos gravados.
+        """
+        global CPROFILE_ATIVO
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        prefixo = os.path.join(
+            self.diretorio,
+            f"perfil-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.inicio))}"
+        )
+        duracao = time.time() - self.inicio
+        gravados = []
+
+        # Snapshot antes de montar os relatórios, que também alocam memória
+        final = None
+        if self.snapshot_inicial is not None:
+            final = tracemalloc.take_snapshot()
+            if self._tracemalloc_nosso:
+                tracemalloc.stop()
+
+        def gravar(sufixo, texto):
+            with open(prefixo + sufixo, 'w') as f:
+                f.write(texto)
+            gravados.append(prefixo + sufixo)
+
+        if self.amostrador is not None:
+            self.amostrador.parar()
+            gravar('-amostras.txt', f"Duração: {duracao:.1f}s\n" + self.amostrador.relatorio())
+            gravar('-pilhas.txt', self.amostrador.pilhas_agrupadas())
+        else:
+            CPROFILE_ATIVO = False
+            estatisticas, medidas, sem_perfil = _coletar_cprofile()
+            if estatisticas is None:
+                gravar('-cprofile.txt', "Nenhuma requisição medida durante o perfil.\n")
+            else:
+                estatisticas.dump_stats(prefixo + '.pstats')
+                gravados.append(prefixo + '.pstats')
+                saida = io.StringIO()
+                estatisticas.stream = saida
+                estatisticas.sort_stats('cumulative').print_stats(LINHAS_RELATORIO)
+                estatisticas.sort_stats('tottime').print_stats(LINHAS_RELATORIO)
+                gravar('-cprofile.txt', f"Duração: {duracao:.1f}s\n"
+                                        f"Requisições medidas: {medidas} (sem perfil, concorrentes: {sem_perfil})\n"
+                                        + saida.getvalue())
+
+        if final is not None:
+            # Descarta as alocações do próprio perfil
+            filtros = [tracemalloc.Filter(False, modulo.__file__)
+                       for modulo in (sys.modules[__name__], tracemalloc, cProfile, pstats)]
+            diferencas = final.filter_traces(filtros).compare_to(
+                self.snapshot_inicial.filter_traces(filtros), 'lineno'
+            )
+            total = sum(estatistica.size for estatistica in final.statistics('filename'))
+            linhas = [f"Duração: {duracao:.1f}s",
+                      f"Memória rastreada no fim: {total / 1024:.1f} KiB", "",
+                      "--- MAIORES DIFERENÇAS DE ALOCAÇÃO (por linha) ---"]
+            linhas.extend(str(diferenca) for diferenca in diferencas[:LINHAS_RELATORIO])
+            gravar('-memoria.txt', '\n'.join(linhas) + '\n')
+
+        return gravados
+
+# --- 4. CONTROLE POR SINAL ---
+
+_sessao = None
+_trava_sessao = threading.Lock()
+_configuracao = {'modo': 'amostragem', 'diretorio': DIRETORIO_PADRAO, 'memoria': True}
+
+def alternar():
+    """
+    Liga o perfil se estiver desligado; senão desliga e grava os relatórios.
+    """
+    global _sessao
+
+    with _trava_sessao:
+        if _sessao is None:
+            _sessao = SessaoPerfil(**_configuracao).iniciar()
+            print(f"[perfil] Iniciado (modo {_sessao.modo}). Envie SIGUSR1 de novo para parar.")
+        else:
+            sessao, _sessao = _sessao, None
+            for caminho in sessao.parar():
+                print(f"[perfil] Relatório gravado: {caminho}")
+
+def instalar_sinal(modo='amostragem', diretorio=DIRETORIO_PADRAO, memoria=True, sinal=None):
+    """
+    Faz 'sinal' (padrão: SIGUSR1) alternar o perfil. O trabalho roda em
+    outra thread, para o tratador não segurar a thread principal (que aceita
+    conexões). Retorna False, sem instalar nada, onde não há SIGUSR1
+    (Windows): o perfil segue disponível por alternar().
+    """
+    _configuracao.update(modo=modo, diretorio=diretorio, memoria=memoria)
+    if sinal is None:
+        sinal = getattr(signal, 'SIGUSR1', None)
+    if sinal is None:
+        print("[perfil] SIGUSR1 indisponível nesta plataforma: perfil por sinal desligado.")
+        return False
+    signal.signal(sinal, lambda *_: threading.Thread(target=alternar, name="perfil-controle").start())
+    return True
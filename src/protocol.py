@@ -7,6 +7,11 @@
 import struct
 import datetime
 
+try:
+    import numpy as np # Operações em lote vetorizadas (opcional)
+except ImportError:
+    np = None
+
 # --- 1. CONSTANTES DO PROTOCOLO (Tamanho em Bits) ---
 # Total de 457 bits (57.125 Bytes), arredondado para 58 bytes para comunicação.
 
@@ -32,13 +37,38 @@ TAM_NOME_BYTES = 50  # 50 caracteres * 1 byte/char (ASCII)
 TAM_CABECALHO_E_DATA_BYTES = 8 # Arredondando 57 bits para 8 bytes
 TAM_MSG_TOTAL = TAM_CABECALHO_E_DATA_BYTES + TAM_NOME_BYTES # 58 bytes
 
+# F. Transporte UDP: a mensagem de 58 bytes seguida de um identificador de
+# requisição (32 bits), usado para casar respostas e descartar retransmissões
+TAM_ID_REQUISICAO = 4
+TAM_DATAGRAMA = TAM_MSG_TOTAL + TAM_ID_REQUISICAO # 62 bytes
+
+# G. Cadastro em lote: uma mensagem de cadastro com Porta = 0 (não existe
+# porta 0) anuncia que seguem N mensagens de cadastro, com N no campo
+# Credencial. A resposta é a do cabeçalho seguida das N respostas, na ordem.
+PORTA_LOTE = 0
+LOTE_MAX = 1024 # Cadastros por lote
+
+# Credencial reservada nas respostas de "servidor ocupado" (fora da faixa
+# 1000-9999): Autorização = 0 e Credencial = todos os 14 bits em 1
+CREDENCIAL_OCUPADO = (1 << TAM_CREDENCIAL) - 1 # 16383
+
+# E. Posição (shift) de cada campo dentro dos 3 bytes de controle
+_SHIFT_CREDENCIAL = 0
+_SHIFT_AUTORIZACAO = _SHIFT_CREDENCIAL + TAM_CREDENCIAL
+_SHIFT_PORTA = _SHIFT_AUTORIZACAO + TAM_AUTORIZACAO
+_SHIFT_TIPO_MSG = _SHIFT_PORTA + TAM_PORTA
+
+# Máscara para limpar 1 bit de Autorizacao e 14 bits de Credencial
+_MASCARA_LIMPEZA_RESPOSTA = ~(((1 << TAM_AUTORIZACAO) - 1) << _SHIFT_AUTORIZACAO
+                              | ((1 << TAM_CREDENCIAL) - 1) << _SHIFT_CREDENCIAL)
+
 # --- 2. FUNÇÕES DE EMPACOTAMENTO ---
 
-def empacotar_requisicao_cliente(tipo_msg, porta, nome_usuario, credencial):
+def empacotar_requisicao_cliente(tipo_msg, porta, nome_usuario, credencial, instante=None):
 
-    agora = datetime.datetime.now()
+    agora = instante if instante is not None else datetime.datetime.now()
     dia, mes, ano = agora.day, agora.month, agora.year
-    hora, minuto, segundo = agora.hour, agora.hour, agora.second
+    hora, minuto, segundo = agora.hour, agora.minute, agora.second
 
     # --- 1. Montagem dos 20 bits do Cabeçalho de Controle ---
     # Ordem: Tipo(1) | Porta(4) | Autorizacao(1) | Credencial(14)
@@ -53,8 +83,6 @@ def empacotar_requisicao_cliente(tipo_msg, porta, nome_usuario, credencial):
     # Credencial
     cabecalho = (cabecalho | credencial)
 
-    print(cabecalho)
-
     # --- 2. Montagem dos 37 bits de Data e Hora ---
     # Ordem: Ano(11) | Mes(4) | Dia(5) | Hora(5) | Minuto(6) | Segundo(6)
     
@@ -72,8 +100,6 @@ def empacotar_requisicao_cliente(tipo_msg, porta, nome_usuario, credencial):
     # Segundo
     data_hora = (data_hora | segundo)
 
-    print(data_hora)
-
     # --- 3. Serialização para Bytes (8 bytes) ---
     # 3 bytes para o cabeçalho e 5 bytes para data/hora (total de 8)
     
@@ -91,114 +117,321 @@ def empacotar_requisicao_cliente(tipo_msg, porta, nome_usuario, credencial):
     
     return mensagem_bytes
 
-def empacotar_resposta_servidor(req_bytes, autorizacao, nova_credencial=0):
+def empacotar_resposta_servidor(req_bytes, autorizacao, nova_credencial=0, destino=None):
     """
     Modifica a mensagem de requisição (req_bytes) para criar uma resposta.
     Apenas modifica o campo Autorização e (opcionalmente) a Credencial.
+
+    A resposta é montada em um bytearray: 'destino' permite reaproveitar o
+    mesmo buffer de 58 bytes entre respostas (ex.: em uma conexão persistente).
+    Os bits são alterados no lugar, sem concatenar novos objetos bytes.
     """
     
-    # 1. Desempacota os 3 bytes de controle para acesso
-    cabecalho = int.from_bytes(req_bytes[:3], 'big')
+    # 1. Copia a requisição para o buffer de resposta
+    if destino is None:
+        destino = bytearray(req_bytes)
+    elif destino is not req_bytes:
+        destino[:] = req_bytes
     
-    # 2. Zera os campos Autorização e Credencial (para garantir que só a nova info seja usada)
+    # 2. Lê os 3 bytes de controle
+    cabecalho = (destino[0] << 16) | (destino[1] << 8) | destino[2]
     
-    # Máscara para limpar 1 bit de Autorizacao e 14 bits de Credencial
-    mascara_limpeza = ~(((1 << 1) - 1) << TAM_CREDENCIAL | ((1 << TAM_CREDENCIAL) - 1))
-    
-    # Aplica a limpeza
-    novo_cabecalho = cabecalho & mascara_limpeza
+    # 3. Zera os campos Autorização e Credencial e adiciona os novos valores
+    novo_cabecalho = (cabecalho & _MASCARA_LIMPEZA_RESPOSTA) \
+        | (autorizacao << _SHIFT_AUTORIZACAO) \
+        | (nova_credencial << _SHIFT_CREDENCIAL)
 
-    # 3. Adiciona a nova Autorização e Credencial (se houver)
-    
-    # Posição da Autorização (shift)
-    shift_autorizacao = TAM_CREDENCIAL
-    
-    # Posição da Credencial (shift)
-    shift_credencial = 0
+    # 4. Regrava apenas os 3 bytes de controle (data/hora e nome ficam intactos)
+    destino[0] = (novo_cabecalho >> 16) & 0xFF
+    destino[1] = (novo_cabecalho >> 8) & 0xFF
+    destino[2] = novo_cabecalho & 0xFF
     
-    # Adiciona a Autorização (1 bit)
-    novo_cabecalho |= (autorizacao << shift_autorizacao)
-    
-    # Adiciona a Nova Credencial (14 bits)
-    novo_cabecalho |= (nova_credencial << shift_credencial)
+    return destino
 
-    # 4. Reconstrói a mensagem
-    dados_controle_resposta = novo_cabecalho.to_bytes(3, 'big')
-    
-    # A resposta é a nova parte de controle + o resto da mensagem original (data/hora + nome)
-    mensagem_bytes_resposta = dados_controle_resposta + req_bytes[3:]
-    
-    return mensagem_bytes_resposta
 
+def empacotar_cabecalho_lote(quantidade):
+    """
+    Mensagem que anuncia um lote de 'quantidade' cadastros.
+    """
+    return empacotar_requisicao_cliente(1, PORTA_LOTE, "LOTE", quantidade)
+
+def eh_cabecalho_lote(mensagem_bytes):
+    """
+    True se a mensagem de 58 bytes é o cabeçalho de um cadastro em lote.
+    """
+    cabecalho = (mensagem_bytes[0] << 16) | (mensagem_bytes[1] << 8) | mensagem_bytes[2]
+    return ((cabecalho >> _SHIFT_TIPO_MSG) & ((1 << TAM_TIPO_MSG) - 1)) == 1 \
+        and ((cabecalho >> _SHIFT_PORTA) & ((1 << TAM_PORTA) - 1)) == PORTA_LOTE
+
+def empacotar_resposta_ocupado(req_bytes, destino=None):
+    """
+    Resposta de recusa por sobrecarga: a requisição não foi processada e o
+    cliente pode tentar novamente mais tarde.
+    """
+    return empacotar_resposta_servidor(req_bytes, 0, CREDENCIAL_OCUPADO, destino)
+
+def resposta_ocupado(autorizacao, credencial):
+    return autorizacao == 0 and credencial == CREDENCIAL_OCUPADO
+
+
+# --- 3. ENQUADRAMENTO (FRAMING) ---
+
+def receber_exatamente(conexao, tamanho=TAM_MSG_TOTAL):
+    """
+    Lê exatamente 'tamanho' bytes do socket, repetindo o recv() quando o TCP
+    entrega a mensagem em pedaços. Retorna menos bytes apenas se a conexão for
+    encerrada no meio (b'' indica encerramento limpo, antes de qualquer byte).
+    """
+    buffer = bytearray(tamanho)
+    visao = memoryview(buffer)
+    recebidos = 0
+    while recebidos < tamanho:
+        n = conexao.recv_into(visao[recebidos:], tamanho - recebidos)
+        if n == 0:
+            break # Conexão encerrada pelo outro lado
+        recebidos += n
+    return bytes(visao[:recebidos])
+
+
+def empacotar_datagrama(mensagem_bytes, id_requisicao):
+    """
+    Monta o datagrama UDP: mensagem de 58 bytes + identificador (4 bytes, Big Endian).
+    """
+    return bytes(mensagem_bytes) + id_requisicao.to_bytes(TAM_ID_REQUISICAO, 'big')
+
+def desempacotar_datagrama(datagrama):
+    """
+    Separa um datagrama UDP em (id_requisicao, mensagem de 58 bytes).
+    Retorna None se o tamanho for inválido.
+    """
+    if len(datagrama) != TAM_DATAGRAMA:
+        return None
+    return int.from_bytes(datagrama[TAM_MSG_TOTAL:], 'big'), datagrama[:TAM_MSG_TOTAL]
+
+
+# --- 4. FUNÇÃO DE DESEMPACOTAMENTO ---
+
+class MensagemView:
+    """
+    Visão somente-leitura sobre uma mensagem de 58 bytes (sem cópia, via
+    memoryview). Cada campo é decodificado apenas no primeiro acesso: o
+    servidor normalmente só precisa de tipo, porta e credencial, e não paga
+    pela decodificação do nome nem pela formatação da data/hora.
+    """
+
+    __slots__ = ('_buffer', '_cabecalho', '_nome_usuario', '_data_hora')
+
+    def __init__(self, mensagem_bytes):
+        self._buffer = memoryview(mensagem_bytes)
+        self._cabecalho = None
+        self._nome_usuario = None
+        self._data_hora = None
+
+    @property
+    def buffer(self):
+        return self._buffer
+
+    def _obter_cabecalho(self):
+        cabecalho = self._cabecalho
+        if cabecalho is None:
+            b = self._buffer
+            cabecalho = self._cabecalho = (b[0] << 16) | (b[1] << 8) | b[2]
+        return cabecalho
+
+    @property
+    def tipo_msg(self):
+        return (self._obter_cabecalho() >> _SHIFT_TIPO_MSG) & ((1 << TAM_TIPO_MSG) - 1)
+
+    @property
+    def porta(self):
+        return (self._obter_cabecalho() >> _SHIFT_PORTA) & ((1 << TAM_PORTA) - 1)
+
+    @property
+    def autorizacao(self):
+        return (self._obter_cabecalho() >> _SHIFT_AUTORIZACAO) & ((1 << TAM_AUTORIZACAO) - 1)
 
-# --- 3. FUNÇÃO DE DESEMPACOTAMENTO ---
+    @property
+    def credencial(self):
+        return (self._obter_cabecalho() >> _SHIFT_CREDENCIAL) & ((1 << TAM_CREDENCIAL) - 1)
+
+    @property
+    def nome_usuario(self):
+        if self._nome_usuario is None:
+            nome_bytes = self._buffer[TAM_CABECALHO_E_DATA_BYTES:TAM_MSG_TOTAL]
+            # Remove caracteres nulos de preenchimento
+            self._nome_usuario = bytes(nome_bytes).decode('ascii').strip('\x00')
+        return self._nome_usuario
+
+    @property
+    def data_hora(self):
+        if self._data_hora is None:
+            data_hora = int.from_bytes(self._buffer[3:TAM_CABECALHO_E_DATA_BYTES], 'big')
+
+            # Extrai os campos (do MENOS significativo para o MAIS)
+            segundo = data_hora & ((1 << TAM_SEGUNDO) - 1)
+            data_hora >>= TAM_SEGUNDO
+            minuto = data_hora & ((1 << TAM_MINUTO) - 1)
+            data_hora >>= TAM_MINUTO
+            hora = data_hora & ((1 << TAM_HORA) - 1)
+            data_hora >>= TAM_HORA
+            dia = data_hora & ((1 << TAM_DIA) - 1)
+            data_hora >>= TAM_DIA
+            mes = data_hora & ((1 << TAM_MES) - 1)
+            data_hora >>= TAM_MES
+            ano = (data_hora & ((1 << TAM_ANO) - 1)) + 2000 # Adiciona o offset
+
+            self._data_hora = f"{dia:02d}/{mes:02d}/{ano} {hora:02d}:{minuto:02d}:{segundo:02d}"
+        return self._data_hora
+
+    def como_dicionario(self):
+        return {
+            "tipo_msg": self.tipo_msg, # 0 para Acesso, 1 para Cadastro
+            "porta": self.porta,
+            "autorizacao": self.autorizacao, # 0 para Negado, 1 para Autorizado
+            "credencial": self.credencial,
+            "nome_usuario": self.nome_usuario,
+            "data_hora": self.data_hora
+        }
 
 def desempacotar_mensagem(mensagem_bytes):
     """
     Desempacota uma sequência de 58 bytes e retorna um dicionário de dados.
+    Mantida por compatibilidade; para acesso sob demanda use MensagemView.
     """
-    
-    # --- 1. Desempacota o Nome do Usuário (50 bytes) ---
-    # Da posição 8 até o final
-    nome_bytes = mensagem_bytes[TAM_CABECALHO_E_DATA_BYTES:]
-    # Desempacota e remove caracteres nulos de preenchimento
-    nome_usuario = struct.unpack(f'{TAM_NOME_BYTES}s', nome_bytes)[0].decode('ascii').strip('\x00')
-    
-    # --- 2. Extrai os 8 bytes de Controle e Data/Hora ---
-    cabecalho_data_bytes = mensagem_bytes[:TAM_CABECALHO_E_DATA_BYTES]
-    
-    # Extrai os dois inteiros (3 e 5 bytes, preenchidos) - Big Endian
-    cabecalho = int.from_bytes(cabecalho_data_bytes[:3], 'big') # 3 bytes (Controle)
-    data_hora = int.from_bytes(cabecalho_data_bytes[3:], 'big') # 5 bytes (Data/Hora)
-    
-    # --- 3. Extrai os campos do Cabeçalho (do MENOS significativo para o MAIS) ---
-    
-    # Credencial (14 bits)
-    credencial = cabecalho & ((1 << TAM_CREDENCIAL) - 1)
-    cabecalho >>= TAM_CREDENCIAL
-    
-    # Autorização (1 bit)
-    autorizacao = cabecalho & ((1 << TAM_AUTORIZACAO) - 1)
-    cabecalho >>= TAM_AUTORIZACAO
-    
-    # Porta (4 bits)
-    porta = cabecalho & ((1 << TAM_PORTA) - 1)
-    cabecalho >>= TAM_PORTA
-    
-    # Tipo de Mensagem (1 bit)
-    tipo_msg = cabecalho & ((1 << TAM_TIPO_MSG) - 1)
-    
-    # --- 4. Extrai os campos de Data/Hora (do MENOS significativo para o MAIS) ---
-    
-    # Segundo (6 bits)
-    segundo = data_hora & ((1 << TAM_SEGUNDO) - 1)
-    data_hora >>= TAM_SEGUNDO
-    
-    # Minuto (6 bits)
-    minuto = data_hora & ((1 << TAM_MINUTO) - 1)
-    data_hora >>= TAM_MINUTO
-    
-    # Hora (5 bits)
-    hora = data_hora & ((1 << TAM_HORA) - 1)
-    data_hora >>= TAM_HORA
-    
-    # Dia (5 bits)
-    dia = data_hora & ((1 << TAM_DIA) - 1)
-    data_hora >>= TAM_DIA
-    
-    # Mês (4 bits)
-    mes = data_hora & ((1 << TAM_MES) - 1)
-    data_hora >>= TAM_MES
-    
-    # Ano (11 bits) - Adiciona o offset
-    ano = (data_hora & ((1 << TAM_ANO) - 1)) + 2000
-    
-    # --- 5. Retorna os dados ---
+    return MensagemView(mensagem_bytes).como_dicionario()
+
+
+# --- 5. OPERAÇÕES EM LOTE (NumPy) ---
+# Os 8 primeiros bytes de cada mensagem, lidos como um inteiro de 64 bits
+# Big Endian, têm a data/hora nos 40 bits menos significativos e o controle
+# nos 24 seguintes. Cada campo vira um deslocamento e uma máscara, aplicados
+# a todas as mensagens de uma vez.
+
+_BITS_DATA_HORA = 8 * (TAM_CABECALHO_E_DATA_BYTES - 3) # 40
+
+def _posicoes(deslocamento, *campos):
+    """
+    [(nome, bits), ...] do menos para o mais significativo ->
+    {nome: (deslocamento, máscara)}
+    """
+    posicoes = {}
+    for nome, bits in campos:
+        posicoes[nome] = (deslocamento, (1 << bits) - 1)
+        deslocamento += bits
+    return posicoes
+
+_POSICOES = {
+    **_posicoes(_BITS_DATA_HORA + _SHIFT_CREDENCIAL,
+                ('credencial', TAM_CREDENCIAL), ('autorizacao', TAM_AUTORIZACAO),
+                ('porta', TAM_PORTA), ('tipo_msg', TAM_TIPO_MSG)),
+    **_posicoes(0,
+                ('segundo', TAM_SEGUNDO), ('minuto', TAM_MINUTO), ('hora', TAM_HORA),
+                ('dia', TAM_DIA), ('mes', TAM_MES), ('ano', TAM_ANO)),
+}
+
+def _exigir_numpy(funcao):
+    if np is None:
+        raise RuntimeError(f"{funcao} requer NumPy (pip install numpy).")
+
+def _colunas_data_hora(instantes):
+    """
+    Array datetime64 -> colunas ano, mes, dia, hora, minuto e segundo.
+    """
+    instantes = np.asarray(instantes, dtype='datetime64[s]')
+    anos = instantes.astype('datetime64[Y]')
+    meses = instantes.astype('datetime64[M]')
+    dias = instantes.astype('datetime64[D]')
+    segundos = (instantes - dias).astype(np.int64)
     return {
-        "tipo_msg": tipo_msg, # 0 para Acesso, 1 para Cadastro
-        "porta": porta,
-        "autorizacao": autorizacao, # 0 para Negado, 1 para Autorizado
-        "credencial": credencial,
-        "nome_usuario": nome_usuario,
-        "data_hora": f"{dia:02d}/{mes:02d}/{ano} {hora:02d}:{minuto:02d}:{segundo:02d}"
+        'ano': anos.astype(np.int64) + 1970,
+        'mes': (meses - anos).astype(np.int64) + 1,
+        'dia': (dias - meses).astype(np.int64) + 1,
+        'hora': segundos // 3600,
+        'minuto': segundos // 60 % 60,
+        'segundo': segundos % 60
     }
+
+def empacotar_muitas(tipo_msg, porta, credencial, nomes, autorizacao=0, instante=None):
+    """
+    Versão vetorizada de empacotar_requisicao_cliente: retorna N mensagens
+    de 58 bytes contíguas. Cada campo é um valor único (repetido em todas as
+    mensagens) ou uma sequência/array com um valor por mensagem.
+
+    nomes:    string, lista de strings ASCII ou array de bytes ('S').
+    instante: datetime (padrão: agora, lido uma única vez), array datetime64
+              ou dicionário com as colunas ano, mes, dia, hora, minuto e
+              segundo, como o retornado por desempacotar_muitas.
+    """
+    _exigir_numpy('empacotar_muitas')
+
+    if instante is None:
+        instante = datetime.datetime.now()
+    if isinstance(instante, datetime.datetime):
+        datas = {'ano': instante.year, 'mes': instante.month, 'dia': instante.day,
+                 'hora': instante.hour, 'minuto': instante.minute, 'segundo': instante.second}
+    elif isinstance(instante, dict):
+        datas = {campo: instante[campo] for campo in ('ano', 'mes', 'dia', 'hora', 'minuto', 'segundo')}
+    else:
+        datas = _colunas_data_hora(instante)
+    datas['ano'] = np.asarray(datas['ano'], dtype=np.int64) - 2000 # Somente o offset
+
+    if isinstance(nomes, str):
+        nomes = [nomes]
+    if not (isinstance(nomes, np.ndarray) and nomes.dtype.kind == 'S'):
+        nomes = [nome.encode('ascii') for nome in nomes]
+    nomes = np.asarray(nomes).astype(f'S{TAM_NOME_BYTES}') # Trunca/completa com nulos, como '50s'
+
+    campos = {'tipo_msg': tipo_msg, 'porta': porta, 'autorizacao': autorizacao,
+              'credencial': credencial, **datas}
+    campos = {nome: np.asarray(valor, dtype=np.int64) for nome, valor in campos.items()}
+    quantidade = np.broadcast_shapes(nomes.shape, *(valor.shape for valor in campos.values()))
+    quantidade = quantidade[0] if quantidade else 1
+
+    palavras = np.zeros(quantidade, dtype=np.uint64)
+    for nome, valor in campos.items():
+        deslocamento, mascara = _POSICOES[nome]
+        if ((valor < 0) | (valor > mascara)).any():
+            raise ValueError(f"Campo {nome} fora da faixa permitida (0-{mascara}).")
+        palavras |= np.broadcast_to(valor, (quantidade,)).astype(np.uint64) << np.uint64(deslocamento)
+
+    mensagens = np.empty((quantidade, TAM_MSG_TOTAL), dtype=np.uint8)
+    mensagens[:, :TAM_CABECALHO_E_DATA_BYTES] = palavras.astype('>u8').view(np.uint8).reshape(quantidade, -1)
+    nomes = np.ascontiguousarray(np.broadcast_to(nomes, (quantidade,)))
+    mensagens[:, TAM_CABECALHO_E_DATA_BYTES:] = nomes.view(np.uint8).reshape(quantidade, -1)
+    return mensagens.tobytes()
+
+def desempacotar_muitas(mensagens_bytes):
+    """
+    Versão vetorizada de desempacotar_mensagem para um buffer de N mensagens
+    de 58 bytes contíguas (bytes, bytearray, memoryview ou array). Retorna um
+    dicionário de arrays NumPy, um por campo: tipo_msg, porta, autorizacao,
+    credencial, ano, mes, dia, hora, minuto, segundo e nome_usuario (bytes,
+    sem os nulos das duas pontas, como em desempacotar_mensagem;
+    np.char.decode(..., 'ascii') para strings).
+    """
+    _exigir_numpy('desempacotar_muitas')
+
+    dados = np.frombuffer(mensagens_bytes, dtype=np.uint8)
+    if dados.size % TAM_MSG_TOTAL:
+        raise ValueError(f"Tamanho do buffer ({dados.size} bytes) não é múltiplo de {TAM_MSG_TOTAL}.")
+    mensagens = dados.reshape(-1, TAM_MSG_TOTAL)
+
+    palavras = np.ascontiguousarray(mensagens[:, :TAM_CABECALHO_E_DATA_BYTES]).view('>u8')[:, 0]
+    palavras = palavras.astype(np.uint64) # Ordem de bytes nativa para os deslocamentos
+
+    colunas = {}
+    for nome, (deslocamento, mascara) in _POSICOES.items():
+        tipo = np.uint16 if mascara > 0xFF else np.uint8
+        colunas[nome] = ((palavras >> np.uint64(deslocamento)) & np.uint64(mascara)).astype(tipo)
+    colunas['ano'] = colunas['ano'] + np.uint16(2000) # Adiciona o offset
+    nomes = np.ascontiguousarray(mensagens[:, TAM_CABECALHO_E_DATA_BYTES:])
+    # O dtype 'S' já descarta os nulos finais; os iniciais são removidos
+    # deslocando cada nome para a esquerda, como no strip('\x00')
+    iniciais = np.argmax(nomes != 0, axis=1)
+    if iniciais.any():
+        posicoes = np.arange(TAM_NOME_BYTES) + iniciais[:, None]
+        nomes = np.where(posicoes < TAM_NOME_BYTES,
+                         np.take_along_axis(nomes, np.minimum(posicoes, TAM_NOME_BYTES - 1), axis=1), 0)
+        nomes = np.ascontiguousarray(nomes, dtype=np.uint8)
+    colunas['nome_usuario'] = nomes.view(f'S{TAM_NOME_BYTES}')[:, 0]
+    return colunas
@@ -0,0 +1,269 @@
+# ======================================================================
+# ARQUIVO: replication.py
+# FUNÇÃO: Replicação primário -> réplicas por um canal TCP local. O
+#         primário envia as alterações de credenciais e os registros de
+#         acesso em linhas JSON; as réplicas aplicam tudo nos próprios
+#         arquivos, atendem verificações de acesso (somente leitura) e podem
+#         ser promovidas quando o primário cai.
+# ======================================================================
+
+import json
+import queue
+import socket
+import threading
+import time
+
+import server_data
+
+# --- Configuração ---
+HOST_REPLICACAO = '127.0.0.1'
+FILA_MAX_REPLICA = 65536   # Eventos pendentes por réplica; além disso ela é desconectada
+INTERVALO_RECONEXAO = 1.0  # Segundos entre tentativas de conexão da réplica
+EVENTOS_POR_ENVIO = 1024   # Eventos agrupados em um único sendall
+
+# --- 1. MENSAGENS ---
+# Uma linha JSON por evento:
+#   {"tipo": "copia", "formato": "texto"|"binario", "credenciais": [[código, nome, nível], ...]}
+#     (estado completo; primeiro evento de cada conexão)
+#   {"tipo": "credencial", "registros": [[código, nome, nível], ...]} (nível 0 = revogação)
+#   {"tipo": "registro", "linha": "..."} ou {"tipo": "registro", "binario": "<hex>"}
+
+def _codificar(evento):
+    return (json.dumps(evento, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+def _evento(tipo, dados):
+    if tipo == 'credencial':
+        return {'tipo': 'credencial', 'registros': [list(registro) for registro in dados]}
+    if isinstance(dados, bytes):
+        return {'tipo': 'registro', 'binario': dados.hex()}
+    return {'tipo': 'registro', 'linha': dados}
+
+# --- 2. PRIMÁRIO ---
+
+class _Replica:
+    def __init__(self, conexao, endereco):
+        self.conexao = conexao
+        self.endereco = endereco
+        self.fila = queue.Queue(FILA_MAX_REPLICA)
+        self.ativa = True
+
+class PrimarioReplicacao:
+    """
+    Aceita réplicas em (host, porta). Cada réplica recebe primeiro a cópia
+    completa das credenciais e depois o fluxo de alterações, enviado por uma
+    thread própria: uma réplica lenta não atrasa o servidor (se a sua fila
+    encher, ela é desconectada e recomeça pela cópia).
+
+    A réplica é registrada antes da cópia ser tirada, então nenhuma alteração
+    se perde; as que já estão na cópia são reaplicadas na mesma ordem, o que
+    não muda o resultado (vale a última escrita de cada código).
+    """
+
+    def __init__(self, porta, host=HOST_REPLICACAO):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, porta))
+        self.socket.listen()
+        self._replicas = []
+        self._trava = threading.Lock() # Protege apenas a lista de réplicas
+
+    def iniciar(self):
+        server_data.adicionar_ouvinte(self.publicar)
+        threading.Thread(target=self._aceitar, name="replicacao-primario", daemon=True).start()
+        return self
+
+    def publicar(self, tipo, dados):
+        if not self._replicas:
+            return # Nenhuma réplica: não serializa nada
+        linha = _codificar(_evento(tipo, dados))
+        with self._trava:
+            replicas = list(self._replicas)
+        for replica in replicas:
+            try:
+                replica.fila.put_nowait(linha)
+            except queue.Full:
+                print(f"[replicação] Réplica {replica.endereco} atrasada demais; desconectando.")
+                self._desconectar(replica)
+
+    def _aceitar(self):
+        while True:
+            try:
+                conexao, endereco = self.socket.accept()
+            except OSError:
+                break # Socket fechado
+            conexao.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            replica = _Replica(conexao, endereco)
+            with self._trava:
+                self._replicas.append(replica)
+            threading.Thread(target=self._enviar, args=(replica,), name="replicacao-envio", daemon=True).start()
+
+    def _enviar(self, replica):
+        try:
+            copia = server_data.listar_credenciais()
+            replica.conexao.sendall(_codificar({
+                'tipo': 'copia', 'formato': server_data.formato_registro(), 'credenciais': copia
+            }))
+            print(f"[replicação] Réplica {replica.endereco} conectada ({len(copia)} credenciais copiadas).")
+
+            while replica.ativa:
+                linha = replica.fila.get()
+                if linha is None:
+                    break
+                lote = [linha]
+                while len(lote) < EVENTOS_POR_ENVIO:
+                    try:
+                        linha = replica.fila.get_nowait()
+                    except queue.Empty:
+                        break
+                    if linha is None:
+                        replica.ativa = False
+                        break
+                    lote.append(linha)
+                replica.conexao.sendall(b''.join(lote))
+        except OSError as e:
+            print(f"[replicação] Réplica {replica.endereco} desconectada: {e}")
+        finally:
+            self._desconectar(replica)
+
+    def _desconectar(self, replica):
+        with self._trava:
+            if replica in self._replicas:
+                self._replicas.remove(replica)
+        replica.ativa = False
+        try:
+            replica.fila.put_nowait(None) # Acorda a thread de envio
+        except queue.Full:
+            pass
+        try:
+            replica.conexao.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        replica.conexao.close()
+
+    def encerrar(self):
+        server_data.remover_ouvinte(self.publicar)
+        self.socket.close()
+        with self._trava:
+            replicas = list(self._replicas)
+        for replica in replicas:
+            self._desconectar(replica)
+
+# --- 3. RÉPLICA ---
+
+class ReplicaReplicacao:
+    """
+    Segue um primário, tentando os endereços (host, porta) em ordem, e
+    aplica os eventos recebidos. Enquanto réplica, o servidor fica somente
+    leitura: verificações de acesso são atendidas, cadastros são negados.
+    promover() para de seguir o primário e libera a escrita; com
+    'promover_apos', isso acontece sozinho após tantos segundos sem primário.
+
+    Limitações da promoção automática:
+    - "Sem primário" é só a perda da conexão TCP com ele. Numa falha de rede
+      passageira, o primário pode continuar no ar aceitando cadastros; os
+      dois nós passam a alocar códigos e podem entregar o mesmo código a
+      pessoas diferentes. Nada reconcilia os dois quando o antigo primário
+      volta.
+    - Ao reconectar, a cópia inicial ressincroniza só as credenciais: os
+      registros de acesso gerados enquanto a réplica estava desconectada
+      não chegam a ela.
+    Onde isso não é aceitável, deixe 'promover_apos' em None e promova
+    manualmente, depois de confirmar que o primário caiu.
+    """
+
+    def __init__(self, enderecos, promover_apos=None, ao_promover=None):
+        self.enderecos = enderecos
+        self.promover_apos = promover_apos
+        self.ao_promover = ao_promover
+        self.promovida = False
+        self.conexao = None
+        self.eventos_aplicados = 0
+
+    def iniciar(self):
+        server_data.definir_somente_leitura(True)
+        threading.Thread(target=self._executar, name="replicacao-replica", daemon=True).start()
+        return self
+
+    def _executar(self):
+        sem_primario_desde = time.monotonic()
+        while not self.promovida:
+            for host, porta in self.enderecos:
+                try:
+                    conexao = socket.create_connection((host, porta), INTERVALO_RECONEXAO)
+                except OSError:
+                    continue
+                print(f"[replicação] Seguindo o primário {host}:{porta}.")
+                self._seguir(conexao)
+                print(f"[replicação] Conexão com o primário {host}:{porta} perdida.")
+                sem_primario_desde = time.monotonic()
+                break
+
+            if self.promovida:
+                break
+            if self.promover_apos is not None and time.monotonic() - sem_primario_desde >= self.promover_apos:
+                print(f"[replicação] Sem primário há {self.promover_apos}s: promovendo esta réplica.")
+                self.promover()
+                break
+            time.sleep(INTERVALO_RECONEXAO)
+
+    def _seguir(self, conexao):
+        self.conexao = conexao
+        conexao.settimeout(None)
+        conexao.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        try:
+            with conexao, conexao.makefile('rb') as entrada:
+                for linha in entrada:
+                    if self.promovida:
+                        break
+                    self._aplicar(json.loads(linha))
+        except (OSError, ValueError) as e:
+            if not self.promovida:
+                print(f"[replicação] Erro no fluxo de replicação: {e}")
+        finally:
+            self.conexao = None
+
+    def _aplicar(self, evento):
+        tipo = evento['tipo']
+        if tipo == 'copia':
+            # Os registros de acesso chegam no formato do primário: com
+            # --formato-registro diferente, a réplica não o segue
+            formato = evento.get('formato', 'texto')
+            if formato != server_data.formato_registro():
+                raise ValueError(f"primário grava o registro em formato '{formato}' e esta réplica em "
+                                 f"'{server_data.formato_registro()}' (use o mesmo --formato-registro)")
+            server_data.substituir_credenciais(evento['credenciais'])
+        elif tipo == 'credencial':
+            server_data.aplicar_credenciais(evento['registros'])
+        elif 'binario' in evento:
+            server_data.aplicar_registro(bytes.fromhex(evento['binario']))
+        else:
+            server_data.aplicar_registro(evento['linha'])
+        self.eventos_aplicados += 1
+
+    def promover(self):
+        """
+        Torna esta réplica o novo primário (gravável).
+        """
+        if self.promovida:
+            return
+        self.promovida = True
+        conexao = self.conexao
+        if conexao is not None:
+            try:
+                conexao.shutdown(socket.SHUT_RDWR) # Interrompe a leitura do fluxo
+            except OSError:
+                pass
+        server_data.definir_somente_leitura(False)
+        print("[replicação] Réplica promovida: cadastros liberados.")
+        if self.ao_promover is not None:
+            self.ao_promover()
+
+def interpretar_enderecos(texto):
+    """
+    "host:porta,host:porta" (ou só "porta", em 127.0.0.1) -> [(host, porta), ...]
+    """
+    enderecos = []
+    for item in texto.split(','):
+        host, _, porta = item.strip().rpartition(':')
+        enderecos.append((host or HOST_REPLICACAO, int(porta)))
+    return enderecos
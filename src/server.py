@@ -4,151 +4,828 @@
 #         processa requisições de acesso/cadastro e gerencia dados.
 # ======================================================================
 
+import argparse
+import asyncio
+import os
+import signal
 import socket
 import threading
 import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Importa os módulos criados nas etapas anteriores
+import access_stats
+import admission
+import metrics
+import profiling
 import protocol
+import replication
 import server_data
 
 # --- Configurações de Rede ---
 HOST = '127.0.0.1'  # Servidor rodando na própria máquina (localhost)
 PORT = 65432        # Porta arbitrária (pode ser qualquer uma acima de 1024)
-MAX_CONEXOES = 5    # Número máximo de clientes esperando na fila
+MAX_CONEXOES = 128  # Número máximo de clientes esperando na fila (backlog do listen)
+BACKLOG_ASYNC = 1024 # Fila de conexões no modo asyncio (suporta rajadas maiores)
+
+# --- Conexões Persistentes (keep-alive) ---
+KEEP_ALIVE = False   # True: várias mensagens de 58 bytes por conexão TCP
+TIMEOUT_OCIOSO = 30.0 # Segundos sem mensagens até o servidor encerrar a conexão
+
+# --- Controle de Admissão ---
+POOL_THREADS = 64       # Threads que atendem conexões (threads) ou processam requisições (asyncio)
+TAMANHO_FILA = 256      # Trabalho aguardando uma thread livre; além disso, resposta "ocupado"
+
+_pool_conexoes = None    # Pool do modo threads (iniciar_servidor)
+_conexoes_ociosas = None # Espera das conexões sem mensagem pendente (modo threads)
+
+# --- Transporte UDP ---
+UDP_WORKERS = 8           # Threads que processam datagramas
+UDP_TTL_DUPLICATAS = 30.0 # Segundos em que uma resposta fica guardada para retransmissões
+UDP_MAX_DUPLICATAS = 65536 # Limite de respostas guardadas
 
 # Inicializa o banco de dados (arquivos TXT)
 server_data.carregar_credenciais()
 
-def processar_requisicao(conexao, endereco):    
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Conexão estabelecida com {endereco}")
+def tratar_mensagem(dados_recebidos, endereco, destino=None):
+    """
+    Processa uma mensagem de 58 bytes já recebida e retorna os bytes da resposta.
+    Independe do transporte: é usada tanto pelo modo com threads quanto pelo asyncio.
+    'destino' é um bytearray opcional reaproveitado para montar a resposta.
+    """
+    # 2. DESEMPACOTAR A MENSAGEM (campos decodificados sob demanda)
+    t0 = time.perf_counter()
+    mensagem = protocol.MensagemView(dados_recebidos)
+    
+    tipo = mensagem.tipo_msg
+    porta_id = mensagem.porta
+    credencial = mensagem.credencial
+    t1 = time.perf_counter()
+    metrics.observar_estagio('desempacotar', t1 - t0)
+    metrics.REQUISICOES.incrementar('acesso' if tipo == 0 else 'cadastro', f"P{porta_id}")
 
-    # Garante que a conexão será encerrada ao final
-    try:
-        # 1. RECEBER OS DADOS
-        # O servidor espera exatamente o tamanho da mensagem definida (58 bytes)
-        dados_recebidos = conexao.recv(protocol.TAM_MSG_TOTAL)
-        
-        if len(dados_recebidos) != protocol.TAM_MSG_TOTAL:
-            print(f"[{endereco}] Erro: Tamanho de mensagem inválido ({len(dados_recebidos)} bytes). Encerrando.")
-            return
+    # Limites de taxa por porta/cliente: recusa sem processar
+    motivo_recusa = admission.verificar_limites(porta_id, endereco)
+    if motivo_recusa:
+        admission.registrar_rejeicao(motivo_recusa)
+        return protocol.empacotar_resposta_ocupado(dados_recebidos, destino)
+    
+    resultado_autorizacao = 0 # Assume negado inicialmente
 
-        # 2. DESEMPACOTAR A MENSAGEM
-        dados = protocol.desempacotar_mensagem(dados_recebidos)
+    if protocol.eh_cabecalho_lote(dados_recebidos):
+        # Cabeçalho de lote fora de tratar_lote (ex.: via UDP): recusa sem cadastrar
+        metrics.ERROS.incrementar('lote_invalido')
+        return protocol.empacotar_resposta_servidor(dados_recebidos, 0, 0, destino)
+    
+    # 3. PROCESSAR A REQUISIÇÃO (ACESSO ou CADASTRO)
+    
+    if tipo == 0: # REQUISIÇÃO DE ACESSO
         
-        tipo = dados['tipo_msg']
-        porta_id = dados['porta']
-        credencial = dados['credencial']
-        nome_usuario = dados['nome_usuario']
-        data_hora_log = dados['data_hora']
+        # Carrega a lista de credenciais
+        credenciais = server_data.carregar_credenciais()
+        t2 = time.perf_counter()
+        metrics.observar_estagio('credenciais', t2 - t1)
         
-        resultado_autorizacao = 0 # Assume negado inicialmente
+        # Verifica o acesso
+        resultado_autorizacao, motivo = server_data.verificar_acesso(
+            credenciais, porta_id, credencial
+        )
+        metrics.observar_estagio('verificacao', time.perf_counter() - t2)
+        metrics.DECISOES.incrementar('acesso', 'autorizado' if resultado_autorizacao else 'negado')
         
-        # 3. PROCESSAR A REQUISIÇÃO (ACESSO ou CADASTRO)
+        print(f"[{endereco} - P{porta_id}] ACESSO {mensagem.nome_usuario} ({credencial}): {'AUTORIZADO' if resultado_autorizacao else 'NEGADO'} - {motivo}")
         
-        if tipo == 0: # REQUISIÇÃO DE ACESSO
-            
-            # Carrega a lista de credenciais
-            credenciais = server_data.carregar_credenciais()
-            
-            # Verifica o acesso
-            resultado_autorizacao, motivo = server_data.verificar_acesso(
-                credenciais, porta_id, credencial
-            )
-            
-            print(f"[{endereco} - P{porta_id}] ACESSO {nome_usuario} ({credencial}): {'AUTORIZADO' if resultado_autorizacao else 'NEGADO'} - {motivo}")
-            
-            # A credencial de resposta é a mesma credencial de acesso
-            credencial_resposta = credencial 
+        # A credencial de resposta é a mesma credencial de acesso
+        credencial_resposta = credencial 
 
-        elif tipo == 1: # REQUISIÇÃO DE CADASTRO
-            
-            # Porta onde o cadastro foi feito define o Nível de Acesso (Ex: P3 = Nível 3)
-            nivel_cadastro = porta_id 
+    elif tipo == 1: # REQUISIÇÃO DE CADASTRO
+        
+        # Porta onde o cadastro foi feito define o Nível de Acesso (Ex: P3 = Nível 3)
+        nivel_cadastro = porta_id 
+        
+        # Aloca a nova credencial e grava o cadastro (um único registro)
+        nova_credencial, msg = server_data.gerar_nova_credencial(nivel_cadastro, mensagem.nome_usuario)
+        t2 = time.perf_counter()
+        metrics.observar_estagio('cadastro', t2 - t1)
+        metrics.DECISOES.incrementar('cadastro', 'sucesso' if nova_credencial else 'falha')
+        
+        if nova_credencial:
+            resultado_autorizacao = 1 # Cadastro realizado com sucesso
+            credencial_resposta = nova_credencial
+            motivo = f"Cadastro OK. Credencial: {nova_credencial}, Nível: {nivel_cadastro}"
+        else:
+            resultado_autorizacao = 0 # Falha no cadastro
+            credencial_resposta = 0
+            motivo = f"Falha no cadastro: {msg}"
             
-            # Gera a nova credencial e atualiza o nome
-            nova_credencial, msg = server_data.gerar_nova_credencial(nivel_cadastro)
+        print(f"[{endereco} - P{porta_id}] CADASTRO {mensagem.nome_usuario}: {'SUCESSO' if resultado_autorizacao else 'FALHA'} - {motivo}")
+        
+    # 4. REGISTRAR A TENTATIVA DE ACESSO/CADASTRO
+    t1 = time.perf_counter()
+    server_data.registrar_acesso_mensagem(
+        mensagem,
+        credencial_resposta if tipo == 1 else credencial, # Loga a credencial gerada no cadastro
+        resultado_autorizacao
+    )
+    t2 = time.perf_counter()
+    metrics.observar_estagio('registro', t2 - t1)
+
+    # 5. MONTAR A RESPOSTA
+    resposta = protocol.empacotar_resposta_servidor(
+        dados_recebidos, 
+        resultado_autorizacao, 
+        credencial_resposta,
+        destino
+    )
+    metrics.observar_estagio('resposta', time.perf_counter() - t2)
+    return resposta
+
+def responder_ocupado(mensagens_bytes):
+    """
+    Resposta "ocupado" para uma ou mais mensagens de 58 bytes concatenadas
+    (ex.: um lote inteiro, cabeçalho e cadastros).
+    """
+    respostas = bytearray(mensagens_bytes)
+    visao = memoryview(respostas)
+    for i in range(0, len(respostas), protocol.TAM_MSG_TOTAL):
+        mensagem = visao[i:i + protocol.TAM_MSG_TOTAL]
+        protocol.empacotar_resposta_ocupado(mensagem, mensagem)
+    return respostas
+
+def tratar_lote(cabecalho_bytes, itens_bytes, endereco):
+    """
+    Cadastro em lote: 'itens_bytes' são as N mensagens de cadastro que
+    seguiram o cabeçalho. Todos os códigos são alocados e gravados de uma
+    vez (uma única escrita no arquivo de credenciais). Retorna a resposta do
+    cabeçalho (Credencial = N cadastrados) seguida das N respostas.
+    """
+    t0 = time.perf_counter()
+    tamanho = protocol.TAM_MSG_TOTAL
+    itens = [protocol.MensagemView(itens_bytes[i:i + tamanho]) for i in range(0, len(itens_bytes), tamanho)]
+    metrics.REQUISICOES.incrementar('cadastro_lote', f"P{protocol.PORTA_LOTE}")
+
+    motivo_recusa = admission.verificar_limites(protocol.PORTA_LOTE, endereco)
+    if motivo_recusa:
+        admission.registrar_rejeicao(motivo_recusa)
+        return responder_ocupado(cabecalho_bytes + itens_bytes)
+
+    # Respostas montadas no lugar, sobre uma cópia do cabeçalho e dos itens
+    respostas = bytearray(cabecalho_bytes)
+    respostas += itens_bytes
+    visao = memoryview(respostas)
+
+    # O nível de cada cadastro é a porta informada na sua mensagem, como no cadastro individual
+    codigos, msg = server_data.gerar_credenciais_em_lote([(m.nome_usuario, m.porta) for m in itens])
+    t1 = time.perf_counter()
+    metrics.observar_estagio('cadastro', t1 - t0)
+    metrics.DECISOES.incrementar('cadastro', 'sucesso' if codigos else 'falha', n=len(itens))
+    print(f"[{endereco}] CADASTRO EM LOTE ({len(itens)}): {'SUCESSO' if codigos is not None else 'FALHA'} - {msg}")
+
+    resultado = 1 if codigos is not None else 0
+    codigos = codigos if codigos is not None else [0] * len(itens)
+    cabecalho = visao[:tamanho]
+    protocol.empacotar_resposta_servidor(cabecalho, resultado, len(itens) if resultado else 0, cabecalho)
+    for i, (mensagem, codigo) in enumerate(zip(itens, codigos), start=1):
+        server_data.registrar_acesso_mensagem(mensagem, codigo, resultado)
+        resposta = visao[i * tamanho:(i + 1) * tamanho]
+        protocol.empacotar_resposta_servidor(resposta, resultado, codigo, resposta)
+    metrics.observar_estagio('registro', time.perf_counter() - t1)
+    return respostas
+
+def _ha_dados_pendentes(conexao):
+    """
+    True se o cliente já enviou mais bytes (ou encerrou a conexão), sem
+    bloquear e sem consumi-los.
+    """
+    timeout_anterior = conexao.gettimeout()
+    conexao.settimeout(0)
+    try:
+        conexao.recv(1, socket.MSG_PEEK)
+    except BlockingIOError:
+        return False
+    except OSError:
+        pass # O recv seguinte encontra o erro
+    finally:
+        conexao.settimeout(timeout_anterior)
+    return True
+
+def _encerrar_conexao(conexao, endereco):
+    print(f"[{endereco}] Conexão encerrada.")
+    metrics.CONEXOES_ATIVAS.decrementar()
+    conexao.close() # Conexões são encerradas após a troca de mensagens
+
+def processar_requisicao(conexao, endereco, retomada=False):
+    """
+    Atende uma conexão no pool de threads. Quando o cliente ainda não
+    enviou a mensagem (conexão nova ou keep-alive entre mensagens), a
+    conexão vai para a espera de conexões ociosas e a thread volta ao pool;
+    a mensagem a traz de volta (retomada=True). Assim, clientes que conectam
+    e não enviam nada nunca ocupam as threads.
+    """
+    if not retomada:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Conexão estabelecida com {endereco}")
+        metrics.CONEXOES_ATIVAS.incrementar()
+    ociosa = False
+
+    # Garante que a conexão será encerrada ao final
+    try:
+        # Limite para o restante de uma mensagem já começada (antes dela, a
+        # conexão espera no seletor e o limite é o mesmo)
+        conexao.settimeout(TIMEOUT_OCIOSO)
+
+        # Buffer de resposta reaproveitado entre as mensagens da conexão
+        resposta_buffer = bytearray(protocol.TAM_MSG_TOTAL)
+
+        while True:
+            if _conexoes_ociosas is not None and not _ha_dados_pendentes(conexao):
+                # Nenhuma mensagem chegou ainda: a thread volta ao pool até o cliente enviar
+                _conexoes_ociosas.esperar(conexao, endereco)
+                ociosa = True
+                return
+
+            # 1. RECEBER OS DADOS
+            # O servidor espera exatamente o tamanho da mensagem definida (58 bytes)
+            # (o tempo de recv inclui a espera pelo cliente)
+            t0 = time.perf_counter()
+            dados_recebidos = protocol.receber_exatamente(conexao, protocol.TAM_MSG_TOTAL)
             
-            if nova_credencial:
-                # Atualiza o nome do novo usuário no arquivo
-                server_data.adicionar_nova_credencial(nova_credencial, nome_usuario, nivel_cadastro)
-                
-                resultado_autorizacao = 1 # Cadastro realizado com sucesso
-                credencial_resposta = nova_credencial
-                motivo = f"Cadastro OK. Credencial: {nova_credencial}, Nível: {nivel_cadastro}"
+            if not dados_recebidos:
+                break # Cliente encerrou a conexão entre mensagens
+
+            if len(dados_recebidos) != protocol.TAM_MSG_TOTAL:
+                print(f"[{endereco}] Erro: Tamanho de mensagem inválido ({len(dados_recebidos)} bytes). Encerrando.")
+                metrics.ERROS.incrementar('mensagem_invalida')
+                return
+            metrics.observar_estagio('recv', time.perf_counter() - t0)
+
+            # 2 a 5. PROCESSAR E ENVIAR A RESPOSTA
+            if protocol.eh_cabecalho_lote(dados_recebidos):
+                # Cadastro em lote: o cabeçalho é seguido de N mensagens de cadastro
+                quantidade = protocol.MensagemView(dados_recebidos).credencial
+                if quantidade > protocol.LOTE_MAX:
+                    # Recusa e encerra: as mensagens seguintes não serão lidas
+                    conexao.sendall(protocol.empacotar_resposta_servidor(dados_recebidos, 0, 0))
+                    metrics.ERROS.incrementar('lote_invalido')
+                    return
+                itens_bytes = protocol.receber_exatamente(conexao, quantidade * protocol.TAM_MSG_TOTAL)
+                if len(itens_bytes) != quantidade * protocol.TAM_MSG_TOTAL:
+                    print(f"[{endereco}] Erro: Lote incompleto ({len(itens_bytes)} bytes). Encerrando.")
+                    metrics.ERROS.incrementar('mensagem_invalida')
+                    return
+                resposta_bytes = profiling.perfilar(tratar_lote, dados_recebidos, itens_bytes, endereco)
             else:
-                resultado_autorizacao = 0 # Falha no cadastro
-                credencial_resposta = 0
-                motivo = f"Falha no cadastro: {msg}"
-                
-            print(f"[{endereco} - P{porta_id}] CADASTRO {nome_usuario}: {'SUCESSO' if resultado_autorizacao else 'FALHA'} - {motivo}")
-            
-        # 4. REGISTRAR A TENTATIVA DE ACESSO/CADASTRO
-        server_data.registrar_acesso(
-            data_hora_log,
-            f"P{porta_id}",
-            credencial_resposta if tipo == 1 else credencial, # Loga a credencial gerada no cadastro
-            resultado_autorizacao
-        )
+                resposta_bytes = profiling.perfilar(tratar_mensagem, dados_recebidos, endereco, resposta_buffer)
+            t0 = time.perf_counter()
+            conexao.sendall(resposta_bytes)
+            metrics.observar_estagio('envio', time.perf_counter() - t0)
 
-        # 5. ENVIAR A RESPOSTA
-        resposta_bytes = protocol.empacotar_resposta_servidor(
-            dados_recebidos, 
-            resultado_autorizacao, 
-            credencial_resposta
-        )
-        conexao.sendall(resposta_bytes)
+            if not KEEP_ALIVE:
+                break # Modo padrão: uma requisição por conexão
+
+    except socket.timeout:
+        print(f"[{endereco}] Conexão ociosa por mais de {TIMEOUT_OCIOSO}s.")
 
     except Exception as e:
         print(f"[{endereco}] Erro no processamento da requisição: {e}")
+        metrics.ERROS.incrementar(type(e).__name__)
         # Comportamento em caso de perda de conexão (como solicitado na especificação): 
         # Simplesmente encerra a thread para esta conexão
         
+    finally:
+        # 6. ENCERRAR CONEXÃO (a menos que esteja à espera da próxima mensagem)
+        if not ociosa:
+            _encerrar_conexao(conexao, endereco)
+
+def _conexao_ociosa_pronta(conexao, endereco):
+    # A mensagem chegou: a conexão volta à fila do pool
+    if not _pool_conexoes.submeter(conexao, endereco, True):
+        admission.recusar_conexao(conexao, endereco)
+        print(f"[{endereco}] Conexão encerrada (servidor ocupado).")
+        metrics.CONEXOES_ATIVAS.decrementar()
+
+def _conexao_ociosa_expirou(conexao, endereco):
+    print(f"[{endereco}] Conexão ociosa por mais de {TIMEOUT_OCIOSO}s.")
+    _encerrar_conexao(conexao, endereco)
+
+
+# --- Modo asyncio ---
+
+_em_andamento_async = 0 # Requisições no pool de threads do loop (apenas a thread do loop altera)
+
+async def processar_requisicao_async(reader, writer):
+    """
+    Versão asyncio de processar_requisicao: uma corrotina por conexão em vez
+    de uma thread. O processamento (que lê e escreve arquivos) roda no pool
+    de threads do loop para não bloquear as demais conexões.
+    """
+    global _em_andamento_async
+
+    endereco = writer.get_extra_info('peername')
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Conexão estabelecida com {endereco}")
+    metrics.CONEXOES_ATIVAS.incrementar()
+
+    try:
+        loop = asyncio.get_running_loop()
+        timeout = TIMEOUT_OCIOSO # Também para a primeira mensagem
+
+        while True:
+            # 1. RECEBER OS DADOS
+            t0 = time.perf_counter()
+            try:
+                dados_recebidos = await asyncio.wait_for(
+                    reader.readexactly(protocol.TAM_MSG_TOTAL), timeout
+                )
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    print(f"[{endereco}] Erro: Tamanho de mensagem inválido ({len(e.partial)} bytes). Encerrando.")
+                    metrics.ERROS.incrementar('mensagem_invalida')
+                return
+            metrics.observar_estagio('recv', time.perf_counter() - t0)
+
+            # Cadastro em lote: o cabeçalho é seguido de N mensagens de cadastro
+            funcao, argumentos = tratar_mensagem, (dados_recebidos, endereco)
+            itens_bytes = b''
+            if protocol.eh_cabecalho_lote(dados_recebidos):
+                quantidade = protocol.MensagemView(dados_recebidos).credencial
+                if quantidade > protocol.LOTE_MAX:
+                    # Recusa e encerra: as mensagens seguintes não serão lidas
+                    writer.write(protocol.empacotar_resposta_servidor(dados_recebidos, 0, 0))
+                    await writer.drain()
+                    metrics.ERROS.incrementar('lote_invalido')
+                    return
+                itens_bytes = await asyncio.wait_for(
+                    reader.readexactly(quantidade * protocol.TAM_MSG_TOTAL), timeout
+                )
+                funcao, argumentos = tratar_lote, (dados_recebidos, itens_bytes, endereco)
+
+            # 2 a 5. PROCESSAR (fora do loop de eventos) E ENVIAR A RESPOSTA
+            if _em_andamento_async >= POOL_THREADS + TAMANHO_FILA:
+                # Pool e fila cheios: responde "ocupado" sem processar
+                admission.registrar_rejeicao('fila')
+                resposta_bytes = responder_ocupado(dados_recebidos + itens_bytes)
+            else:
+                _em_andamento_async += 1
+                admission.PROFUNDIDADE_FILA.definir(valor=max(0, _em_andamento_async - POOL_THREADS))
+                try:
+                    resposta_bytes = await loop.run_in_executor(None, profiling.perfilar, funcao, *argumentos)
+                finally:
+                    _em_andamento_async -= 1
+            t0 = time.perf_counter()
+            writer.write(resposta_bytes)
+            await writer.drain()
+            metrics.observar_estagio('envio', time.perf_counter() - t0)
+
+            if not KEEP_ALIVE:
+                break # Modo padrão: uma requisição por conexão
+
+    except asyncio.TimeoutError:
+        print(f"[{endereco}] Conexão ociosa por mais de {TIMEOUT_OCIOSO}s.")
+
+    except Exception as e:
+        print(f"[{endereco}] Erro no processamento da requisição: {e}")
+        metrics.ERROS.incrementar(type(e).__name__)
+
     finally:
         # 6. ENCERRAR CONEXÃO
         print(f"[{endereco}] Conexão encerrada.")
-        conexao.close() # Conexões são encerradas após a troca de mensagens
+        metrics.CONEXOES_ATIVAS.decrementar()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+async def _servir_async(server_socket=None):
+    # Pool limitado de threads para o processamento das requisições
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(POOL_THREADS, thread_name_prefix="requisicao")
+    )
+
+    if server_socket is not None:
+        servidor = await asyncio.start_server(processar_requisicao_async, sock=server_socket)
+    else:
+        servidor = await asyncio.start_server(
+            processar_requisicao_async, HOST, PORT, backlog=BACKLOG_ASYNC
+        )
+
+    print("-" * 50)
+    print(f"Servidor de Controle de Acesso rodando em TCP {HOST}:{PORT} (modo asyncio)")
+    print(f"Aguardando conexões de clientes...")
+    print("-" * 50)
+
+    async with servidor:
+        await servidor.serve_forever()
 
-def iniciar_servidor():
+def iniciar_servidor_async(server_socket=None):
     """
-    Configura e inicia o servidor TCP, ouvindo por conexões.
+    Inicia o servidor usando asyncio (uma corrotina por conexão).
+    """
+    try:
+        asyncio.run(_servir_async(server_socket))
+    except KeyboardInterrupt:
+        print("\nServidor encerrado por comando do usuário (Ctrl+C).")
+        server_data.encerrar_escritor_registro()
+    except OSError as e:
+        print(f"ERRO FATAL: Falha ao iniciar o servidor. Certifique-se de que a porta {PORT} não está em uso. Erro: {e}")
+        sys.exit(1)
+
+# --- Modo UDP ---
+
+class ServidorUDP:
+    """
+    Atende requisições em datagramas UDP (mensagem de 58 bytes + id de 4 bytes),
+    sem handshake TCP. Cada resposta fica guardada por (endereço, id): uma
+    retransmissão do cliente recebe a mesma resposta sem ser reprocessada, então
+    um cadastro retransmitido não aloca duas credenciais.
+    """
+
+    def __init__(self, udp_socket):
+        self.socket = udp_socket
+        self.executor = ThreadPoolExecutor(UDP_WORKERS, thread_name_prefix="udp")
+        self._trava = threading.Lock()
+        self._respostas = OrderedDict() # (endereço, id) -> (instante, resposta ou None se em andamento)
+        self._pendentes = 0 # Datagramas aguardando ou em processamento no executor
+
+    def _expirar(self, agora):
+        # Chamada com self._trava adquirida; a ordem de inserção é a ordem de chegada
+        while self._respostas:
+            chave, (instante, _) = next(iter(self._respostas.items()))
+            if agora - instante < UDP_TTL_DUPLICATAS and len(self._respostas) <= UDP_MAX_DUPLICATAS:
+                break
+            self._respostas.popitem(last=False)
+
+    def _processar(self, chave, mensagem, endereco):
+        try:
+            self._processar_datagrama(chave, mensagem, endereco)
+        finally:
+            with self._trava:
+                self._pendentes -= 1
+
+    def _processar_datagrama(self, chave, mensagem, endereco):
+        id_requisicao = chave[1]
+        try:
+            resposta = profiling.perfilar(tratar_mensagem, mensagem, endereco)
+            datagrama = protocol.empacotar_datagrama(resposta, id_requisicao)
+        except Exception as e:
+            print(f"[{endereco}] Erro no processamento do datagrama: {e}")
+            metrics.ERROS.incrementar(type(e).__name__)
+            with self._trava:
+                self._respostas.pop(chave, None) # Permite que a retransmissão tente de novo
+            return
+
+        with self._trava:
+            self._respostas[chave] = (time.monotonic(), datagrama)
+        self.socket.sendto(datagrama, endereco)
+
+    def servir(self):
+        while True:
+            try:
+                datagrama, endereco = self.socket.recvfrom(protocol.TAM_DATAGRAMA + 1)
+            except OSError:
+                break # Socket fechado
+
+            partes = protocol.desempacotar_datagrama(datagrama)
+            if partes is None:
+                print(f"[{endereco}] Erro: Datagrama de tamanho inválido ({len(datagrama)} bytes). Descartado.")
+                metrics.ERROS.incrementar('mensagem_invalida')
+                continue
+            id_requisicao, mensagem = partes
+            chave = (endereco, id_requisicao)
+
+            agora = time.monotonic()
+            with self._trava:
+                self._expirar(agora)
+                anterior = self._respostas.get(chave)
+                sobrecarregado = anterior is None and self._pendentes >= UDP_WORKERS + TAMANHO_FILA
+                if anterior is None and not sobrecarregado:
+                    self._respostas[chave] = (agora, None) # Em andamento
+                    self._pendentes += 1
+            if sobrecarregado:
+                # Não guarda a resposta: a retransmissão poderá ser atendida
+                admission.registrar_rejeicao('fila')
+                resposta = protocol.empacotar_resposta_ocupado(mensagem)
+                self.socket.sendto(protocol.empacotar_datagrama(resposta, id_requisicao), endereco)
+                continue
+            if anterior is not None:
+                metrics.DATAGRAMAS_DUPLICADOS.incrementar()
+                if anterior[1] is not None:
+                    self.socket.sendto(anterior[1], endereco)
+                continue # Ainda em processamento: a resposta seguirá em breve
+
+            self.executor.submit(self._processar, chave, mensagem, endereco)
+
+def criar_socket_udp(reuseport=False):
+    """
+    Cria o socket UDP em HOST:PORT. Com vários workers, cada um abre o seu
+    socket com SO_REUSEPORT: o kernel envia os datagramas de um mesmo cliente
+    sempre ao mesmo worker, mantendo a supressão de duplicatas correta.
+    """
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if reuseport:
+        udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    udp_socket.bind((HOST, PORT))
+    return udp_socket
+
+def iniciar_servidor_udp(reuseport=False):
+    """
+    Inicia o atendimento UDP em uma thread daemon, ao lado do servidor TCP.
+    """
+    try:
+        udp_socket = criar_socket_udp(reuseport)
+    except Exception as e:
+        print(f"ERRO FATAL: Falha ao abrir UDP {HOST}:{PORT}. Erro: {e}")
+        sys.exit(1)
+    servidor = ServidorUDP(udp_socket)
+    threading.Thread(target=servidor.servir, name="servidor-udp", daemon=True).start()
+    print(f"Servidor de Controle de Acesso também atende UDP {HOST}:{PORT}")
+    return servidor
+
+def criar_socket_servidor(backlog=MAX_CONEXOES):
+    """
+    Cria o socket TCP de escuta em HOST:PORT (encerra o processo se falhar).
     """
-    
-    # 1. Configura o socket
     try:
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Permite reiniciar o servidor (ou um worker) sem esperar o TIME_WAIT
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind((HOST, PORT))
-        server_socket.listen(MAX_CONEXOES)
+        server_socket.listen(backlog)
     except Exception as e:
         print(f"ERRO FATAL: Falha ao iniciar o servidor. Certifique-se de que a porta {PORT} não está em uso. Erro: {e}")
         sys.exit(1)
+    return server_socket
+
+def iniciar_servidor(server_socket=None):
+    """
+    Configura e inicia o servidor TCP, ouvindo por conexões.
+    'server_socket' permite usar um socket de escuta já criado (modo workers).
+    """
+    
+    # 1. Configura o socket
+    if server_socket is None:
+        server_socket = criar_socket_servidor()
 
     print("-" * 50)
     print(f"Servidor de Controle de Acesso rodando em TCP {HOST}:{PORT}")
     print(f"Aguardando conexões de clientes...")
     print("-" * 50)
 
+    # Pool fixo de threads: conexões aceitas esperam em uma fila limitada
+    global _pool_conexoes, _conexoes_ociosas
+    pool = _pool_conexoes = admission.PoolTrabalhadores(processar_requisicao, POOL_THREADS, TAMANHO_FILA, "conexao")
+    # Conexões sem mensagem pendente (novas ou keep-alive entre mensagens)
+    # esperam em um seletor, não em threads do pool
+    _conexoes_ociosas = admission.EsperaLeitura(
+        _conexao_ociosa_pronta, _conexao_ociosa_expirou, TIMEOUT_OCIOSO, "conexoes-ociosas"
+    )
+
     # 2. Loop principal de aceitação de conexões
     while True:
         try:
             # Aceita uma nova conexão
             conexao, endereco = server_socket.accept()
             
-            # Cria uma nova thread para lidar com o cliente, permitindo que o servidor aceite outros
-            cliente_thread = threading.Thread(
-                target=processar_requisicao, 
-                args=(conexao, endereco)
-            )
-            cliente_thread.start()
+            # Entrega a conexão a uma thread do pool; com a fila cheia, recusa na hora
+            if not pool.submeter(conexao, endereco):
+                admission.recusar_conexao(conexao, endereco)
             
         except KeyboardInterrupt:
             # Captura CTRL+C para encerrar
             print("\nServidor encerrado por comando do usuário (Ctrl+C).")
             server_socket.close()
+            server_data.encerrar_escritor_registro()
             break
         except Exception as e:
             print(f"Erro ao aceitar conexão: {e}")
+
+# --- Modo multiprocesso (pre-fork) ---
+
+def _iniciar_processo_servidor(args, indice_worker=None):
+    """
+    Inicializações que precisam existir em cada processo servidor: threads
+    (escritor do registro, endpoint de métricas) não sobrevivem ao fork.
+    """
+    if args.metricas:
+        # Cada worker publica as suas métricas em uma porta própria
+        porta_metricas = args.metricas + (indice_worker or 0)
+        metrics.iniciar_endpoint(porta_metricas)
+        print(f"Métricas disponíveis em http://{metrics.HOST_METRICAS}:{porta_metricas}/metrics")
+
+    # Registro de acessos gravado em lotes por uma thread dedicada. Com vários
+    # workers, cada lote é gravado sob trava de arquivo para não intercalar linhas.
+    server_data.iniciar_escritor_registro(
+        fsync=(args.durabilidade == 'fsync'),
+        entre_processos=indice_worker is not None
+    )
+
+    if args.estatisticas:
+        # Com workers, cada um agrega e salva as próprias contagens
+        caminho = args.estatisticas if indice_worker is None else f"{args.estatisticas}.{indice_worker}"
+        access_stats.iniciar_estatisticas(caminho, args.estatisticas_intervalo)
+        metrics.registrar_rota('/estatisticas', access_stats.consultar)
+
+    # SIGUSR1 liga/desliga o perfil de desempenho deste processo
+    profiling.instalar_sinal(args.perfil_modo, args.perfil_dir, memoria=not args.perfil_sem_memoria)
+
+    if args.udp:
+        iniciar_servidor_udp(reuseport=indice_worker is not None)
+
+def _executar_servidor(args, server_socket=None):
+    if args.modo == 'async':
+        iniciar_servidor_async(server_socket)
+    else:
+        iniciar_servidor(server_socket)
+
+def _criar_worker(args, server_socket, indice):
+    pid = os.fork()
+    if pid == 0:
+        # Processo filho: atende conexões no socket compartilhado até ser encerrado
+        codigo_saida = 0
+        try:
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+            _iniciar_processo_servidor(args, indice)
+            _executar_servidor(args, server_socket)
+        except SystemExit as e:
+            codigo_saida = e.code or 0
+        except BaseException as e:
+            print(f"[worker {indice}] Erro fatal: {e}")
+            codigo_saida = 1
+        finally:
+            server_data.encerrar_escritor_registro()
+            access_stats.salvar_estatisticas() # os._exit não executa o atexit
+            sys.stdout.flush()
+            os._exit(codigo_saida)
+    return pid
+
+def iniciar_supervisor(args, num_workers):
+    """
+    Cria o socket de escuta uma vez e faz fork de 'num_workers' processos que
+    aceitam conexões nele (o kernel distribui as conexões entre eles).
+    Workers que morrem são recriados. A alocação de credenciais é coordenada
+    por trava de arquivo em server_data.
+    """
+    if not hasattr(os, 'fork'):
+        print("ERRO FATAL: O modo com vários workers requer um sistema com fork() (Linux/macOS).")
+        sys.exit(1)
+
+    backlog = BACKLOG_ASYNC if args.modo == 'async' else MAX_CONEXOES
+    server_socket = criar_socket_servidor(max(backlog, MAX_CONEXOES * num_workers))
+
+    workers = {} # pid -> índice do worker
+    for indice in range(num_workers):
+        workers[_criar_worker(args, server_socket, indice)] = indice
+
+    print(f"Supervisor {os.getpid()}: {num_workers} workers em TCP {HOST}:{PORT}")
+
+    encerrando = False
+    def encerrar(*_):
+        nonlocal encerrando
+        encerrando = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    signal.signal(signal.SIGTERM, encerrar)
+
+    def repassar_sinal(sinal, _):
+        for pid in list(workers):
+            try:
+                os.kill(pid, sinal)
+            except ProcessLookupError:
+                pass
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, repassar_sinal) # Perfil: liga/desliga em todos os workers
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except KeyboardInterrupt:
+            # Ctrl+C também chega aos workers (mesmo grupo de processos)
+            print("\nSupervisor encerrando workers...")
+            encerrar()
+            continue
+        except ChildProcessError:
+            break
+
+        indice = workers.pop(pid, None)
+        if indice is None or encerrando:
+            continue
+
+        print(f"Supervisor: worker {indice} (pid {pid}) terminou com status {status}; reiniciando.")
+        time.sleep(0.5) # Evita recriar em laço se o worker falhar ao iniciar
+        workers[_criar_worker(args, server_socket, indice)] = indice
+
+    server_socket.close()
             
 if __name__ == '__main__':
-    iniciar_servidor()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Servidor de Controle de Acesso")
+    parser.add_argument('--port', type=int, default=PORT, help="porta TCP/UDP do servidor")
+    parser.add_argument('--modo', choices=['threads', 'async'], default='threads',
+                        help="threads: uma thread por conexão (padrão); async: asyncio")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="número de processos servidores (pre-fork, padrão: 1)")
+    parser.add_argument('--keep-alive', action='store_true',
+                        help="mantém a conexão aberta para várias mensagens")
+    parser.add_argument('--timeout-ocioso', type=float, default=TIMEOUT_OCIOSO,
+                        help="segundos sem mensagens (inclusive a primeira) até encerrar uma conexão")
+    parser.add_argument('--durabilidade', choices=['flush', 'fsync'], default='flush',
+                        help="flush: lotes do registro vão ao SO; fsync: também forçados ao disco")
+    parser.add_argument('--formato-registro', choices=['texto', 'binario'], default='texto',
+                        help="texto: register_acess.txt; binario: registros de 8 bytes em register_acess.bin")
+    parser.add_argument('--rotacao-tamanho', type=float, metavar='MB',
+                        help="fecha o segmento ativo do registro ao atingir este tamanho")
+    parser.add_argument('--rotacao-intervalo', type=float, metavar='SEG',
+                        help="fecha o segmento ativo do registro após este tempo")
+    parser.add_argument('--rotacao-manter', type=int, metavar='N',
+                        help="segmentos fechados (comprimidos) mantidos; os mais antigos são apagados")
+    parser.add_argument('--rotacao-dias', type=float, metavar='DIAS',
+                        help="apaga segmentos fechados mais antigos que isso")
+    parser.add_argument('--credenciais-mmap', metavar='ARQUIVO',
+                        help="usa o armazém binário mapeado em memória em vez de credentials.txt")
+    parser.add_argument('--pool', type=int, default=POOL_THREADS,
+                        help="threads que atendem as requisições")
+    parser.add_argument('--fila', type=int, default=TAMANHO_FILA,
+                        help="requisições aguardando thread livre antes de responder 'ocupado'")
+    parser.add_argument('--limite-porta', type=float, metavar='REQ_S',
+                        help="máximo de requisições/s por porta (P1-P5)")
+    parser.add_argument('--limite-cliente', type=float, metavar='REQ_S',
+                        help="máximo de requisições/s por endereço IP de cliente")
+    parser.add_argument('--diretorio', metavar='DIR',
+                        help="diretório dos arquivos de dados (ex.: uma réplica na mesma máquina)")
+    parser.add_argument('--replicacao', type=int, metavar='PORTA',
+                        help="envia as alterações às réplicas conectadas em 127.0.0.1:PORTA "
+                             "(em uma réplica, só depois de promovida)")
+    parser.add_argument('--replica-de', type=replication.interpretar_enderecos, metavar='HOST:PORTA[,...]',
+                        help="roda como réplica somente leitura do primário (tenta os endereços em ordem)")
+    parser.add_argument('--promover-apos', type=float, metavar='SEG',
+                        help="réplica se promove após SEG segundos sem conexão com o primário (ou envie "
+                             "SIGUSR2). Uma falha de rede passageira também promove: com o primário ainda "
+                             "no ar, os dois cadastram e podem repetir códigos. Registros de acesso do "
+                             "período desconectado não são recuperados")
+    parser.add_argument('--udp', action='store_true',
+                        help="também atende requisições em datagramas UDP na mesma porta")
+    parser.add_argument('--estatisticas', nargs='?', const=access_stats.ARQUIVO_ESTATISTICAS, metavar='ARQUIVO',
+                        help="mantém contagens por minuto/hora (porta, credencial, resultado), salvas em "
+                             f"ARQUIVO (padrão {access_stats.ARQUIVO_ESTATISTICAS}; com workers, ARQUIVO.índice)")
+    parser.add_argument('--estatisticas-intervalo', type=float, default=access_stats.INTERVALO_CHECKPOINT,
+                        metavar='SEG', help="segundos entre gravações das estatísticas")
+    parser.add_argument('--perfil-modo', choices=['amostragem', 'cprofile'], default='amostragem',
+                        help="perfil ligado/desligado por SIGUSR1: amostragem das pilhas de todas as "
+                             "threads ou cProfile das requisições")
+    parser.add_argument('--perfil-dir', default=profiling.DIRETORIO_PADRAO, metavar='DIR',
+                        help="diretório dos relatórios de perfil")
+    parser.add_argument('--perfil-sem-memoria', action='store_true',
+                        help="não rastreia alocações (tracemalloc) durante o perfil")
+    parser.add_argument('--metricas', type=int, metavar='PORTA',
+                        help="expõe métricas Prometheus em http://127.0.0.1:PORTA/metrics "
+                             "(com workers, PORTA + índice do worker)")
+    args = parser.parse_args()
+
+    if (args.replicacao or args.replica_de) and args.workers > 1:
+        parser.error("a replicação requer um único processo (sem --workers)")
+    if args.diretorio:
+        os.chdir(args.diretorio) # Os arquivos de dados usam caminhos relativos
+
+    PORT = args.port
+    KEEP_ALIVE = args.keep_alive
+    TIMEOUT_OCIOSO = args.timeout_ocioso
+    POOL_THREADS = args.pool
+    TAMANHO_FILA = args.fila
+    admission.configurar_limites(args.limite_porta, args.limite_cliente)
+
+    if args.credenciais_mmap:
+        server_data.configurar_armazem_mmap(args.credenciais_mmap)
+
+    server_data.configurar_formato_registro(args.formato_registro)
+
+    if args.rotacao_tamanho or args.rotacao_intervalo:
+        server_data.configurar_rotacao_registro(server_data.PoliticaRotacao(
+            tamanho_max=int(args.rotacao_tamanho * 1024 * 1024) if args.rotacao_tamanho else None,
+            intervalo=args.rotacao_intervalo,
+            manter=args.rotacao_manter,
+            idade_max=args.rotacao_dias * 86400 if args.rotacao_dias else None
+        ))
+
+    if args.workers > 1:
+        iniciar_supervisor(args, args.workers)
+    else:
+        _iniciar_processo_servidor(args)
+
+        iniciar_primario = lambda: replication.PrimarioReplicacao(args.replicacao).iniciar()
+        if args.replica_de:
+            # Réplica: somente leitura até ser promovida; promovida, passa a
+            # aceitar réplicas se --replicacao foi dado
+            replica = replication.ReplicaReplicacao(
+                args.replica_de, args.promover_apos,
+                ao_promover=iniciar_primario if args.replicacao else None
+            ).iniciar()
+            if hasattr(signal, 'SIGUSR2'):
+                signal.signal(signal.SIGUSR2, lambda *_: replica.promover())
+        elif args.replicacao:
+            iniciar_primario()
+
+        _executar_servidor(args)
@@ -4,17 +4,141 @@
 #         do servidor (Credenciais e Registro).
 # ======================================================================
 
+import atexit
+import gzip
 import os
+import shutil
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl # Travas entre processos (apenas em sistemas Unix)
+except ImportError:
+    fcntl = None
 from datetime import datetime
 
+import access_stats
+import binary_log
+
 # --- Configuração de Arquivos ---
 ARQUIVO_CREDENCIAS = 'credentials.txt'
 ARQUIVO_REGISTRO = 'register_acess.txt'
+ARQUIVO_REGISTRO_BINARIO = binary_log.ARQUIVO_REGISTRO_BINARIO
 
-def carregar_credenciais():
+# --- 1. GESTÃO DE CREDENCIAIS ---
+
+# Faixa de códigos de credencial (4 dígitos)
+CREDENCIAL_MIN = 1000
+CREDENCIAL_MAX = 9999
+
+# Nível gravado no arquivo para marcar uma credencial revogada
+NIVEL_REVOGADO = 0
+# Níveis válidos para um cadastro (o nível vem do campo Porta, de 4 bits)
+NIVEL_MIN = 1
+NIVEL_MAX = 15
+MSG_NIVEL_INVALIDO = f"Nível de acesso inválido (deve estar entre {NIVEL_MIN} e {NIVEL_MAX})"
+
+class AlocadorCredenciais:
+    """
+    Alocador de códigos de credencial em tempo constante.
+    Um bitmap (bytearray) marca os códigos ocupados e uma lista livre (deque)
+    guarda os candidatos: primeiro os códigos acima do maior já usado (como a
+    regra antiga de "maior + 1"), depois as lacunas. Códigos revogados voltam
+    para o início da lista e são reutilizados primeiro.
+    Não é thread-safe: o chamador deve manter _trava_credenciais.
+    """
+
+    def __init__(self, ocupadas, minimo=CREDENCIAL_MIN, maximo=CREDENCIAL_MAX):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.ocupado = bytearray(maximo - minimo + 1)
+
+        maior = minimo - 1
+        for codigo in ocupadas:
+            if minimo <= codigo <= maximo:
+                self.ocupado[codigo - minimo] = 1
+                maior = max(maior, codigo)
+
+        self.livres = deque(range(maior + 1, maximo + 1))
+        self.livres.extend(c for c in range(minimo, maior) if not self.ocupado[c - minimo])
+
+    def alocar(self):
+        # A lista pode conter códigos marcados depois (remoção preguiçosa)
+        while self.livres:
+            codigo = self.livres.popleft()
+            if not self.ocupado[codigo - self.minimo]:
+                self.ocupado[codigo - self.minimo] = 1
+                return codigo
+        return None
+
+    def marcar(self, codigo):
+        if self.minimo <= codigo <= self.maximo:
+            self.ocupado[codigo - self.minimo] = 1
+
+    def liberar(self, codigo):
+        if self.minimo <= codigo <= self.maximo and self.ocupado[codigo - self.minimo]:
+            self.ocupado[codigo - self.minimo] = 0
+            self.livres.appendleft(codigo)
+
+# Cache de credenciais compartilhado por todas as threads do servidor.
+# O arquivo só é relido quando sua assinatura (mtime, tamanho) muda; a troca
+# do snapshot é uma única atribuição, então leitores nunca veem um dicionário
+# parcialmente montado. O alocador é reconstruído junto com o snapshot.
+_trava_credenciais = threading.Lock()
+_cache_credenciais = None
+_assinatura_credenciais = None
+_alocador = None
+
+# Backend alternativo: armazém binário mapeado em memória (credential_store).
+# Quando configurado, substitui o arquivo texto e o cache acima.
+_armazem = None
+
+def configurar_armazem_mmap(caminho):
+    """
+    Passa a usar o armazém binário em 'caminho' para as credenciais.
+    O arquivo pode ser compartilhado por vários processos servidores.
+    """
+    global _armazem
+
+    import credential_store
+    _armazem = credential_store.ArmazemCredenciais(caminho)
+    return _armazem
+
+@contextmanager
+def _trava_entre_processos(caminho):
+    """
+    Trava exclusiva de arquivo (flock) para coordenar vários processos
+    servidores. O arquivo é aberto a cada uso porque um descritor herdado
+    pelo fork compartilharia a mesma trava entre pai e filhos.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(caminho + '.lock', 'a') as arquivo_trava:
+        fcntl.flock(arquivo_trava.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo_trava.fileno(), fcntl.LOCK_UN)
+
+def _assinatura_arquivo_credenciais():
+    try:
+        info = os.stat(ARQUIVO_CREDENCIAS)
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+def ler_arquivo_credenciais(caminho=None):
+    """
+    Lê e interpreta um arquivo de credenciais em texto (código,nome,nível).
+    Linhas posteriores prevalecem; linhas com nível 0 revogam o código.
+    """
     credenciais = {}
     try:
-        with open(ARQUIVO_CREDENCIAS, 'r') as f:
+        with open(caminho or ARQUIVO_CREDENCIAS, 'r') as f:
             for linha in f:
                 linha = linha.strip()
                 if not linha: continue
@@ -22,52 +146,552 @@ def carregar_credenciais():
                 partes = [p.strip() for p in linha.split(',')]
                 if len(partes) == 3:
                     codigo, nome, nivel = partes
+                    if int(nivel) == NIVEL_REVOGADO:
+                        # Linha de revogação: remove o código cadastrado antes
+                        credenciais.pop(int(codigo), None)
+                        continue
                     # Armazena usando o código (credencial) como chave
                     credenciais[int(codigo)] = {
                         'nome': nome,
                         'nivel_acesso': int(nivel)
                     }
     except FileNotFoundError:
-        return carregar_credenciais() # Tenta carregar novamente
+        pass # Arquivo ainda não existe: nenhuma credencial cadastrada
         
     return credenciais
 
-def adicionar_nova_credencial(codigo, nome, nivel_acesso):
+def _sincronizar_cache():
+    """
+    Relê o arquivo se ele mudou desde a última leitura.
+    Deve ser chamada com _trava_credenciais adquirida.
+    """
+    global _cache_credenciais, _assinatura_credenciais, _alocador
+
+    assinatura = _assinatura_arquivo_credenciais()
+    if _cache_credenciais is None or assinatura != _assinatura_credenciais:
+        credenciais = ler_arquivo_credenciais()
+        _alocador = AlocadorCredenciais(credenciais.keys())
+        _cache_credenciais = credenciais
+        _assinatura_credenciais = assinatura
+    return _cache_credenciais
+
+def _gravar_credenciais(registros, duravel=False):
+    """
+    Acrescenta as linhas (código, nome, nível) ao arquivo em uma única
+    escrita e atualiza o cache no lugar.
+    Deve ser chamada com _trava_credenciais adquirida.
+    """
+    global _assinatura_credenciais
+
+    _sincronizar_cache() # Garante que o cache reflete o arquivo antes da escrita
+
     with open(ARQUIVO_CREDENCIAS, 'a') as f:
-        linha = f"{codigo},{nome},{nivel_acesso}\n"
-        f.write(linha)
+        f.write(''.join(f"{codigo},{nome},{nivel_acesso}\n" for codigo, nome, nivel_acesso in registros))
+        if duravel:
+            f.flush()
+            os.fsync(f.fileno())
 
-def gerar_nova_credencial(nivel_cadastro):
-    credenciais_atuais = carregar_credenciais()
-    
-    # Simplesmente pega a próxima credencial disponível ou gera uma aleatória
-    # Implementação básica: procura o maior código e adiciona 1.
-    if credenciais_atuais:
-        novo_codigo = max(credenciais_atuais.keys()) + 1
-    else:
-        novo_codigo = 1000 # Primeiro código
-        
-    if novo_codigo > 9999:
-        return None, "Limite de credenciais atingido"
-        
-    # O nome será preenchido pelo cliente na próxima requisição (aqui é só placeholder)
-    novo_nome = "NOVO USUARIO" 
+    # A escrita é nossa, não precisa reler o arquivo
+    for codigo, nome, nivel_acesso in registros:
+        if int(nivel_acesso) == NIVEL_REVOGADO:
+            _cache_credenciais.pop(int(codigo), None)
+            _alocador.liberar(int(codigo))
+        else:
+            _cache_credenciais[int(codigo)] = {
+                'nome': nome,
+                'nivel_acesso': int(nivel_acesso)
+            }
+            _alocador.marcar(int(codigo))
+    _assinatura_credenciais = _assinatura_arquivo_credenciais()
+    _notificar('credencial', registros)
 
-    adicionar_nova_credencial(novo_codigo, novo_nome, nivel_cadastro)
+def _gravar_credencial(codigo, nome, nivel_acesso, duravel=False):
+    _gravar_credenciais([(codigo, nome, nivel_acesso)], duravel)
+
+def carregar_credenciais():
+    """
+    Retorna o snapshot atual das credenciais (código -> dados).
+    O arquivo só é lido novamente se foi alterado desde a última leitura.
+    O dicionário retornado é compartilhado e não deve ser modificado.
+    """
+    if _armazem is not None:
+        return _armazem # Consultas diretas no arquivo mapeado, sem cache
+
+    assinatura = _assinatura_arquivo_credenciais()
+    cache = _cache_credenciais
+    if cache is not None and assinatura == _assinatura_credenciais:
+        return cache
+
+    with _trava_credenciais:
+        # Outra thread pode ter recarregado enquanto esperávamos a trava
+        return _sincronizar_cache()
+
+def adicionar_nova_credencial(codigo, nome, nivel_acesso):
+    if _somente_leitura:
+        raise PermissionError(MSG_SOMENTE_LEITURA)
+
+    if _armazem is not None:
+        _armazem.gravar(int(codigo), nome, int(nivel_acesso))
+        _notificar('credencial', [(int(codigo), nome, int(nivel_acesso))])
+        return
+
+    with _trava_credenciais, _trava_entre_processos(ARQUIVO_CREDENCIAS):
+        _gravar_credencial(codigo, nome, nivel_acesso)
+
+def revogar_credencial(codigo):
+    """
+    Revoga uma credencial (grava uma linha com nível 0) e devolve o código
+    ao alocador para ser reutilizado em um próximo cadastro.
+    """
+    if _somente_leitura:
+        return False, MSG_SOMENTE_LEITURA
+
+    if _armazem is not None:
+        dados = _armazem.get(codigo)
+        if dados is None or not _armazem.remover(codigo):
+            return False, "Usuário não cadastrado"
+        _notificar('credencial', [(codigo, dados['nome'], NIVEL_REVOGADO)])
+        return True, "Credencial revogada"
+
+    with _trava_credenciais, _trava_entre_processos(ARQUIVO_CREDENCIAS):
+        credenciais = _sincronizar_cache()
+        if codigo not in credenciais:
+            return False, "Usuário não cadastrado"
+        _gravar_credencial(codigo, credenciais[codigo]['nome'], NIVEL_REVOGADO, duravel=True)
+    return True, "Credencial revogada"
+
+def gerar_nova_credencial(nivel_cadastro, nome="NOVO USUARIO"):
+    """
+    Aloca o próximo código livre e grava o cadastro em um único registro
+    (com fsync). A alocação e a escrita ocorrem sob a mesma trava (de thread
+    e de arquivo), então dois cadastros simultâneos, mesmo em processos
+    diferentes, nunca recebem o mesmo código.
+    """
+    if _somente_leitura:
+        return None, MSG_SOMENTE_LEITURA
+    if not NIVEL_MIN <= nivel_cadastro <= NIVEL_MAX:
+        return None, MSG_NIVEL_INVALIDO # Nível 0 gravaria a credencial já revogada
+
+    if _armazem is not None:
+        novo_codigo = _armazem.alocar(nome, nivel_cadastro, CREDENCIAL_MIN, CREDENCIAL_MAX)
+        if novo_codigo is None:
+            return None, "Limite de credenciais atingido"
+        _notificar('credencial', [(novo_codigo, nome, nivel_cadastro)])
+        return novo_codigo, nome
+
+    with _trava_credenciais, _trava_entre_processos(ARQUIVO_CREDENCIAS):
+        _sincronizar_cache() # Inclui cadastros feitos por outros processos
+
+        novo_codigo = _alocador.alocar()
+        if novo_codigo is None:
+            return None, "Limite de credenciais atingido"
+
+        _gravar_credencial(novo_codigo, nome, nivel_cadastro, duravel=True)
     
-    return novo_codigo, novo_nome
+    return novo_codigo, nome
+
+def gerar_credenciais_em_lote(cadastros):
+    """
+    Cadastro em lote: 'cadastros' é uma lista de (nome, nível). Aloca um
+    código para cada um e grava todos em uma única escrita (com fsync), sob
+    as mesmas travas de gerar_nova_credencial. É tudo ou nada: sem códigos
+    livres para todos, ou com algum nível fora de NIVEL_MIN..NIVEL_MAX,
+    nenhum é cadastrado.
+    Retorna (códigos na ordem dos cadastros, mensagem) ou (None, motivo).
+    """
+    if _somente_leitura:
+        return None, MSG_SOMENTE_LEITURA
+    if any(not NIVEL_MIN <= nivel <= NIVEL_MAX for _, nivel in cadastros):
+        return None, MSG_NIVEL_INVALIDO
+
+    if _armazem is not None:
+        codigos = _armazem.alocar_lote(cadastros, CREDENCIAL_MIN, CREDENCIAL_MAX)
+        if codigos is None:
+            return None, "Limite de credenciais atingido"
+        _notificar('credencial', [(codigo, nome, nivel) for codigo, (nome, nivel) in zip(codigos, cadastros)])
+        return codigos, f"{len(codigos)} credenciais cadastradas"
+
+    with _trava_credenciais, _trava_entre_processos(ARQUIVO_CREDENCIAS):
+        _sincronizar_cache() # Inclui cadastros feitos por outros processos
+
+        codigos = []
+        for _ in cadastros:
+            codigo = _alocador.alocar()
+            if codigo is None:
+                # Devolve os códigos já reservados, na ordem original
+                for reservado in reversed(codigos):
+                    _alocador.liberar(reservado)
+                return None, "Limite de credenciais atingido"
+            codigos.append(codigo)
+
+        _gravar_credenciais(
+            [(codigo, nome, nivel) for codigo, (nome, nivel) in zip(codigos, cadastros)], duravel=True
+        )
+
+    return codigos, f"{len(codigos)} credenciais cadastradas"
 
 # --- 2. GESTÃO DE REGISTRO ---
 
+# Formato do registro de acessos: 'texto' (uma linha legível por tentativa)
+# ou 'binario' (registros de 8 bytes, ver binary_log.py)
+_formato_registro = 'texto'
+
+def configurar_formato_registro(formato):
+    """
+    Escolhe o formato do registro; deve ser chamada antes de ligar o
+    escritor em lote e a rotação.
+    """
+    global _formato_registro
+
+    if formato not in ('texto', 'binario'):
+        raise ValueError(f"Formato de registro inválido: {formato}")
+    _formato_registro = formato
+
+def arquivo_registro():
+    """
+    Caminho do arquivo ativo do registro no formato configurado.
+    """
+    return ARQUIVO_REGISTRO_BINARIO if _formato_registro == 'binario' else ARQUIVO_REGISTRO
+
+def formato_registro():
+    return _formato_registro
+
+# --- Rotação do Registro ---
+# O arquivo ativo (register_acess.txt) é fechado em segmentos numerados
+# (register_acess.txt.000001, .000002, ...; maior número = mais recente),
+# comprimidos em segundo plano (.gz) e apagados pela política de retenção.
+
+DIGITOS_SEGMENTO = 6
+SUFIXO_COMPRIMIDO = '.gz'
+
+class PoliticaRotacao:
+    """
+    Quando fechar o segmento ativo do registro e quais segmentos manter.
+    tamanho_max: bytes do segmento ativo; intervalo: segundos de duração de
+    um segmento; manter: quantidade de segmentos fechados guardados;
+    idade_max: segundos até um segmento fechado ser apagado (None = sem limite).
+    """
+
+    def __init__(self, tamanho_max=None, intervalo=None, manter=None, idade_max=None, comprimir=True):
+        self.tamanho_max = tamanho_max
+        self.intervalo = intervalo
+        self.manter = manter
+        self.idade_max = idade_max
+        self.comprimir = comprimir
+
+    def vencida(self, tamanho, inicio_segmento):
+        if tamanho == 0:
+            return False # Nunca fecha um segmento vazio
+        if self.tamanho_max is not None and tamanho >= self.tamanho_max:
+            return True
+        return self.intervalo is not None and time.time() - inicio_segmento >= self.intervalo
+
+def _numero_segmento(nome, base):
+    """
+    'register_acess.txt.000012[.gz]' -> 12; None se não for um segmento de 'base'.
+    """
+    if not nome.startswith(base + '.'):
+        return None
+    numero = nome[len(base) + 1:]
+    if numero.endswith(SUFIXO_COMPRIMIDO):
+        numero = numero[:-len(SUFIXO_COMPRIMIDO)]
+    return int(numero) if numero.isdigit() else None
+
+def _segmentos_por_numero(arquivo):
+    """
+    {número: [caminhos]} dos segmentos fechados de 'arquivo' (texto e/ou .gz).
+    """
+    diretorio, base = os.path.split(os.path.abspath(arquivo))
+    segmentos = {}
+    for nome in os.listdir(diretorio):
+        numero = _numero_segmento(nome, base)
+        if numero is not None:
+            segmentos.setdefault(numero, []).append(os.path.join(diretorio, nome))
+    return segmentos
+
+def listar_segmentos(arquivo=ARQUIVO_REGISTRO):
+    """
+    Caminhos dos segmentos fechados, do mais antigo ao mais recente (sem o
+    arquivo ativo). Se um segmento existir nas duas formas (compressão
+    interrompida), vale a comprimida, que só aparece depois de completa.
+    """
+    caminhos = []
+    for numero, versoes in sorted(_segmentos_por_numero(arquivo).items()):
+        comprimidas = [c for c in versoes if c.endswith(SUFIXO_COMPRIMIDO)]
+        caminhos.append(comprimidas[0] if comprimidas else versoes[0])
+    return caminhos
+
+def _comprimir_segmento(caminho):
+    comprimido = caminho + SUFIXO_COMPRIMIDO
+    try:
+        if not os.path.exists(comprimido):
+            temporario = comprimido + '.tmp'
+            with open(caminho, 'rb') as origem, gzip.open(temporario, 'wb') as destino:
+                shutil.copyfileobj(origem, destino, 1024 * 1024)
+            os.replace(temporario, comprimido) # O .gz só aparece completo
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass # Já apagado pela retenção
+
+def _aplicar_retencao(arquivo, politica):
+    segmentos = listar_segmentos(arquivo)
+    apagar = []
+    if politica.manter is not None and len(segmentos) > politica.manter:
+        apagar = segmentos[:len(segmentos) - politica.manter]
+    if politica.idade_max is not None:
+        limite = time.time() - politica.idade_max
+        for caminho in segmentos[len(apagar):]:
+            try:
+                if os.path.getmtime(caminho) < limite:
+                    apagar.append(caminho)
+            except FileNotFoundError:
+                pass # Comprimido e renomeado neste meio tempo
+    for caminho in apagar:
+        for versao in (caminho, caminho.removesuffix(SUFIXO_COMPRIMIDO)):
+            try:
+                os.remove(versao)
+            except FileNotFoundError:
+                pass
+
+_compressoes = [] # Threads de compressão em andamento
+
+def _manutencao_segmentos(arquivo, politica, pendentes):
+    try:
+        for caminho in pendentes:
+            _comprimir_segmento(caminho)
+        _aplicar_retencao(arquivo, politica)
+    except OSError as e:
+        print(f"ERRO na manutenção dos segmentos de {arquivo}: {e}")
+
+def _iniciar_manutencao(arquivo, politica, pendentes):
+    """
+    Comprime (em segundo plano) os segmentos 'pendentes' e aplica a retenção.
+    """
+    if not politica.comprimir:
+        pendentes = []
+    _compressoes[:] = [t for t in _compressoes if t.is_alive()]
+    thread = threading.Thread(
+        target=_manutencao_segmentos, args=(arquivo, politica, pendentes), name="compressao-registro"
+    )
+    thread.start()
+    _compressoes.append(thread)
+
+def rotacionar_registro(arquivo, politica):
+    """
+    Fecha o arquivo ativo como o próximo segmento numerado. Quem chama deve
+    ter a exclusividade da escrita (trava) e reabrir o arquivo em seguida.
+    """
+    numeros = _segmentos_por_numero(arquivo)
+    proximo = max(numeros, default=0) + 1
+    segmento = f"{arquivo}.{proximo:0{DIGITOS_SEGMENTO}d}"
+    os.rename(arquivo, segmento)
+    _iniciar_manutencao(arquivo, politica, [segmento])
+    return segmento
+
+_politica_rotacao = None
+
+def configurar_rotacao_registro(politica):
+    """
+    Liga a rotação do registro de acessos (None desliga). Também termina a
+    compressão/retenção de segmentos deixados por uma execução anterior.
+    """
+    global _politica_rotacao
+
+    _politica_rotacao = politica
+    if politica is not None:
+        arquivo = arquivo_registro()
+        pendentes = [c for c in listar_segmentos(arquivo) if not c.endswith(SUFIXO_COMPRIMIDO)]
+        _iniciar_manutencao(arquivo, politica, pendentes)
+
+def aguardar_compressoes():
+    for thread in list(_compressoes):
+        thread.join()
+
+class EscritorRegistro:
+    """
+    Etapa dedicada de escrita do registro de acessos. As threads do servidor
+    apenas enfileiram as linhas; uma thread em segundo plano mantém o arquivo
+    aberto e grava em lotes (por quantidade de linhas ou janela de tempo).
+
+    fsync=False: cada lote é enviado ao sistema operacional (flush).
+    fsync=True:  cada lote também é forçado para o disco (os.fsync).
+    entre_processos=True: cada lote é gravado sob flock, para vários
+    processos acrescentarem ao mesmo arquivo sem intercalar linhas.
+    politica: PoliticaRotacao aplicada após cada lote (None = sem rotação).
+    binario=True: a fila recebe registros binários (bytes) em vez de linhas.
+    """
+
+    _FIM = None # Sentinela que pede o encerramento da thread
+
+    def __init__(self, arquivo=ARQUIVO_REGISTRO, tamanho_lote=256, intervalo=0.05, fsync=False,
+                 entre_processos=False, politica=None, binario=False):
+        self.arquivo = arquivo
+        self.politica = politica
+        self.binario = binario
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.fsync = fsync
+        self.entre_processos = entre_processos and fcntl is not None
+        self.fila = queue.Queue()
+        self.thread = threading.Thread(target=self._executar, name="escritor-registro", daemon=True)
+
+    def iniciar(self):
+        self.thread.start()
+        return self
+
+    def enfileirar(self, linha):
+        self.fila.put(linha)
+
+    def encerrar(self):
+        """
+        Grava tudo que ainda está na fila, fecha o arquivo e encerra a thread.
+        """
+        if self.thread.is_alive():
+            self.fila.put(self._FIM)
+            self.thread.join()
+
+    def _coletar_lote(self, primeira):
+        lote = [primeira]
+        prazo = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            restante = prazo - time.monotonic()
+            try:
+                linha = self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if linha is self._FIM:
+                return lote, True
+            lote.append(linha)
+        return lote, False
+
+    def _abrir(self):
+        self.inicio_segmento = time.time()
+        return open(self.arquivo, 'ab' if self.binario else 'a')
+
+    def _travar(self, f):
+        """
+        Trava o arquivo aberto; se outro processo já o rotacionou (o nome
+        aponta para outro inode), reabre o arquivo ativo e trava o novo.
+        """
+        while True:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                atual = os.stat(self.arquivo).st_ino
+            except FileNotFoundError:
+                atual = None
+            if atual == os.fstat(f.fileno()).st_ino:
+                return f
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
+            f = self._abrir()
+
+    def _executar(self):
+        f = self._abrir()
+        try:
+            fim = False
+            while not fim:
+                primeira = self.fila.get()
+                if primeira is self._FIM:
+                    break
+
+                lote, fim = self._coletar_lote(primeira)
+
+                if self.entre_processos:
+                    f = self._travar(f)
+                try:
+                    f.write((b'' if self.binario else '').join(lote))
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                    if self.politica is not None and self.politica.vencida(f.tell(), self.inicio_segmento):
+                        rotacionar_registro(self.arquivo, self.politica)
+                        antigo, f = f, self._abrir()
+                        antigo.close() # Libera também a trava do segmento fechado
+                finally:
+                    if self.entre_processos:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            f.close()
+
+_escritor_registro = None
+_trava_registro = threading.Lock() # Usada apenas quando não há escritor em lote
+_inicio_segmento_direto = None     # Início do segmento ativo na escrita direta
+
+def iniciar_escritor_registro(tamanho_lote=256, intervalo=0.05, fsync=False, entre_processos=False):
+    """
+    Liga a escrita em lote do registro de acessos. O escritor é drenado
+    automaticamente ao final do processo (ou via encerrar_escritor_registro).
+    """
+    global _escritor_registro
+
+    if _escritor_registro is None:
+        _escritor_registro = EscritorRegistro(
+            arquivo_registro(), tamanho_lote, intervalo, fsync, entre_processos, _politica_rotacao,
+            binario=(_formato_registro == 'binario')
+        ).iniciar()
+        atexit.register(encerrar_escritor_registro)
+    return _escritor_registro
+
+def encerrar_escritor_registro():
+    global _escritor_registro
+
+    escritor, _escritor_registro = _escritor_registro, None
+    if escritor is not None:
+        escritor.encerrar()
+    aguardar_compressoes()
+
+def _gravar_registro(dados):
+    global _inicio_segmento_direto
+
+    _notificar('registro', dados)
+
+    escritor = _escritor_registro
+    if escritor is not None:
+        escritor.enfileirar(dados)
+        return
+
+    # Sem escritor em lote: grava direto, serializando as threads
+    arquivo = arquivo_registro()
+    with _trava_registro:
+        with open(arquivo, 'ab' if isinstance(dados, bytes) else 'a') as f:
+            f.write(dados)
+            tamanho = f.tell()
+        if _politica_rotacao is not None:
+            if _inicio_segmento_direto is None:
+                _inicio_segmento_direto = time.time()
+            if _politica_rotacao.vencida(tamanho, _inicio_segmento_direto):
+                rotacionar_registro(arquivo, _politica_rotacao)
+                _inicio_segmento_direto = time.time()
+
 def registrar_acesso(data_hora, porta_id, codigo_usuario, resultado):
+    agregados = access_stats.agregados()
+    if agregados is not None:
+        agregados.registrar(int(str(porta_id).lstrip('Pp')), codigo_usuario, resultado)
+
     # Ajusta o resultado para 'autorizado' ou 'negado'
     resultado_str = "autorizado" if resultado == 1 else "negado"
     
     # Formato do log 
     log_line = f"{data_hora}, {porta_id}, {codigo_usuario}, {resultado_str}\n"
     
-    with open(ARQUIVO_REGISTRO, 'a') as f:
-        f.write(log_line)
+    _gravar_registro(log_line)
+
+def registrar_acesso_mensagem(mensagem, codigo_usuario, resultado):
+    """
+    Registra a tentativa descrita por uma protocol.MensagemView no formato
+    configurado. No binário, a data/hora é copiada da mensagem sem ser
+    decodificada.
+    """
+    if _formato_registro == 'binario':
+        agregados = access_stats.agregados()
+        if agregados is not None:
+            agregados.registrar(mensagem.porta, codigo_usuario, resultado)
+        _gravar_registro(binary_log.empacotar_registro(
+            mensagem.tipo_msg, mensagem.porta, resultado, codigo_usuario,
+            mensagem.buffer[3:binary_log.TAM_REGISTRO]
+        ))
+    else:
+        registrar_acesso(mensagem.data_hora, f"P{mensagem.porta}", codigo_usuario, resultado)
 
 # --- 3. FUNÇÃO AUXILIAR DE VERIFICAÇÃO DE ACESSO ---
 
@@ -89,4 +713,101 @@ def verificar_acesso(credenciais, porta_id, codigo_usuario):
     if nivel_usuario >= nivel_requerido:
         return 1, "Acesso autorizado" # Autorizado (1)
     else:
-        return 0, f"Nível de acesso ({nivel_usuario}) insuficiente para a porta {porta_id}" # Negado (0)
\ No newline at end of file
+        return 0, f"Nível de acesso ({nivel_usuario}) insuficiente para a porta {porta_id}" # Negado (0)
+
+# --- 4. REPLICAÇÃO ---
+# Toda alteração de credenciais e todo registro de acesso são repassados aos
+# ouvintes (ex.: replication.PrimarioReplicacao). Uma réplica aplica as
+# alterações recebidas com as funções abaixo e fica somente leitura até ser
+# promovida.
+
+MSG_SOMENTE_LEITURA = "Servidor em modo réplica (somente leitura)"
+
+_ouvintes = []
+_somente_leitura = False
+
+def adicionar_ouvinte(funcao):
+    """
+    funcao(tipo, dados) é chamada a cada alteração: tipo 'credencial' com
+    uma lista de (código, nome, nível), nível 0 = revogação; ou 'registro'
+    com a linha (str) ou o registro binário (bytes) do log de acessos.
+    """
+    _ouvintes.append(funcao)
+
+def remover_ouvinte(funcao):
+    if funcao in _ouvintes:
+        _ouvintes.remove(funcao)
+
+def _notificar(tipo, dados):
+    for funcao in _ouvintes:
+        funcao(tipo, dados)
+
+def definir_somente_leitura(ativo):
+    global _somente_leitura
+
+    _somente_leitura = ativo
+
+def somente_leitura():
+    return _somente_leitura
+
+def listar_credenciais():
+    """
+    Estado atual das credenciais como lista de (código, nome, nível).
+    """
+    if _armazem is not None:
+        credenciais = _armazem.items()
+    else:
+        with _trava_credenciais: # O cache é alterado no lugar pelas escritas
+            credenciais = list(_sincronizar_cache().items())
+    return [(codigo, dados['nome'], dados['nivel_acesso']) for codigo, dados in credenciais]
+
+def aplicar_credenciais(registros):
+    """
+    Aplica alterações de credenciais recebidas do primário (sem alocar códigos).
+    """
+    if _armazem is not None:
+        for codigo, nome, nivel_acesso in registros:
+            if int(nivel_acesso) == NIVEL_REVOGADO:
+                _armazem.remover(int(codigo))
+            else:
+                _armazem.gravar(int(codigo), nome, int(nivel_acesso))
+        _notificar('credencial', registros)
+        return
+
+    with _trava_credenciais, _trava_entre_processos(ARQUIVO_CREDENCIAS):
+        _gravar_credenciais(registros)
+
+def substituir_credenciais(registros):
+    """
+    Troca todas as credenciais pelo estado completo 'registros' (cópia
+    inicial do primário). O arquivo texto é reescrito e trocado atomicamente.
+    """
+    global _cache_credenciais
+
+    if _armazem is not None:
+        novos = {int(codigo) for codigo, _, _ in registros}
+        for codigo in [c for c in _armazem.keys() if c not in novos]:
+            _armazem.remover(codigo)
+        for codigo, nome, nivel_acesso in registros:
+            _armazem.gravar(int(codigo), nome, int(nivel_acesso))
+        return
+
+    with _trava_credenciais, _trava_entre_processos(ARQUIVO_CREDENCIAS):
+        temporario = ARQUIVO_CREDENCIAS + '.tmp'
+        with open(temporario, 'w') as f:
+            f.write(''.join(f"{codigo},{nome},{nivel_acesso}\n" for codigo, nome, nivel_acesso in registros))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, ARQUIVO_CREDENCIAS)
+        _cache_credenciais = None # Força a releitura (e a reconstrução do alocador)
+        _sincronizar_cache()
+
+def aplicar_registro(dados):
+    """
+    Grava um registro de acesso recebido do primário no log local. Um
+    registro em outro formato é recusado (ValueError) antes de chegar ao
+    escritor, que gravaria um arquivo misto ou pararia no join do lote.
+    """
+    if isinstance(dados, bytes) != (_formato_registro == 'binario'):
+        raise ValueError(f"registro recebido em formato diferente do local ({_formato_registro})")
+    _gravar_registro(dados)
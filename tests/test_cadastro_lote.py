@@ -0,0 +1,56 @@
+# ======================================================================
+# ARQUIVO: test_cadastro_lote.py
+# FUNÇÃO: Cadastro em lote: níveis fora de 1..15 recusam o lote inteiro
+#         (tudo ou nada), sem gravar nem alocar nenhum código.
+# ======================================================================
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+import server_data
+
+@pytest.fixture
+def credenciais(tmp_path, monkeypatch):
+    """
+    Arquivo de credenciais próprio do teste (os caminhos são relativos).
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / server_data.ARQUIVO_CREDENCIAS).write_text("1000,Vin,2\n")
+    monkeypatch.setattr(server_data, '_cache_credenciais', None)
+    monkeypatch.setattr(server_data, '_assinatura_credenciais', None)
+    monkeypatch.setattr(server_data, '_alocador', None)
+    monkeypatch.setattr(server_data, '_armazem', None)
+    monkeypatch.setattr(server_data, '_somente_leitura', False)
+    return tmp_path / server_data.ARQUIVO_CREDENCIAS
+
+@pytest.mark.parametrize('nivel', [0, 16])
+def test_lote_com_nivel_invalido_e_recusado(credenciais, nivel):
+    antes = credenciais.read_text()
+
+    codigos, motivo = server_data.gerar_credenciais_em_lote([('Ana', 3), ('Bob', nivel), ('Caio', 5)])
+
+    assert codigos is None
+    assert motivo == server_data.MSG_NIVEL_INVALIDO
+    assert credenciais.read_text() == antes
+    # Nenhum código foi consumido: o próximo cadastro recebe o primeiro livre
+    codigos, _ = server_data.gerar_credenciais_em_lote([('Ana', 3)])
+    assert codigos == [1001]
+
+def test_lote_valido_cadastra_todos(credenciais):
+    codigos, _ = server_data.gerar_credenciais_em_lote([('Ana', 1), ('Bob', 15)])
+
+    assert codigos == [1001, 1002]
+    cache = server_data.carregar_credenciais()
+    assert cache[1001]['nivel_acesso'] == 1
+    assert cache[1002]['nivel_acesso'] == 15
+
+def test_cadastro_individual_com_nivel_zero_e_recusado(credenciais):
+    codigo, motivo = server_data.gerar_nova_credencial(0, 'Ana')
+
+    assert codigo is None
+    assert motivo == server_data.MSG_NIVEL_INVALIDO
+    assert 1001 not in server_data.carregar_credenciais()